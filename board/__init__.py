@@ -1,7 +1,16 @@
 from .board import Board
-from .graphics import GBoard
+from .batch import BoardBatch
 
 __all__ = [
     'Board',
-    'GBoard'
+    'BoardBatch',
+    'GBoard',
+    'EventLoop'
 ]
+
+def __getattr__(name):
+    # The graphics module imports pygame, so it is only loaded when a UI asks for it
+    if name in ('GBoard', 'EventLoop'):
+        from . import graphics
+        return getattr(graphics, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
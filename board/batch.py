@@ -0,0 +1,231 @@
+import numpy as np
+from board.board import Board, get_windows
+
+class BoardBatch:
+    """N independent games held in one (N, rows, columns) int8 array
+
+    Every operation works on all games at once: a drop takes one column per
+    game, and queries return one value per game. Operations take an optional
+    boolean ``active`` mask of the games to change; by default that is every
+    game not yet done. Cells, turns and powerup rules match Board, so
+    to_board(i) gives the same position a Board would reach.
+    """
+    NO_COLUMN = -1
+
+    def __init__(self, n, current_player=Board.PLAYER1_PIECE, rows=Board.ROW_COUNT,
+                 columns=Board.COLUMN_COUNT, window_length=Board.WINDOW_LENGTH):
+        self.rows = rows
+        self.columns = columns
+        self.window_length = window_length
+        self.windows = get_windows(rows, columns, window_length)
+        self.cells = np.zeros((n, rows, columns), dtype=np.int8)
+        self.num_slots_filled = np.zeros(n, dtype=np.int16)
+        self.curr_player = np.full(n, current_player, dtype=np.int8)
+        self.prev_player = 3 - self.curr_player
+        self.prev_move = np.full(n, self.NO_COLUMN, dtype=np.int8)
+        # Indexed by [game, piece - 1]; powerups_used by [game, piece - 1, powerup - 1]
+        self.powerups_used = np.zeros((n, 2, 4), dtype=bool)
+        self.double_move_available = np.zeros((n, 2), dtype=bool)
+        self.double_move_column = np.full((n, 2), self.NO_COLUMN, dtype=np.int8)
+        self.winner = np.zeros(n, dtype=np.int8)
+        self.done = np.zeros(n, dtype=bool)
+
+    def __len__(self):
+        return len(self.cells)
+
+    @classmethod
+    def from_boards(cls, boards):
+        boards = list(boards)
+        first = boards[0]
+        batch = cls(len(boards), rows=first.ROW_COUNT, columns=first.COLUMN_COUNT, window_length=first.WINDOW_LENGTH)
+        for i, board in enumerate(boards):
+            batch.cells[i] = board.board
+            batch.num_slots_filled[i] = board.num_slots_filled
+            batch.curr_player[i] = board.CURR_PLAYER
+            batch.prev_player[i] = board.PREV_PLAYER
+            batch.prev_move[i] = cls.NO_COLUMN if board.PREV_MOVE is None else board.PREV_MOVE
+            for p, piece in enumerate((Board.PLAYER1_PIECE, Board.PLAYER2_PIECE)):
+                for powerup in board.powerups_used[piece]:
+                    batch.powerups_used[i, p, powerup - 1] = True
+                batch.double_move_available[i, p] = board.double_move_available[piece]
+                column = board.double_move_column[piece]
+                batch.double_move_column[i, p] = cls.NO_COLUMN if column is None else column
+        batch.update_done(batch.prev_player, np.ones(len(batch), dtype=bool))
+        return batch
+
+    def to_board(self, i):
+        """Game i as a Board"""
+        board = Board(int(self.curr_player[i]), self.rows, self.columns, self.window_length)
+        board.board = self.cells[i].astype(int)
+        board.num_slots_filled = int(self.num_slots_filled[i])
+        board.PREV_PLAYER = int(self.prev_player[i])
+        board.PREV_MOVE = None if self.prev_move[i] == self.NO_COLUMN else int(self.prev_move[i])
+        for p, piece in enumerate((Board.PLAYER1_PIECE, Board.PLAYER2_PIECE)):
+            board.powerups_used[piece] = [int(powerup) + 1 for powerup in np.flatnonzero(self.powerups_used[i, p])]
+            board.double_move_available[piece] = bool(self.double_move_available[i, p])
+            column = int(self.double_move_column[i, p])
+            board.double_move_column[piece] = None if column == self.NO_COLUMN else column
+        return board
+
+    def _active(self, active):
+        return ~self.done if active is None else np.asarray(active, dtype=bool)
+
+    def _pieces(self, pieces):
+        if pieces is None:
+            return self.curr_player.copy()
+        return np.broadcast_to(np.asarray(pieces, dtype=np.int8), self.curr_player.shape)
+
+    # Queries
+
+    def valid_mask(self):
+        """(N, columns) mask of the columns each game can drop into; all False once done"""
+        return (self.cells[:, self.rows - 1, :] == Board.EMPTY) & ~self.done[:, None]
+
+    def next_open_rows(self, cols):
+        """Lowest empty row of each game's column (rows when the column is full)"""
+        column = self.cells[np.arange(len(self)), :, cols]
+        empty = column == Board.EMPTY
+        return np.where(empty.any(axis=1), empty.argmax(axis=1), self.rows)
+
+    def winning_move(self, pieces):
+        """Whether each game has a line of its piece; pieces is one piece or one per game"""
+        pieces = np.broadcast_to(np.asarray(pieces, dtype=np.int8), (len(self),))
+        lines = self.cells.reshape(len(self), -1)[:, self.windows] == pieces[:, None, None]
+        return lines.all(axis=2).any(axis=1)
+
+    def check_draw(self):
+        return self.num_slots_filled == self.rows * self.columns
+
+    def update_done(self, movers, active):
+        """Record winners and finished games after movers moved in the active games
+
+        As in Board.get_winner, when a powerup completes lines for both
+        players the mover wins.
+        """
+        mover_wins = self.winning_move(movers) & active
+        opp_wins = self.winning_move(3 - movers) & active & ~mover_wins
+        self.winner = np.where(mover_wins, movers, np.where(opp_wins, 3 - movers, self.winner)).astype(np.int8)
+        no_moves = ~(self.cells[:, self.rows - 1, :] == Board.EMPTY).any(axis=1)
+        self.done |= active & ((self.winner != 0) | no_moves)
+
+    # Moves
+
+    def drop_piece(self, cols, pieces=None, active=None):
+        """Drop a piece in cols[i] of every active game
+
+        Pieces default to each game's side to move. As with Board.drop_piece,
+        the turn passes to the opponent. Raises ValueError if an active game's
+        column is full.
+        """
+        active = self._active(active)
+        pieces = self._pieces(pieces)
+        cols = np.broadcast_to(np.asarray(cols, dtype=np.intp), (len(self),))
+        games = np.flatnonzero(active)
+        rows = self.next_open_rows(cols)[games]
+        if (rows >= self.rows).any():
+            raise ValueError("drop into a full column")
+        self.cells[games, rows, cols[games]] = pieces[games]
+        self.num_slots_filled[games] += 1
+        self.prev_move[games] = cols[games]
+        self.prev_player[games] = pieces[games]
+        self.curr_player[games] = 3 - pieces[games]
+        self.update_done(pieces, active)
+
+    def remove_piece(self, cols, active=None):
+        """Remove the bottom piece of each active game's column and shift the cells above down
+
+        Returns the mask of games where the column held a piece.
+        """
+        active = self._active(active)
+        cols = np.broadcast_to(np.asarray(cols, dtype=np.intp), (len(self),))
+        n = np.arange(len(self))
+        column = self.cells[n, :, cols]
+        occupied = column != Board.EMPTY
+        success = active & occupied.any(axis=1)
+        bottom = occupied.argmax(axis=1)
+        # Rows at or above the removed piece take the cell one above them
+        source = np.arange(self.rows)[None, :] + (np.arange(self.rows)[None, :] >= bottom[:, None])
+        shifted = np.where(source < self.rows, np.take_along_axis(column, np.minimum(source, self.rows - 1), axis=1), Board.EMPTY)
+        self.cells[n[success], :, cols[success]] = shifted[success]
+        self.num_slots_filled[success] -= 1
+        return success
+
+    def gravity_flip(self, active=None):
+        """Board.gravity_flip on every active game
+
+        As there, each column's pieces are stacked from the bottom row up in
+        their top-down order.
+        """
+        active = self._active(active)
+        order = np.argsort(self.cells == Board.EMPTY, axis=1, kind='stable')
+        compact = np.take_along_axis(self.cells, order, axis=1)
+        # Reverse the first `count` (occupied) rows of every column
+        count = np.count_nonzero(self.cells != Board.EMPTY, axis=1)[:, None, :]
+        rows = np.arange(self.rows)[None, :, None]
+        flipped = np.take_along_axis(compact, np.where(rows < count, count - 1 - rows, rows), axis=1)
+        self.cells[active] = flipped[active]
+        return active
+
+    def swap_color(self, is_row, index, active=None):
+        """Swap the colours of one row (is_row) or column in every active game"""
+        active = self._active(active)
+        if is_row:
+            if not 0 <= index < self.rows:
+                return np.zeros(len(self), dtype=bool)
+            line = self.cells[active, index, :]
+            self.cells[active, index, :] = np.where(line != Board.EMPTY, 3 - line, Board.EMPTY)
+        else:
+            if not 0 <= index < self.columns:
+                return np.zeros(len(self), dtype=bool)
+            line = self.cells[active, :, index]
+            self.cells[active, :, index] = np.where(line != Board.EMPTY, 3 - line, Board.EMPTY)
+        return active
+
+    def enable_double_move(self, cols, pieces=None, active=None):
+        active = self._active(active)
+        pieces = self._pieces(pieces)
+        cols = np.broadcast_to(np.asarray(cols, dtype=np.intp), (len(self),))
+        success = active & (self.cells[np.arange(len(self)), self.rows - 1, cols] == Board.EMPTY)
+        games = np.flatnonzero(success)
+        self.double_move_available[games, pieces[games] - 1] = True
+        self.double_move_column[games, pieces[games] - 1] = cols[games]
+        return success
+
+    def use_powerup(self, powerup_type, pieces=None, active=None, **kwargs):
+        """Board.use_powerup for every active game whose player still has the powerup
+
+        ``col`` may be one column or one per game. Returns the mask of games
+        where the powerup was used.
+        """
+        active = self._active(active)
+        pieces = self._pieces(pieces)
+        n = np.arange(len(self))
+        active = active & ~self.powerups_used[n, pieces - 1, powerup_type - 1]
+        if powerup_type == Board.REMOVE_PIECE:
+            success = self.remove_piece(kwargs['col'], active)
+        elif powerup_type == Board.GRAVITY_FLIP:
+            success = self.gravity_flip(active)
+        elif powerup_type == Board.SWAP_COLOR:
+            success = self.swap_color(kwargs['is_row'], kwargs['index'], active)
+        elif powerup_type == Board.DOUBLE_MOVE:
+            success = self.enable_double_move(kwargs['col'], pieces, active)
+        else:
+            return np.zeros(len(self), dtype=bool)
+        self.powerups_used[n[success], pieces[success] - 1, powerup_type - 1] = True
+        if powerup_type != Board.DOUBLE_MOVE:
+            self.update_done(pieces, success)
+        return success
+
+    def random_playout(self, rng=None):
+        """Drop random valid columns in every unfinished game until all are done
+
+        Returns the winners (0 for a draw). Each step advances every game
+        still running with a single set of array operations.
+        """
+        rng = np.random.default_rng() if rng is None else rng
+        while not self.done.all():
+            valid = self.valid_mask()
+            # A random valid column per game: the argmax of random keys over the valid columns
+            keys = np.where(valid, rng.random(valid.shape), -1.0)
+            self.drop_piece(keys.argmax(axis=1))
+        return self.winner.copy()
@@ -1,5 +1,51 @@
 import numpy as np
 import copy
+from functools import lru_cache
+
+@lru_cache(maxsize=None)
+def get_windows(rows, columns, length):
+    """Flat cell indices of every line of ``length`` cells, built once per geometry
+
+    Rows are horizontal windows, then vertical, positive and negative diagonals,
+    matching the order the evaluations walk the board in.
+    """
+    index = np.arange(rows * columns).reshape(rows, columns)
+    steps = np.arange(length)
+    windows = []
+    for r in range(rows):
+        for c in range(columns - length + 1):
+            windows.append(index[r, c + steps])
+    for c in range(columns):
+        for r in range(rows - length + 1):
+            windows.append(index[r + steps, c])
+    for r in range(rows - length + 1):
+        for c in range(columns - length + 1):
+            windows.append(index[r + steps, c + steps])
+    for r in range(rows - length + 1):
+        for c in range(columns - length + 1):
+            windows.append(index[r + length - 1 - steps, c + steps])
+    table = np.array(windows, dtype=np.intp).reshape(-1, length)
+    table.setflags(write=False)
+    return table
+
+@lru_cache(maxsize=None)
+def get_bitboard_masks(rows, columns):
+    """Bitboard masks of a geometry, built once per geometry
+
+    A bitboard has one column of ``rows + 1`` bits per board column, the
+    spare top bit keeping shifted lines from wrapping into the next column.
+    Returns (bottom row, every cell, cells of each column, top cell of each
+    column).
+    """
+    height = rows + 1
+    bottom = sum(1 << (c * height) for c in range(columns))
+    cells = bottom * ((1 << rows) - 1)
+    column_masks = tuple(((1 << rows) - 1) << (c * height) for c in range(columns))
+    top_masks = tuple(1 << (rows - 1 + c * height) for c in range(columns))
+    return bottom, cells, column_masks, top_masks
+
+# Place values of four two-bit cells packed into one byte
+_PACK_WEIGHTS = np.array([64, 16, 4, 1])
 
 class Board:
     ROW_COUNT = 6
@@ -21,7 +67,11 @@ class Board:
     SWAP_COLOR = 3
     DOUBLE_MOVE = 4
 
-    def __init__(self, current_player):
+    def __init__(self, current_player, rows=ROW_COUNT, columns=COLUMN_COUNT, connect=WINDOW_LENGTH):
+        # Geometry is per board; the class constants are the classic 6x7 connect-4 defaults
+        self.ROW_COUNT = rows
+        self.COLUMN_COUNT = columns
+        self.WINDOW_LENGTH = connect
         self.board = np.zeros((self.ROW_COUNT, self.COLUMN_COUNT), dtype=int)
         self.num_slots_filled = 0
         self.CURR_PLAYER = current_player
@@ -30,6 +80,184 @@ class Board:
         self.double_move_available = {self.PLAYER1_PIECE: False, self.PLAYER2_PIECE: False}
         self.double_move_column = {self.PLAYER1_PIECE: None, self.PLAYER2_PIECE: None}
 
+    def _pack(self, include_history, mirrored=False):
+        """Pack the board state into a fixed number of bytes
+
+        Five header bytes (side to move, previous player, powerups used,
+        previous move and double-move state) are followed by the cells at
+        two bits each, bottom row first. Without history the previous move
+        and player are left out, so transpositions share a key. ``mirrored``
+        packs the left-right mirror image instead.
+        """
+        header = bytearray(5)
+        header[0] = self.CURR_PLAYER
+        if include_history:
+            header[0] |= self.PREV_PLAYER << 2
+            if self.PREV_MOVE is not None:
+                header[2] = (self.mirror_column(self.PREV_MOVE) if mirrored else self.PREV_MOVE) + 1
+        for i, piece in enumerate((self.PLAYER1_PIECE, self.PLAYER2_PIECE)):
+            if self.double_move_available[piece]:
+                header[0] |= 1 << (4 + i)
+            for powerup in self.powerups_used[piece]:
+                header[1] |= 1 << (4 * i + powerup - 1)
+            column = self.double_move_column[piece]
+            if column is not None:
+                header[3 + i] = (self.mirror_column(column) if mirrored else column) + 1
+
+        size = self.ROW_COUNT * self.COLUMN_COUNT
+        cells = np.zeros(size + (-size % 4), dtype=int)
+        cells[:size] = (self.board[:, ::-1] if mirrored else self.board).ravel()
+        packed = cells.reshape(-1, 4) @ _PACK_WEIGHTS
+        return bytes(header) + packed.astype(np.uint8).tobytes()
+
+    def to_bytes(self):
+        """Fixed-size encoding of the full board state, see from_bytes"""
+        return self._pack(True)
+
+    def key(self):
+        """Position key: pieces, side to move, powerups and double-move state"""
+        return self._pack(False)
+
+    @property
+    def geometry(self):
+        """(rows, columns, connect), enough to rebuild an encoded board of this size"""
+        return self.ROW_COUNT, self.COLUMN_COUNT, self.WINDOW_LENGTH
+
+    @classmethod
+    def from_bytes(cls, data, geometry=None):
+        """Rebuild a board from the output of to_bytes (or key)
+
+        The encoding does not hold the board size; pass the board's geometry
+        for anything but the classic board.
+        """
+        header = data[:5]
+        board = cls(header[0] & 3, *(geometry or ()))
+        if header[0] >> 2 & 3:
+            board.PREV_PLAYER = header[0] >> 2 & 3
+        if header[2]:
+            board.PREV_MOVE = header[2] - 1
+        for i, piece in enumerate((cls.PLAYER1_PIECE, cls.PLAYER2_PIECE)):
+            board.double_move_available[piece] = bool(header[0] >> (4 + i) & 1)
+            board.powerups_used[piece] = [p for p in (cls.REMOVE_PIECE, cls.GRAVITY_FLIP, cls.SWAP_COLOR, cls.DOUBLE_MOVE)
+                                          if header[1] >> (4 * i + p - 1) & 1]
+            if header[3 + i]:
+                board.double_move_column[piece] = header[3 + i] - 1
+
+        packed = np.frombuffer(data, dtype=np.uint8, offset=5)
+        cells = np.stack((packed >> 6, packed >> 4 & 3, packed >> 2 & 3, packed & 3), axis=1).ravel()
+        board.board = cells[:board.ROW_COUNT * board.COLUMN_COUNT].astype(int).reshape(board.ROW_COUNT, board.COLUMN_COUNT)
+        board.num_slots_filled = int(np.count_nonzero(board.board))
+        return board
+
+    def mirror(self):
+        """Return a left-right mirrored copy of the board"""
+        c = self.copy_board()
+        c.board = np.ascontiguousarray(self.board[:, ::-1])
+        if c.PREV_MOVE is not None:
+            c.PREV_MOVE = self.COLUMN_COUNT - 1 - c.PREV_MOVE
+        for piece, col in self.double_move_column.items():
+            if col is not None:
+                c.double_move_column[piece] = self.COLUMN_COUNT - 1 - col
+        return c
+
+    def canonical_key(self):
+        """Return (key, mirrored): the smaller of the keys of the board and its mirror
+
+        ``mirrored`` tells whether the key belongs to the mirror image, in which
+        case columns looked up under it must be mapped back with mirror_column.
+        """
+        key = self.key()
+        mirrored_key = self._pack(False, mirrored=True)
+        if mirrored_key < key:
+            return mirrored_key, True
+        return key, False
+
+    def mirror_column(self, col):
+        return self.COLUMN_COUNT - 1 - col
+
+    def is_symmetric(self):
+        """Whether the position is its own left-right mirror image"""
+        for col in self.double_move_column.values():
+            if col is not None and col != self.mirror_column(col):
+                return False
+        return np.array_equal(self.board, self.board[:, ::-1])
+
+    def get_distinct_locations(self):
+        """Valid columns, without the mirror duplicates of a symmetric position"""
+        valid_locations = self.get_valid_locations()
+        if self.is_symmetric():
+            return [col for col in valid_locations if col <= self.mirror_column(col)]
+        return valid_locations
+
+    def to_notation(self):
+        """Short text form, e.g. ``7/7/7/7/7/3ry2 1 - - -``
+
+        Rows run top to bottom with ``r``/``y`` for player 1/2 pieces and digits
+        for runs of empty cells, followed by the side to move, the powerups each
+        player has used and any pending double move as ``player:column``.
+        """
+        rows = []
+        for r in range(self.ROW_COUNT - 1, -1, -1):
+            row, empty = '', 0
+            for c in range(self.COLUMN_COUNT):
+                cell = self.board[r][c]
+                if cell == self.EMPTY:
+                    empty += 1
+                    continue
+                if empty:
+                    row += str(empty)
+                    empty = 0
+                row += 'r' if cell == self.PLAYER1_PIECE else 'y'
+            if empty:
+                row += str(empty)
+            rows.append(row)
+
+        powerups = [''.join(str(p) for p in sorted(self.powerups_used[piece])) or '-'
+                    for piece in (self.PLAYER1_PIECE, self.PLAYER2_PIECE)]
+        double = ','.join(f'{piece}:{self.double_move_column[piece]}'
+                          for piece in (self.PLAYER1_PIECE, self.PLAYER2_PIECE)
+                          if self.double_move_available[piece]) or '-'
+        return ' '.join(['/'.join(rows), str(self.CURR_PLAYER), powerups[0], powerups[1], double])
+
+    @classmethod
+    def from_notation(cls, notation, connect=WINDOW_LENGTH):
+        """Rebuild a board from the output of to_notation
+
+        The board size is read from the rows; the line length is not part of
+        the notation.
+        """
+        fields = notation.split()
+        rows = fields[0].split('/')
+        columns = sum(int(char) if char.isdigit() else 1 for char in rows[0])
+        board = cls(int(fields[1]), len(rows), columns, connect)
+        for i, row in enumerate(rows):
+            r = board.ROW_COUNT - 1 - i
+            c = 0
+            for char in row:
+                if char.isdigit():
+                    c += int(char)
+                else:
+                    board.board[r][c] = cls.PLAYER1_PIECE if char == 'r' else cls.PLAYER2_PIECE
+                    c += 1
+        board.num_slots_filled = int(np.count_nonzero(board.board))
+
+        for piece, used in zip((cls.PLAYER1_PIECE, cls.PLAYER2_PIECE), fields[2:4]):
+            board.powerups_used[piece] = [] if used == '-' else [int(p) for p in used]
+        if len(fields) > 4 and fields[4] != '-':
+            for entry in fields[4].split(','):
+                piece, col = entry.split(':')
+                board.double_move_available[int(piece)] = True
+                board.double_move_column[int(piece)] = int(col)
+        return board
+
+    @classmethod
+    def from_moves(cls, moves, first_player=PLAYER1_PIECE, geometry=None):
+        """Play a move-sequence string of 1-based columns, e.g. ``"4453"``"""
+        board = cls(first_player, *(geometry or ()))
+        for char in moves:
+            board.drop_piece(int(char) - 1, board.CURR_PLAYER)
+        return board
+
     def copy_board(self):
         c = copy.deepcopy(self)
         return c
@@ -37,6 +265,9 @@ class Board:
     def get_board(self):
         return self.board
 
+    def get_windows(self):
+        return get_windows(self.ROW_COUNT, self.COLUMN_COUNT, self.WINDOW_LENGTH)
+
     def get_row_col(self, row, col):
         return self.board[row][col]
 
@@ -66,29 +297,8 @@ class Board:
         print(np.flip(self.board, 0))
 
     def winning_move(self, piece):
-        # Check horizontal locations for win
-        for c in range(self.COLUMN_COUNT-3):
-            for r in range(self.ROW_COUNT):
-                if self.board[r][c] == piece and self.board[r][c+1] == piece and self.board[r][c+2] == piece and self.board[r][c+3] == piece:
-                    return True
-
-        # Check vertical locations for win
-        for c in range(self.COLUMN_COUNT):
-            for r in range(self.ROW_COUNT-3):
-                if self.board[r][c] == piece and self.board[r+1][c] == piece and self.board[r+2][c] == piece and self.board[r+3][c] == piece:
-                    return True
-
-        # Check positively sloped diaganols
-        for c in range(self.COLUMN_COUNT-3):
-            for r in range(self.ROW_COUNT-3):
-                if self.board[r][c] == piece and self.board[r+1][c+1] == piece and self.board[r+2][c+2] == piece and self.board[r+3][c+3] == piece:
-                    return True
-
-        # Check negatively sloped diaganols
-        for c in range(self.COLUMN_COUNT-3):
-            for r in range(3, self.ROW_COUNT):
-                if self.board[r][c] == piece and self.board[r-1][c+1] == piece and self.board[r-2][c+2] == piece and self.board[r-3][c+3] == piece:
-                    return True
+        # Every line of WINDOW_LENGTH cells at once, from the geometry's window table
+        return bool((self.board.ravel()[self.get_windows()] == piece).all(axis=1).any())
 
     def get_valid_locations(self):
         valid_locations = []
@@ -97,6 +307,89 @@ class Board:
                 valid_locations.append(col)
         return valid_locations
 
+    def _completes_line(self, grid, row, col, piece):
+        """Whether placing piece at (row, col) of grid (a nested list) makes a line"""
+        for dr, dc in ((0, 1), (1, 0), (1, 1), (1, -1)):
+            count = 1
+            for sign in (1, -1):
+                r, c = row + sign * dr, col + sign * dc
+                while 0 <= r < self.ROW_COUNT and 0 <= c < self.COLUMN_COUNT and grid[r][c] == piece:
+                    count += 1
+                    r += sign * dr
+                    c += sign * dc
+            if count >= self.WINDOW_LENGTH:
+                return True
+        return False
+
+    def is_winning_drop(self, col, piece):
+        """Whether dropping piece in col would win immediately"""
+        if not self.is_valid_location(col):
+            return False
+        return self._completes_line(self.board.tolist(), self.get_next_open_row(col), col, piece)
+
+    def get_threats(self, piece):
+        """Return (wins, blocks) for piece
+
+        ``wins`` are the columns where piece wins with its next drop and
+        ``blocks`` the columns where the opponent would win with theirs, which
+        piece must block. Only the cells pieces would land in are considered.
+        """
+        grid = self.board.tolist()
+        opp_piece = self.get_opp_player(piece)
+        wins, blocks = [], []
+        for col in range(self.COLUMN_COUNT):
+            if grid[self.ROW_COUNT-1][col] != self.EMPTY:
+                continue
+            row = self.get_next_open_row(col)
+            if self._completes_line(grid, row, col, piece):
+                wins.append(col)
+            if self._completes_line(grid, row, col, opp_piece):
+                blocks.append(col)
+        return wins, blocks
+
+    def forced_move(self, piece):
+        """A column piece must play: a winning drop, or the only block; otherwise None"""
+        wins, blocks = self.get_threats(piece)
+        if wins:
+            return wins[0]
+        if len(blocks) == 1:
+            return blocks[0]
+        return None
+
+    def get_safe_locations(self, piece):
+        """Valid columns whose drop does not let the opponent win on the cell above it
+
+        A drop that wins at once is always safe. Falls back to all valid
+        columns when every move hands over a win.
+        """
+        grid = self.board.tolist()
+        opp_piece = self.get_opp_player(piece)
+        valid_locations = self.get_valid_locations()
+        safe = []
+        for col in valid_locations:
+            row = self.get_next_open_row(col)
+            if row + 1 < self.ROW_COUNT and not self._completes_line(grid, row, col, piece):
+                grid[row][col] = piece
+                loses = self._completes_line(grid, row + 1, col, opp_piece)
+                grid[row][col] = self.EMPTY
+                if loses:
+                    continue
+            safe.append(col)
+        return safe or valid_locations
+
+    def get_winner(self, mover=None):
+        """The piece with four in a row, or None
+
+        A powerup can complete lines for both players at once; then ``mover``
+        (by default the previous player) is the winner.
+        """
+        mover = self.PREV_PLAYER if mover is None else mover
+        if self.winning_move(mover):
+            return mover
+        if self.winning_move(self.get_opp_player(mover)):
+            return self.get_opp_player(mover)
+        return None
+
     def check_draw(self):
         if self.num_slots_filled == self.ROW_COUNT * self.COLUMN_COUNT:
             return True
@@ -150,9 +443,9 @@ class Board:
                 if self.board[row][col] != self.EMPTY:
                     pieces.append(self.board[row][col])
             
-            # Place pieces from bottom up in the new board
-            for i, piece_val in enumerate(pieces):
-                new_board[self.ROW_COUNT - 1 - i][col] = piece_val
+            # Turned upside down, the top piece lands at the bottom and the rest stack on it
+            for i, piece_val in enumerate(reversed(pieces)):
+                new_board[i][col] = piece_val
         
         # Update the board
         self.board = new_board
@@ -242,3 +535,85 @@ class Board:
         """Get list of available powerups for a player"""
         all_powerups = [self.REMOVE_PIECE, self.GRAVITY_FLIP, self.SWAP_COLOR, self.DOUBLE_MOVE]
         return [p for p in all_powerups if p not in self.powerups_used[piece]]
+
+    def get_legal_moves(self):
+        """Every move for the side to move, in the format Connect4Game.handle_move takes
+
+        Drops are column numbers and powerups ``('powerup', type, params)``.
+        Powerups that would leave the board unchanged are left out. With a
+        double move pending, only the drop in its column is legal.
+        """
+        piece = self.CURR_PLAYER
+        if self.double_move_available[piece]:
+            col = self.double_move_column[piece]
+            return [col] if self.is_valid_location(col) else []
+        valid_locations = self.get_valid_locations()
+        moves = list(valid_locations)
+        occupied_rows = [r for r in range(self.ROW_COUNT) if self.board[r].any()]
+        occupied_cols = [c for c in range(self.COLUMN_COUNT) if self.board[:, c].any()]
+        for powerup in self.get_available_powerups(piece):
+            if powerup == self.REMOVE_PIECE:
+                moves.extend(('powerup', powerup, {'col': col}) for col in occupied_cols)
+            elif powerup == self.GRAVITY_FLIP and self.num_slots_filled:
+                moves.append(('powerup', powerup, {}))
+            elif powerup == self.SWAP_COLOR:
+                moves.extend(('powerup', powerup, {'is_row': True, 'index': row}) for row in occupied_rows)
+                moves.extend(('powerup', powerup, {'is_row': False, 'index': col}) for col in occupied_cols)
+            elif powerup == self.DOUBLE_MOVE:
+                moves.extend(('powerup', powerup, {'col': col}) for col in valid_locations)
+        return moves
+
+    def apply_player_move(self, move, piece):
+        """Apply a move exactly as Connect4Game does for the player ``piece``
+
+        Unlike apply_move, the side to move is not updated after a powerup;
+        the game tracks turns itself. Returns False for an illegal move.
+        """
+        if isinstance(move, tuple):
+            if move[0] == 'powerup':
+                return bool(self.use_powerup(move[1], piece, **move[2]))
+            if move[0] == 'double':
+                col = move[1]
+                if not self.is_valid_location(col):
+                    return False
+                self.drop_piece(col, piece)
+                self.double_move_available[piece] = True
+                self.double_move_column[piece] = col
+                return True
+            return False
+
+        if not self.is_valid_location(move):
+            return False
+        # The second drop of a double move must use the same column
+        if self.double_move_available[piece] and move != self.double_move_column[piece]:
+            return False
+        self.drop_piece(move, piece)
+        self.double_move_available[piece] = False
+        self.double_move_column[piece] = None
+        return True
+
+    def apply_move(self, move):
+        """Play a move from get_legal_moves for the side to move, following the game's turn rules
+
+        A powerup other than double move uses up the turn. Double move keeps
+        the turn for the drop in its column. Returns False for an illegal move.
+        """
+        piece = self.CURR_PLAYER
+        if isinstance(move, tuple):
+            powerup_type, params = move[1], move[2]
+            if not self.use_powerup(powerup_type, piece, **params):
+                return False
+            if powerup_type != self.DOUBLE_MOVE:
+                self.PREV_PLAYER = piece
+                self.CURR_PLAYER = self.get_opp_player(piece)
+            return True
+
+        if not self.is_valid_location(move):
+            return False
+        if self.double_move_available[piece]:
+            if move != self.double_move_column[piece]:
+                return False
+            self.double_move_available[piece] = False
+            self.double_move_column[piece] = None
+        self.drop_piece(move, piece)
+        return True
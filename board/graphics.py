@@ -1,7 +1,25 @@
+import os
+
+# Hide pygame welcome message
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', "hide")
+
 import pygame
 import pygame.gfxdraw
 
-pygame.init()
+_fonts = {}
+
+def init_graphics():
+    """Initialise pygame the first time a UI object is created"""
+    if not pygame.get_init():
+        pygame.init()
+
+def get_font(name, size):
+    """SysFont lookups scan the installed fonts, so each (name, size) is loaded once"""
+    key = (name, size)
+    if key not in _fonts:
+        init_graphics()
+        _fonts[key] = pygame.font.SysFont(name, size)
+    return _fonts[key]
 
 class GBoard:
     BLUE = (63,124,230)
@@ -15,9 +33,8 @@ class GBoard:
 
     RADIUS = int(SQUARESIZE/2 - 5)
 
-    myfont = pygame.font.SysFont("monospace", 75)
-
     def __init__(self, board):
+        init_graphics()
         self.width = board.COLUMN_COUNT * self.SQUARESIZE
         self.height = (board.ROW_COUNT+1) * self.SQUARESIZE
         self.size = (self.width, self.height)
@@ -51,7 +68,7 @@ class GBoard:
         pygame.draw.circle(self.screen, colour, params, radius)
 
     def write_on_board(self, text, color, posx, posy, fontsize, inCenter = False):
-        textfont = pygame.font.SysFont("inkfree", fontsize)
+        textfont = get_font("inkfree", fontsize)
         text_surface = textfont.render(text, True, color)
         if(inCenter):
             text_position = text_surface.get_rect(center = (posx, posy))
@@ -64,7 +81,7 @@ class GBoard:
         screen.blit(button['text surface'], button['text rectangle'])
 
     def create_button(self, posx, posy, width, height, label, callback, optional_arguments = None):
-        textfont = pygame.font.SysFont("inkfree", 25)
+        textfont = get_font("inkfree", 25)
         text_surface = textfont.render(label, True, self.WHITE)
 
         button_position = pygame.Rect(posx, posy, width, height)
@@ -77,4 +94,38 @@ class GBoard:
             'callback': callback,
             'args': optional_arguments,
             }
-        return button
\ No newline at end of file
+        return button
+
+
+class EventLoop:
+    """Frame-capped pygame event pump that sleeps while the UI is idle"""
+    FPS = 30
+
+    def __init__(self, fps=FPS):
+        init_graphics()
+        self.fps = fps
+        self.clock = pygame.time.Clock()
+        self.dirty = True
+
+    def events(self, timeout=None):
+        """Block until an event arrives (or timeout ms pass) and return the drained queue"""
+        if timeout is None:
+            event = pygame.event.wait()
+        else:
+            event = pygame.event.wait(timeout)
+        events = [event] + pygame.event.get()
+        return [e for e in events if e.type != pygame.NOEVENT]
+
+    def poll(self):
+        """Return pending events without blocking"""
+        return pygame.event.get()
+
+    def mark_dirty(self):
+        self.dirty = True
+
+    def flip(self):
+        """Push the frame to the display if anything changed, then cap the frame rate"""
+        if self.dirty:
+            pygame.display.update()
+            self.dirty = False
+        self.clock.tick(self.fps)
\ No newline at end of file
@@ -0,0 +1,230 @@
+import os
+import json
+import mmap
+import fcntl
+import struct
+import numpy as np
+from board.board import Board
+
+# A log is a sequence of frames, each starting with a one-byte tag:
+#   b'S' game start: first player, seed, start time, config length, JSON configs
+#   b'M' move: encoded move, milliseconds the player took
+#   b'E' game end: result
+# The index file next to the log holds the uint64 offset of every game's start frame.
+START = struct.Struct('<BQdH')
+MOVE = struct.Struct('<BI')
+END = struct.Struct('<B')
+
+# Results stored in end frames; a game without one was not finished
+DRAW = 3
+UNFINISHED = 0
+
+def encode_move(move, piece):
+    """One byte for a player's move as Connect4Game.handle_move takes it
+
+    Bit 6 is set for player 2. Drops keep the column in bits 0-5. Powerups
+    set bit 7, the powerup type minus one in bits 4-5, ``is_row`` in bit 3
+    and the column or row in bits 0-2. A ``('double', col)`` move is stored
+    like a double move powerup with bit 3 set.
+    """
+    code = 0x40 if piece == Board.PLAYER2_PIECE else 0
+    if not isinstance(move, tuple):
+        return code | int(move)
+    if move[0] == 'double':
+        return code | 0x80 | (Board.DOUBLE_MOVE - 1) << 4 | 0x08 | move[1]
+    powerup_type, params = move[1], move[2]
+    code |= 0x80 | (powerup_type - 1) << 4
+    if powerup_type == Board.SWAP_COLOR:
+        code |= (0x08 if params['is_row'] else 0) | params['index']
+    elif powerup_type in (Board.REMOVE_PIECE, Board.DOUBLE_MOVE):
+        code |= params['col']
+    return code
+
+def decode_move(code):
+    """(move, piece) from encode_move's byte"""
+    piece = Board.PLAYER2_PIECE if code & 0x40 else Board.PLAYER1_PIECE
+    if not code & 0x80:
+        return code & 0x3f, piece
+    powerup_type = (code >> 4 & 3) + 1
+    if powerup_type == Board.DOUBLE_MOVE and code & 0x08:
+        return ('double', code & 0x07), piece
+    if powerup_type == Board.SWAP_COLOR:
+        params = {'is_row': bool(code & 0x08), 'index': code & 0x07}
+    elif powerup_type == Board.GRAVITY_FLIP:
+        params = {}
+    else:
+        params = {'col': code & 0x07}
+    return ('powerup', powerup_type, params), piece
+
+
+class GameRecord:
+    """One recorded game: how it started, every move with its timing and the result"""
+
+    def __init__(self, first_player, seed, start_time, configs, moves=None, times=None, result=UNFINISHED):
+        self.first_player = first_player
+        self.seed = seed
+        self.start_time = start_time
+        self.configs = configs
+        self.moves = moves if moves is not None else []   # (move, piece) pairs
+        self.times = times if times is not None else []   # seconds per move
+        self.result = result
+
+    def __len__(self):
+        return len(self.moves)
+
+    @property
+    def winner(self):
+        return self.result if self.result in (Board.PLAYER1_PIECE, Board.PLAYER2_PIECE) else None
+
+    def replay(self, ply=None):
+        """The Board after the first ``ply`` moves (all of them by default)
+
+        Moves are applied with Board.apply_player_move, as the game applied
+        them, so no bot is run.
+        """
+        board = Board(self.first_player)
+        for move, piece in self.moves[:ply]:
+            if not board.apply_player_move(move, piece):
+                raise ValueError(f"recorded move {move!r} by player {piece} is illegal")
+        return board
+
+
+class RecordLog:
+    """Append-only game log with an offset index for random access
+
+    Frames are written and flushed as the game is played, so a crash loses
+    nothing before the last move and the unfinished game still replays. One
+    process at a time may write a log (fcntl.flock); readers need no lock.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'ab')
+        try:
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            self.file.close()
+            raise RuntimeError(f"{path} is already being written by another process")
+        if not os.path.exists(index_path(path)) and self.file.tell():
+            rebuild_index(path)
+        self.index = open(index_path(path), 'ab')
+        self.games = self.index.tell() // 8
+        self.trim_tail()
+
+    def trim_tail(self):
+        """Cut off a partial frame or index entry left by a crash, so appends start clean"""
+        self.index.truncate(self.games * 8)
+        end = 0
+        if self.games:
+            offset = int(np.fromfile(index_path(self.path), dtype='<u8', count=1, offset=(self.games - 1) * 8)[0])
+            with open(self.path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                _, end = parse_game(data, offset)
+        if end < self.file.tell():
+            self.file.truncate(end)
+            self.file.seek(end)
+
+    def start_game(self, first_player, seed, configs, start_time):
+        """Begin a game record and return its number in the log"""
+        offset = self.file.tell()
+        data = json.dumps(configs, separators=(',', ':')).encode()
+        self.file.write(b'S' + START.pack(first_player, seed, start_time, len(data)) + data)
+        self.file.flush()
+        self.index.write(struct.pack('<Q', offset))
+        self.index.flush()
+        self.games += 1
+        return self.games - 1
+
+    def add_move(self, move, piece, seconds):
+        self.file.write(b'M' + MOVE.pack(encode_move(move, piece), min(int(seconds * 1000), 0xffffffff)))
+        self.file.flush()
+
+    def end_game(self, result):
+        self.file.write(b'E' + END.pack(result))
+        self.file.flush()
+
+    def close(self):
+        self.index.close()
+        self.file.close()
+
+
+def index_path(path):
+    return path + '.idx'
+
+def parse_game(data, offset):
+    """Read the game whose start frame is at offset; returns (record, end offset)
+
+    The game ends at its end frame, the next game's start frame or the last
+    complete frame, so a tail cut off by a crash is left out.
+    """
+    if data[offset:offset + 1] != b'S' or offset + 1 + START.size > len(data):
+        raise ValueError(f"no game starts at offset {offset}")
+    first_player, seed, start_time, size = START.unpack_from(data, offset + 1)
+    offset += 1 + START.size
+    if offset + size > len(data):
+        raise ValueError(f"the game at offset {offset - 1 - START.size} is cut off")
+    record = GameRecord(first_player, seed, start_time, json.loads(bytes(data[offset:offset + size])))
+    offset += size
+    while offset < len(data):
+        tag = data[offset:offset + 1]
+        if tag == b'M' and offset + 1 + MOVE.size <= len(data):
+            code, millis = MOVE.unpack_from(data, offset + 1)
+            record.moves.append(decode_move(code))
+            record.times.append(millis / 1000)
+            offset += 1 + MOVE.size
+        elif tag == b'E' and offset + 1 + END.size <= len(data):
+            record.result = END.unpack_from(data, offset + 1)[0]
+            offset += 1 + END.size
+            break
+        else:
+            break
+    return record, offset
+
+def scan_log(path):
+    """(offsets of the complete games, end of their last frame) of a log"""
+    offsets = []
+    offset = 0
+    if not os.path.getsize(path):
+        return offsets, offset
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        while offset < len(data):
+            try:
+                _, end = parse_game(data, offset)
+            except ValueError:
+                break
+            offsets.append(offset)
+            offset = end
+    return offsets, offset
+
+def rebuild_index(path):
+    """Rewrite the index of a log by scanning it, e.g. after the index was lost
+
+    Scanning stops at a game cut off in its start frame.
+    """
+    offsets, _ = scan_log(path)
+    np.array(offsets, dtype='<u8').tofile(index_path(path))
+    return len(offsets)
+
+
+class RecordReader:
+    """Random access to the games of a log through its index, without loading the log"""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if os.path.getsize(path) else b''
+        self.offsets = np.fromfile(index_path(path), dtype='<u8')
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, n):
+        return parse_game(self.data, int(self.offsets[n]))[0]
+
+    def __iter__(self):
+        for offset in self.offsets:
+            yield parse_game(self.data, int(offset))[0]
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        self.file.close()
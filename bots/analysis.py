@@ -0,0 +1,230 @@
+import json
+import argparse
+from multiprocessing import Pool
+from board.board import Board
+from board.records import RecordReader
+from bots.transposition import SharedTranspositionTable
+
+# Minimax scores at or beyond these are forced wins and losses
+WIN_SCORE = 100000000000000
+LOSS_SCORE = -10000000000000
+
+# Each pool worker keeps one analysing bot per player for the whole run
+_worker_bots = None
+
+def init_worker(depth, tt_name=None, slots=None):
+    """Create the worker's bots; with tt_name they share the parent's table"""
+    global _worker_bots
+    from bots.minimax import MiniMaxBot
+
+    _worker_bots = {piece: MiniMaxBot(piece, depth, solver_threshold=0)
+                    for piece in (Board.PLAYER1_PIECE, Board.PLAYER2_PIECE)}
+    if tt_name is not None:
+        tt = SharedTranspositionTable.attach(tt_name, slots)
+        for bot in _worker_bots.values():
+            bot.tt = tt
+
+def analyze_position(board_bytes):
+    """{column: score} for every drop of the side to move"""
+    board = Board.from_bytes(board_bytes)
+    bot = _worker_bots[board.CURR_PLAYER]
+    return {entry['move']: entry['score'] for entry in bot.analyze(board)}
+
+def outcome(score):
+    return 1 if score >= WIN_SCORE else (-1 if score <= LOSS_SCORE else 0)
+
+def is_blunder(score, best_score, threshold):
+    """A move that throws away a forced win, walks into a forced loss or drops threshold points"""
+    if outcome(score) != outcome(best_score):
+        return True
+    return outcome(score) == 0 and best_score - score >= threshold
+
+def game_positions(record):
+    """Yield (ply, board, move, piece) for every graded move of a recorded game
+
+    Only free drops are graded: powerups and the forced second drop of a
+    double move are replayed but not searched. The board is a copy with the
+    mover as side to move, since the game does not pass the turn after a
+    powerup.
+    """
+    board = Board(record.first_player)
+    for ply, (move, piece) in enumerate(record.moves):
+        if not isinstance(move, tuple) and not board.double_move_available[piece]:
+            position = board.copy_board()
+            position.CURR_PLAYER = piece
+            position.PREV_PLAYER = position.get_opp_player(piece)
+            yield ply, position, move, piece
+        if not board.apply_player_move(move, piece):
+            raise ValueError(f"recorded move {move!r} by player {piece} is illegal")
+
+
+class PositionCache:
+    """Analysed positions keyed by mirror-normalised position key
+
+    Scores are stored for the canonical orientation, so a position and its
+    mirror image are searched once. The cache is cleared once it reaches
+    ``max_entries``.
+    """
+
+    def __init__(self, max_entries=1_000_000):
+        self.max_entries = max_entries
+        self.entries = {}
+        self.hits = 0
+
+    def canonical(self, board):
+        """(key, canonical board, mirrored)"""
+        key, mirrored = board.canonical_key()
+        return key, (board.mirror() if mirrored else board), mirrored
+
+    def get(self, key):
+        scores = self.entries.get(key)
+        if scores is not None:
+            self.hits += 1
+        return scores
+
+    def store(self, key, scores):
+        if len(self.entries) >= self.max_entries:
+            self.entries.clear()
+        self.entries[key] = scores
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class GameAnalyzer:
+    """Grades every move of recorded games with minimax, in batches of games
+
+    The positions of a batch are deduplicated by position key, both within
+    the batch and against every position analysed before, and only the new
+    ones are searched, in a process pool whose workers share one transposition
+    table in shared memory. Each game's annotations are written as one JSON
+    line as soon as its batch is done.
+    """
+
+    def __init__(self, depth=6, processes=None, threshold=100, batch_games=64, slots=1 << 22,
+                 max_entries=1_000_000):
+        self.depth = depth
+        self.processes = processes
+        self.threshold = threshold
+        self.batch_games = batch_games
+        self.slots = slots
+        self.cache = PositionCache(max_entries)
+        self.positions = 0
+        self.searched = 0
+        self.pool = None
+        self.tt = None
+
+    def start(self):
+        if self.processes == 1:
+            init_worker(self.depth)
+            return
+        self.tt = SharedTranspositionTable.create(self.slots)
+        self.pool = Pool(self.processes, initializer=init_worker, initargs=(self.depth, self.tt.name, self.slots))
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+        if self.tt is not None:
+            self.tt.close()
+            self.tt = None
+
+    def search(self, boards):
+        if self.pool is None:
+            return [analyze_position(board.to_bytes()) for board in boards]
+        return self.pool.map(analyze_position, [board.to_bytes() for board in boards], chunksize=8)
+
+    def analyze_batch(self, games):
+        """Yield (game number, annotation) for a list of (game number, GameRecord)"""
+        graded = []
+        known = {}   # canonical scores of every position in the batch
+        new = {}     # positions neither cached nor already queued
+        for number, record in games:
+            moves = []
+            for ply, board, move, piece in game_positions(record):
+                key, canonical, mirrored = self.cache.canonical(board)
+                if key not in known and key not in new:
+                    scores = self.cache.get(key)
+                    if scores is None:
+                        new[key] = canonical
+                    else:
+                        known[key] = scores
+                moves.append((ply, move, piece, key, mirrored))
+            graded.append((number, record, moves))
+        self.positions += sum(len(moves) for _, _, moves in graded)
+        self.searched += len(new)
+
+        for key, scores in zip(new, self.search(list(new.values()))):
+            self.cache.store(key, scores)
+            known[key] = scores
+
+        for number, record, moves in graded:
+            annotations = []
+            blunders = {Board.PLAYER1_PIECE: 0, Board.PLAYER2_PIECE: 0}
+            for ply, move, piece, key, mirrored in moves:
+                scores = known[key]
+                if mirrored:
+                    scores = {Board.COLUMN_COUNT - 1 - col: score for col, score in scores.items()}
+                best = max(scores, key=scores.get)
+                blunder = is_blunder(scores[move], scores[best], self.threshold)
+                blunders[piece] += blunder
+                annotations.append({'ply': ply, 'player': piece, 'move': move, 'best': best,
+                                    'score': scores[move], 'best_score': scores[best], 'blunder': blunder})
+            yield number, {'game': number, 'result': record.result, 'blunders': blunders, 'moves': annotations}
+
+    def analyze_log(self, log_path, output_path, progress=None):
+        """Annotate every game of a record log into JSON lines at output_path
+
+        Games already in the output are skipped, so an interrupted run resumes
+        where it stopped; a last line cut off mid-write is dropped and its
+        game annotated again. Returns the number of games annotated.
+        """
+        done = 0
+        try:
+            with open(output_path, 'r+b') as f:
+                data = f.read()
+                complete = data.rfind(b'\n') + 1
+                f.truncate(complete)
+                done = sum(1 for line in data[:complete].splitlines() if line.strip())
+        except FileNotFoundError:
+            pass
+
+        reader = RecordReader(log_path)
+        annotated = 0
+        self.start()
+        try:
+            with open(output_path, 'a') as output:
+                for start in range(done, len(reader), self.batch_games):
+                    games = [(n, reader[n]) for n in range(start, min(start + self.batch_games, len(reader)))]
+                    for number, annotation in self.analyze_batch(games):
+                        output.write(json.dumps(annotation) + '\n')
+                        annotated += 1
+                    output.flush()
+                    if progress is not None:
+                        progress(games[-1][0] + 1, len(reader))
+        finally:
+            self.close()
+            reader.close()
+        return annotated
+
+def main():
+    parser = argparse.ArgumentParser(description="Grade every move of recorded games and flag blunders")
+    parser.add_argument('log', help="game record log written by board.records")
+    parser.add_argument('output', help="JSON lines file annotations are appended to")
+    parser.add_argument('--depth', type=int, default=6)
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--threshold', type=int, default=100, help="score loss that counts as a blunder")
+    parser.add_argument('--batch-games', type=int, default=64)
+    args = parser.parse_args()
+
+    analyzer = GameAnalyzer(args.depth, args.processes, args.threshold, args.batch_games)
+
+    def progress(done, total):
+        print(f"{done}/{total} games annotated")
+
+    count = analyzer.analyze_log(args.log, args.output, progress)
+    print(f"Annotated {count} games: {analyzer.positions} moves, {analyzer.searched} positions searched")
+
+if __name__ == '__main__':
+    main()
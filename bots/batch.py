@@ -0,0 +1,50 @@
+from concurrent.futures import ProcessPoolExecutor
+from board.board import Board
+
+# The bot of a batch worker process, built once by init_batch_worker
+_worker = {}
+
+def init_batch_worker(factory):
+    cls, args, kwargs = factory
+    _worker['bot'] = cls(*args, **kwargs)
+
+def search_encoded_chunk(chunk):
+    """Search a chunk of encoded boards with this worker's bot"""
+    return _worker['bot'].search_chunk([Board.from_bytes(data, geometry) for data, geometry in chunk])
+
+class BatchSearch:
+    """Mixin adding a batch move API on top of a bot's ``search_position``
+
+    ``search_position(board)`` must return a ``(move, score)`` pair and must
+    not disturb the state the bot keeps for its current game. Scores are on
+    the bot's own scale. For process pools, ``batch_factory()`` must return
+    a picklable ``(class, args, kwargs)`` that builds an equivalent bot.
+    """
+
+    def get_moves(self, boards, processes=None, chunksize=32):
+        """Return a (move, score) pair for every board, in input order
+
+        All positions are searched by this bot, so its caches are shared across
+        the batch. With ``processes`` > 1 the batch is split into chunks that are
+        searched in a process pool. Each worker builds its own bot once from
+        batch_factory and shares its caches across all its chunks.
+        """
+        boards = list(boards)
+        if not processes or processes <= 1 or len(boards) <= chunksize:
+            return self.search_chunk(boards)
+
+        # Boards cross the process boundary in their compact byte encoding
+        encoded = [(board.to_bytes(), board.geometry) for board in boards]
+        chunks = [encoded[i:i + chunksize] for i in range(0, len(encoded), chunksize)]
+        results = []
+        with ProcessPoolExecutor(max_workers=processes, initializer=init_batch_worker,
+                                 initargs=(self.batch_factory(),)) as pool:
+            for chunk_results in pool.map(search_encoded_chunk, chunks):
+                results.extend(chunk_results)
+        return results
+
+    def batch_factory(self):
+        raise NotImplementedError(f"{type(self).__name__} cannot search batches in worker processes")
+
+    def search_chunk(self, boards):
+        return [self.search_position(board) for board in boards]
@@ -1,61 +1,62 @@
+import json
+import numpy as np
+
+def load_weights(weights, section):
+	"""Weights from a dict, or from ``section`` of a JSON file written by bots.tuning"""
+	if isinstance(weights, str):
+		with open(weights) as f:
+			weights = json.load(f)[section]
+	return weights
+
 class Evaluation:
-	def __init__(self, piece):
+	WEIGHTS = {'center': 3, 'four': 200, 'three': 20, 'two': 5, 'opp_three': -20, 'opp_four': -200}
+
+	def __init__(self, piece, weights=None):
 		self.bot_piece = piece
 		if self.bot_piece == 1:
 			self.opp_piece = 2
 		else:
 			self.opp_piece = 1
+		self.weights = dict(self.WEIGHTS)
+		if weights is not None:
+			self.weights.update(load_weights(weights, 'evaluation'))
 
 	def evaluate_window(self, board, window):
+		# 'four', 'three' and 'two' are full, one short and two short of the board's line length
+		length = board.WINDOW_LENGTH
 		score = 0
-		if window.count(self.bot_piece) == 4:
-			score += 200
-		elif window.count(self.bot_piece) == 3 and window.count(board.EMPTY) == 1:
-			score += 20
-		elif window.count(self.bot_piece) == 2 and window.count(board.EMPTY) == 2:
-			score += 5
-
-		if window.count(self.opp_piece) == 3 and window.count(board.EMPTY) == 1:
-			score -= 20
-
-		if window.count(self.opp_piece) == 4:
-			score -= 200
+		if window.count(self.bot_piece) == length:
+			score += self.weights['four']
+		elif window.count(self.bot_piece) == length - 1 and window.count(board.EMPTY) == 1:
+			score += self.weights['three']
+		elif window.count(self.bot_piece) == length - 2 and window.count(board.EMPTY) == 2:
+			score += self.weights['two']
+
+		if window.count(self.opp_piece) == length - 1 and window.count(board.EMPTY) == 1:
+			score += self.weights['opp_three']
+
+		if window.count(self.opp_piece) == length:
+			score += self.weights['opp_four']
 		return score
 
 	def score_position(self, board):
-		score = 0
-
-		## Score center column
-		center_array = [int(i) for i in list(board.get_board()[:, board.COLUMN_COUNT//2])]
-		center_count = center_array.count(self.bot_piece)
-		score += center_count * 3
-
-		## Score Horizontal
-		for r in range(board.ROW_COUNT):
-			row_array = [int(i) for i in list(board.get_board()[r,:])]
-			for c in range(board.COLUMN_COUNT-3):
-				window = row_array[c:c+board.WINDOW_LENGTH]
-				score += self.evaluate_window(board, window)
-
-		## Score Vertical
-		for c in range(board.COLUMN_COUNT):
-			col_array = [int(i) for i in list(board.get_board()[:,c])]
-			for r in range(board.ROW_COUNT-3):
-				window = col_array[r:r+board.WINDOW_LENGTH]
-				score += self.evaluate_window(board, window)
-
-		## Score positive sloped diagonal
-		for r in range(board.ROW_COUNT-3):
-			for c in range(board.COLUMN_COUNT-3):
-				window = [board.get_board()[r+i][c+i] for i in range(board.WINDOW_LENGTH)]
-				score += self.evaluate_window(board, window)
-
-		## Score negative sloped diagonal
-		for r in range(board.ROW_COUNT-3):
-			for c in range(board.COLUMN_COUNT-3):
-				window = [board.get_board()[r+3-i][c+i] for i in range(board.WINDOW_LENGTH)]
-				score += self.evaluate_window(board, window)
-
+		# Scores every window at once from the board's precomputed window table;
+		# equivalent to summing evaluate_window over each window.
+		cells = board.get_board()
+		weights = self.weights
+		score = int(np.count_nonzero(cells[:, board.COLUMN_COUNT//2] == self.bot_piece)) * weights['center']
+
+		windows = cells.ravel()[board.get_windows()]
+		bot = np.count_nonzero(windows == self.bot_piece, axis=1)
+		opp = np.count_nonzero(windows == self.opp_piece, axis=1)
+		length = board.WINDOW_LENGTH
+		empty = length - bot - opp
+
+		score += weights['four'] * int(np.count_nonzero(bot == length))
+		score += weights['three'] * int(np.count_nonzero((bot == length - 1) & (empty == 1)))
+		score += weights['two'] * int(np.count_nonzero((bot == length - 2) & (empty == 2)))
+		score += weights['opp_three'] * int(np.count_nonzero((opp == length - 1) & (empty == 1)))
+		score += weights['opp_four'] * int(np.count_nonzero(opp == length))
 		return score
 
 	def is_terminal_node(self, board):
@@ -1,15 +1,30 @@
-import pygame
 import math
 import sys
-from board.graphics import GBoard
+
+# pygame and the graphics module are loaded when the first Human is created,
+# so importing this module stays headless
+pygame = None
+GBoard = EventLoop = None
+
+def init_graphics():
+    global pygame, GBoard, EventLoop
+    if pygame is None:
+        import pygame as pygame_module
+        from board.graphics import GBoard as gboard_class, EventLoop as event_loop_class
+        pygame, GBoard, EventLoop = pygame_module, gboard_class, event_loop_class
 
 class Human:
     def __init__(self, piece, colour = None):
+        init_graphics()
         self.piece = piece
         self.colour = colour
+        self.gb = None
+        self.event_loop = EventLoop()
 
     def get_move(self, board):
-        gb = GBoard(board)
+        if self.gb is None:
+            self.gb = GBoard(board)
+        gb = self.gb
         gb.draw_gboard(board)
 
         if self.colour == None:
@@ -19,7 +34,7 @@ class Human:
                 self.colour = gb.YELLOW
 
         while True:
-            for event in pygame.event.get():
+            for event in self.event_loop.events():
                 if event.type == pygame.QUIT:
                     sys.exit()
 
@@ -27,11 +42,13 @@ class Human:
                     gb.draw_rect(gb.BLACK, (0, 0, gb.width, gb.SQUARESIZE))
                     posx = event.pos[0]
                     gb.draw_circle(self.colour, (posx, int(gb.SQUARESIZE/2)), gb.RADIUS)
-
-                gb.update_gboard()
+                    self.event_loop.mark_dirty()
 
                 if event.type == pygame.MOUSEBUTTONDOWN:
                     gb.draw_rect(gb.BLACK, (0, 0, gb.width, gb.SQUARESIZE))
+                    gb.update_gboard()
                     posx = event.pos[0]
                     col = int(math.floor(posx/gb.SQUARESIZE))
                     return col
+
+            self.event_loop.flip()
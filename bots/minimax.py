@@ -1,14 +1,111 @@
 import random
 import math
+import time
 from bots.evaluation import Evaluation
+from bots.batch import BatchSearch
+from bots.transposition import TranspositionTable, LayeredTranspositionTable, PersistentTranspositionTable
+from bots.opening_book import OpeningBook
+from bots.solver import Solver
+from bots.parallel import LazySMP
 
-class MiniMaxBot(Evaluation):
-	def __init__(self, piece, depth=5):
-		super().__init__(piece)
+class SearchAborted(Exception):
+	"""Raised inside minimax when the deadline passes or a stop is requested"""
+
+class MiniMaxBot(Evaluation, BatchSearch):
+	def __init__(self, piece, depth=5, book=None, solver_threshold=12, workers=1, time_limit=None, cache=None, weights=None):
+		super().__init__(piece, weights)
 		self.depth = depth
+		self.tt = TranspositionTable()
+		if cache is not None:
+			# Warm-start from, and write back to, a persistent on-disk table
+			self.tt = LayeredTranspositionTable(self.tt, PersistentTranspositionTable(cache))
+		self.book = OpeningBook(book) if isinstance(book, str) else book
+		# Positions with fewer empty cells than this are solved exactly
+		self.solver_threshold = solver_threshold
+		self.solver = Solver()
+		# With more than one worker the search runs as Lazy SMP, see bots.parallel
+		self.workers = workers
+		self.time_limit = time_limit
+		self.smp = None
+		self.deadline = None
+		self.stop_event = None
+		self.nodes = 0
+
+	def __getstate__(self):
+		# Worker pools and shared memory stay with the process that created them
+		state = self.__dict__.copy()
+		state['smp'] = None
+		state['stop_event'] = None
+		return state
+
+	def batch_factory(self):
+		"""Constructor arguments of a single-process copy of this bot, see BatchSearch"""
+		cache = self.tt.backing.path if isinstance(self.tt, LayeredTranspositionTable) else None
+		return type(self), (self.bot_piece, self.depth), {
+			'book': self.book.path if self.book is not None else None, 'solver_threshold': self.solver_threshold,
+			'time_limit': self.time_limit, 'cache': cache, 'weights': self.weights}
+
+	def check_abort(self):
+		self.nodes += 1
+		if self.nodes & 255 == 0:
+			if self.deadline is not None and time.monotonic() > self.deadline:
+				raise SearchAborted()
+			if self.stop_event is not None and self.stop_event.is_set():
+				raise SearchAborted()
+
+	def solver_move(self, board):
+		"""Exact (column, score) once few enough cells remain, else None
+
+		Solver scores count the stones left when the game is decided: positive
+		wins, negative losses and 0 draws.
+		"""
+		empty = board.ROW_COUNT * board.COLUMN_COUNT - board.num_slots_filled
+		if empty >= self.solver_threshold or board.CURR_PLAYER != self.bot_piece or super().is_terminal_node(board):
+			return None
+		if not self.solver.matches(board):
+			self.solver = Solver.for_board(board)
+		return self.solver.best_move(board)
+
+	def book_move(self, board):
+		if self.book is None or board.CURR_PLAYER != self.bot_piece:
+			return None
+		return self.book.lookup(board)
 
-	def minimax(self, board, depth, alpha, beta, maximizingPlayer):
-		valid_locations = board.get_valid_locations()
+	def tt_key(self, board, maximizingPlayer):
+		"""Mirror-normalised table key and whether board is the mirrored orientation"""
+		key, mirrored = board.canonical_key()
+		return (key, maximizingPlayer), mirrored
+
+	def minimax(self, board, depth, alpha, beta, maximizingPlayer, moves=None, analysis=None):
+		"""(column, score) of the best move, from the bot's side
+
+		With an ``analysis`` dict the root's moves are all searched with the
+		full window and unpruned, and their exact scores stored in it by column.
+		A root limited to ``moves`` is neither cut off by nor stored in the
+		table, since its score only holds for that subset.
+		"""
+		self.check_abort()
+		key, mirrored = self.tt_key(board, maximizingPlayer)
+		entry = self.tt.get(key)
+		tt_move = None
+		if entry is not None:
+			tt_depth, flag, tt_value, tt_move = entry
+			if mirrored and tt_move is not None:
+				tt_move = board.mirror_column(tt_move)
+			if tt_depth >= depth and analysis is None and moves is None:
+				if flag == TranspositionTable.EXACT:
+					return tt_move, tt_value
+				elif flag == TranspositionTable.LOWER:
+					alpha = max(alpha, tt_value)
+				else:
+					beta = min(beta, tt_value)
+				if alpha >= beta:
+					return tt_move, tt_value
+
+		# Mirror-image moves of a symmetric position lead to equivalent subtrees
+		valid_locations = board.get_distinct_locations()
+		if moves is not None:
+			valid_locations = [col for col in moves if col in valid_locations]
 		is_terminal = super().is_terminal_node(board)
 
 		if depth == 0 or is_terminal:
@@ -22,13 +119,27 @@ class MiniMaxBot(Evaluation):
 			else: # Depth is zero
 				return (None, super().score_position(board))
 
+		# Drops that let the opponent win on top of them are not searched
+		if analysis is None:
+			safe = board.get_safe_locations(self.bot_piece if maximizingPlayer else self.opp_piece)
+			valid_locations = [col for col in valid_locations if col in safe] or valid_locations
+
+		# Search the transposition table's best move first
+		if tt_move in valid_locations:
+			valid_locations.remove(tt_move)
+			valid_locations.insert(0, tt_move)
+
+		alpha_orig, beta_orig = alpha, beta
 		if maximizingPlayer:
 			value = -math.inf
 			column = random.choice(valid_locations)
 			for col in valid_locations:
 				b_copy = board.copy_board()
 				b_copy.drop_piece(col, self.bot_piece)
-				new_score = self.minimax(b_copy, depth-1, alpha, beta, False)[1]
+				if analysis is None:
+					new_score = self.minimax(b_copy, depth-1, alpha, beta, False)[1]
+				else:
+					new_score = analysis[col] = self.minimax(b_copy, depth-1, alpha_orig, beta_orig, False)[1]
 
 				if new_score > value:
 					value = new_score
@@ -37,7 +148,6 @@ class MiniMaxBot(Evaluation):
 				alpha = max(alpha, value)
 				if alpha >= beta:
 					break
-			return column, value
 		else: # Minimizing player
 			value = math.inf
 			column = random.choice(valid_locations)
@@ -53,8 +163,138 @@ class MiniMaxBot(Evaluation):
 				beta = min(beta, value)
 				if alpha >= beta:
 					break
-			return column, value
+
+		if value <= alpha_orig:
+			flag = TranspositionTable.UPPER
+		elif value >= beta_orig:
+			flag = TranspositionTable.LOWER
+		else:
+			flag = TranspositionTable.EXACT
+		if moves is None:
+			self.tt.store(key, depth, flag, value, board.mirror_column(column) if mirrored else column)
+		return column, value
+
+	def principal_variation(self, board, maximizingPlayer, length):
+		"""Follow best moves stored in the transposition table from board"""
+		pv = []
+		board = board.copy_board()
+		while len(pv) < length:
+			key, mirrored = self.tt_key(board, maximizingPlayer)
+			entry = self.tt.get(key)
+			if entry is None or entry[3] is None:
+				break
+			col = board.mirror_column(entry[3]) if mirrored else entry[3]
+			if not board.is_valid_location(col):
+				break
+			pv.append(col)
+			board.drop_piece(col, self.bot_piece if maximizingPlayer else self.opp_piece)
+			if super().is_terminal_node(board):
+				break
+			maximizingPlayer = not maximizingPlayer
+		return pv
+
+	def analyze(self, board, budget=None):
+		"""Score every legal move with one search to depth ``budget``
+
+		Returns one dict per column with its score and principal variation, best
+		first. The root's moves are searched with the full window, so every
+		score is exact; variations are read back from the transposition table.
+		"""
+		depth = max(1, self.depth if budget is None else budget)
+		if super().is_terminal_node(board):
+			return []
+		scores = {}
+		self.minimax(board, depth, -math.inf, math.inf, True, analysis=scores)
+		analysis = []
+		for col in board.get_valid_locations():
+			# Mirror-image moves of a symmetric position are searched once
+			score = scores[col] if col in scores else scores[board.mirror_column(col)]
+			b_copy = board.copy_board()
+			b_copy.drop_piece(col, self.bot_piece)
+			pv = [col]
+			if not super().is_terminal_node(b_copy):
+				pv += self.principal_variation(b_copy, False, depth-1)
+			analysis.append({'move': col, 'score': score, 'pv': pv})
+		return sorted(analysis, key=lambda x: x['score'], reverse=True)
+
+	def forced_move(self, board):
+		"""(column, score) when the bot can win at once or has a single threat to block
+
+		A block is scored by searching the opponent's replies one ply short of
+		the bot's depth, so its score is on the same scale as a full search.
+		"""
+		if super().is_terminal_node(board):
+			return None
+		wins, blocks = board.get_threats(self.bot_piece)
+		if wins:
+			return wins[0], 100000000000000
+		if len(blocks) == 1:
+			b_copy = board.copy_board()
+			b_copy.drop_piece(blocks[0], self.bot_piece)
+			return blocks[0], self.minimax(b_copy, self.depth - 1, -math.inf, math.inf, False)[1]
+		return None
+
+	def iterative_deepening(self, board, max_depth, moves=None):
+		"""Search to depth 1, 2, ... max_depth until aborted
+
+		Returns (depth, column, value) of the deepest completed iteration, or
+		None if not even depth 1 finished.
+		"""
+		best = None
+		for depth in range(1, max_depth + 1):
+			started = time.monotonic()
+			try:
+				col, value = self.minimax(board, depth, -math.inf, math.inf, True, moves)
+			except SearchAborted:
+				break
+			best = (depth, col, value)
+			if moves is not None:
+				# A root limited to moves is not in the table, so keep its best move first here
+				moves = [col] + [move for move in moves if move != col]
+			if abs(value) >= 10000000000000:
+				# A forced win or loss was found; deeper search cannot change it
+				break
+			if self.deadline is not None and time.monotonic() + 3 * (time.monotonic() - started) > self.deadline:
+				# The next iteration would most likely be aborted unfinished
+				break
+		return best
+
+	def set_time_budget(self, seconds):
+		"""Search by iterative deepening for up to seconds per move instead of to a fixed depth"""
+		self.time_limit = seconds
+
+	def timed_search(self, board, moves):
+		"""Iteratively deepen until time_limit runs out"""
+		self.deadline = time.monotonic() + self.time_limit
+		try:
+			best = self.iterative_deepening(board, board.ROW_COUNT * board.COLUMN_COUNT - board.num_slots_filled, moves)
+		finally:
+			self.deadline = None
+		if best is None:
+			# Not even depth 1 finished; fall back to the first candidate
+			return moves[0], 0
+		return best[1], best[2]
+
+	def search_position(self, board):
+		hit = self.forced_move(board) or self.book_move(board) or self.solver_move(board)
+		if hit is not None:
+			return hit
+		# Drops that let the opponent win on top of them are not searched
+		moves = board.get_safe_locations(self.bot_piece)
+		if self.workers > 1:
+			if self.smp is None:
+				self.smp = LazySMP(self.workers)
+			return self.smp.search(board, self.bot_piece, self.depth, self.time_limit, self.weights, moves)
+		if self.time_limit is not None:
+			return self.timed_search(board, moves)
+		return self.minimax(board, self.depth, -math.inf, math.inf, True, moves)
+
+	def close(self):
+		"""Shut down the Lazy SMP workers, if any were started"""
+		if self.smp is not None:
+			self.smp.close()
+			self.smp = None
 
 	def get_move(self, board):
-		col, minimax_score = self.minimax(board, self.depth, -math.inf, math.inf, True)
+		col, minimax_score = self.search_position(board)
 		return col
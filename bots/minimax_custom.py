@@ -1,72 +1,83 @@
+import time
 import numpy as np
 from board.board import Board
+from bots.batch import BatchSearch
+from bots.minimax import SearchAborted
+from bots.evaluation import load_weights
 
-class MinimaxCustom:
-    def __init__(self, depth=4):
+class MinimaxCustom(BatchSearch):
+    WEIGHTS = {'center': 10, 'four': 10000, 'opp_three': -5000, 'three': 500, 'opp_two': -250, 'two': 100}
+
+    def __init__(self, piece, depth=4, weights=None, time_limit=None):
+        self.bot_piece = piece
+        self.opp_piece = Board.PLAYER1_PIECE if piece == Board.PLAYER2_PIECE else Board.PLAYER2_PIECE
         self.depth = depth
+        self.weights = dict(self.WEIGHTS)
+        # With a time limit the search deepens iteratively until it runs out
+        self.time_limit = time_limit
+        self.deadline = None
+        self.nodes = 0
+        # Principal variation of the last node searched at each remaining depth
+        self.pv = {}
         self.powerup_weights = {
             Board.REMOVE_PIECE: 5,    # Removing a piece can be very strategic
             Board.GRAVITY_FLIP: 6,    # Gravity flip can completely change the game state
             Board.SWAP_COLOR: 4,      # Color swap can be powerful in certain situations
             Board.DOUBLE_MOVE: 8      # Double move gives an extra turn
         }
+        if weights is not None:
+            # Tuned window weights, and optionally powerup weights keyed by powerup number
+            weights = dict(load_weights(weights, 'minimax_custom'))
+            for powerup, weight in weights.pop('powerups', {}).items():
+                self.powerup_weights[int(powerup)] = weight
+            self.weights.update(weights)
 
     def evaluate_window(self, window, piece):
         score = 0
         opp_piece = Board.PLAYER1_PIECE if piece == Board.PLAYER2_PIECE else Board.PLAYER2_PIECE
+        # Windows are as long as the board's lines; 'four' is a full one
+        length = len(window)
 
         # Prioritize winning moves
-        if window.count(piece) == 4:
-            score += 10000
+        if window.count(piece) == length:
+            score += self.weights['four']
         # Prioritize blocking opponent's winning moves
-        elif window.count(opp_piece) == 3 and window.count(Board.EMPTY) == 1:
-            score -= 5000
+        elif window.count(opp_piece) == length - 1 and window.count(Board.EMPTY) == 1:
+            score += self.weights['opp_three']
         # Prioritize creating winning opportunities
-        elif window.count(piece) == 3 and window.count(Board.EMPTY) == 1:
-            score += 500
+        elif window.count(piece) == length - 1 and window.count(Board.EMPTY) == 1:
+            score += self.weights['three']
         # Prioritize blocking opponent's opportunities
-        elif window.count(opp_piece) == 2 and window.count(Board.EMPTY) == 2:
-            score -= 250
+        elif window.count(opp_piece) == length - 2 and window.count(Board.EMPTY) == 2:
+            score += self.weights['opp_two']
         # Encourage building up pieces
-        elif window.count(piece) == 2 and window.count(Board.EMPTY) == 2:
-            score += 100
+        elif window.count(piece) == length - 2 and window.count(Board.EMPTY) == 2:
+            score += self.weights['two']
 
         return score
 
     def score_position(self, board, piece):
-        score = 0
+        # Vectorised over the board's window table; equivalent to summing
+        # evaluate_window over each window
         board_array = board.get_board()
+        opp_piece = Board.PLAYER1_PIECE if piece == Board.PLAYER2_PIECE else Board.PLAYER2_PIECE
 
         # Score center column (more weight)
-        center_array = [int(i) for i in list(board_array[:, Board.COLUMN_COUNT//2])]
-        center_count = center_array.count(piece)
-        score += center_count * 10
-
-        # Score Horizontal
-        for r in range(Board.ROW_COUNT):
-            row_array = [int(i) for i in list(board_array[r,:])]
-            for c in range(Board.COLUMN_COUNT-3):
-                window = row_array[c:c+Board.WINDOW_LENGTH]
-                score += self.evaluate_window(window, piece)
-
-        # Score Vertical
-        for c in range(Board.COLUMN_COUNT):
-            col_array = [int(i) for i in list(board_array[:,c])]
-            for r in range(Board.ROW_COUNT-3):
-                window = col_array[r:r+Board.WINDOW_LENGTH]
-                score += self.evaluate_window(window, piece)
-
-        # Score positive sloped diagonal
-        for r in range(Board.ROW_COUNT-3):
-            for c in range(Board.COLUMN_COUNT-3):
-                window = [board_array[r+i][c+i] for i in range(Board.WINDOW_LENGTH)]
-                score += self.evaluate_window(window, piece)
-
-        # Score negative sloped diagonal
-        for r in range(Board.ROW_COUNT-3):
-            for c in range(Board.COLUMN_COUNT-3):
-                window = [board_array[r+3-i][c+i] for i in range(Board.WINDOW_LENGTH)]
-                score += self.evaluate_window(window, piece)
+        weights = self.weights
+        score = int(np.count_nonzero(board_array[:, board.COLUMN_COUNT//2] == piece)) * weights['center']
+
+        windows = board_array.ravel()[board.get_windows()]
+        own = np.count_nonzero(windows == piece, axis=1)
+        opp = np.count_nonzero(windows == opp_piece, axis=1)
+        length = board.WINDOW_LENGTH
+        empty = length - own - opp
+
+        # The cases of evaluate_window are mutually exclusive, so they can be summed
+        score += weights['four'] * int(np.count_nonzero(own == length))
+        score += weights['opp_three'] * int(np.count_nonzero((opp == length - 1) & (empty == 1)))
+        score += weights['three'] * int(np.count_nonzero((own == length - 1) & (empty == 1)))
+        score += weights['opp_two'] * int(np.count_nonzero((opp == length - 2) & (empty == 2)))
+        score += weights['two'] * int(np.count_nonzero((own == length - 2) & (empty == 2)))
 
         return score
 
@@ -79,26 +90,25 @@ class MinimaxCustom:
         # Apply the powerup
         success = board_copy.use_powerup(powerup_type, piece, **kwargs)
         if not success:
-            return float('-inf') if piece == board.PLAYER1_PIECE else float('inf')
+            return float('-inf')
         
         # For swap color, we need to evaluate the board after the opponent's move
         if powerup_type == Board.SWAP_COLOR:
             # Only consider swapping if it improves our position
             new_score = self.score_position(board_copy, piece)
             if new_score <= original_score:
-                return float('-inf') if piece == board.PLAYER1_PIECE else float('inf')
+                return float('-inf')
             
             # Simulate opponent's move
             valid_locations = board_copy.get_valid_locations()
             if valid_locations:
-                # Find the best move for the opponent
+                # The opponent picks the reply that is worst for piece
                 opp_piece = board_copy.get_opp_player(piece)
-                best_score = float('-inf') if opp_piece == board.PLAYER1_PIECE else float('inf')
+                best_score = float('inf')
                 for col in valid_locations:
                     board_copy.drop_piece(col, opp_piece)
                     score = self.score_position(board_copy, piece)
-                    if (opp_piece == board.PLAYER1_PIECE and score > best_score) or \
-                       (opp_piece == board.PLAYER2_PIECE and score < best_score):
+                    if score < best_score:
                         best_score = score
                     # Undo the move
                     board_copy.undo_move(col)
@@ -114,7 +124,7 @@ class MinimaxCustom:
                 else:
                     new_score = self.score_position(board_copy, piece)
             else:
-                return float('-inf') if piece == board.PLAYER1_PIECE else float('inf')
+                return float('-inf')
         else:
             new_score = self.score_position(board_copy, piece)
         
@@ -123,7 +133,11 @@ class MinimaxCustom:
         return score_diff * self.powerup_weights[powerup_type]
 
     def get_valid_powerup_moves(self, board, piece):
-        """Get all valid powerup moves"""
+        """Valid powerup moves for piece, best first by evaluate_powerup
+
+        Only a few powerups are evaluated per position; the evaluation orders
+        the moves, the search decides between them.
+        """
         valid_moves = []
         available_powerups = board.get_available_powerups(piece)
         
@@ -141,115 +155,192 @@ class MinimaxCustom:
                 
             if powerup == Board.REMOVE_PIECE:
                 # Try removing a piece from each column
-                for col in range(Board.COLUMN_COUNT):
+                for col in range(board.COLUMN_COUNT):
                     if evaluations >= max_evaluations:
                         break
                     if not board.is_valid_location(col):
                         score = self.evaluate_powerup(board, powerup, piece, col=col)
-                        valid_moves.append(('powerup', powerup, {'col': col, 'score': score}))
+                        valid_moves.append((score, ('powerup', powerup, {'col': col})))
                         evaluations += 1
             
             elif powerup == Board.GRAVITY_FLIP:
                 score = self.evaluate_powerup(board, powerup, piece)
-                valid_moves.append(('powerup', powerup, {'score': score}))
+                valid_moves.append((score, ('powerup', powerup, {})))
                 evaluations += 1
             
             elif powerup == Board.SWAP_COLOR:
                 # Try swapping colors in each row and column
-                for i in range(Board.ROW_COUNT):
+                for i in range(board.ROW_COUNT):
                     if evaluations >= max_evaluations:
                         break
                     score = self.evaluate_powerup(board, powerup, piece, is_row=True, index=i)
-                    valid_moves.append(('powerup', powerup, {'is_row': True, 'index': i, 'score': score}))
+                    valid_moves.append((score, ('powerup', powerup, {'is_row': True, 'index': i})))
                     evaluations += 1
                 
-                for i in range(Board.COLUMN_COUNT):
+                for i in range(board.COLUMN_COUNT):
                     if evaluations >= max_evaluations:
                         break
                     score = self.evaluate_powerup(board, powerup, piece, is_row=False, index=i)
-                    valid_moves.append(('powerup', powerup, {'is_row': False, 'index': i, 'score': score}))
+                    valid_moves.append((score, ('powerup', powerup, {'is_row': False, 'index': i})))
                     evaluations += 1
             
             elif powerup == Board.DOUBLE_MOVE:
                 # Try enabling double move for each valid column
-                for col in range(Board.COLUMN_COUNT):
+                for col in range(board.COLUMN_COUNT):
                     if evaluations >= max_evaluations:
                         break
                     if board.is_valid_location(col):
                         score = self.evaluate_powerup(board, powerup, piece, col=col)
-                        valid_moves.append(('powerup', powerup, {'col': col, 'score': score}))
+                        valid_moves.append((score, ('powerup', powerup, {'col': col})))
                         evaluations += 1
         
-        return valid_moves
+        valid_moves.sort(key=lambda x: x[0], reverse=True)
+        return [move for score, move in valid_moves if score != float('-inf')]
 
-    def minimax(self, board, depth, alpha, beta, maximizingPlayer):
-        valid_locations = board.get_valid_locations()
-        is_terminal = board.winning_move(board.PLAYER1_PIECE) or board.winning_move(board.PLAYER2_PIECE) or len(valid_locations) == 0
-        
-        if depth == 0 or is_terminal:
-            if is_terminal:
-                if board.winning_move(board.PLAYER1_PIECE):
-                    return (None, 100000000000000)
-                elif board.winning_move(board.PLAYER2_PIECE):
-                    return (None, -100000000000000)
-                else:  # Game is over, no more valid moves
-                    return (None, 0)
-            else:  # Depth is zero
-                return (None, self.score_position(board, board.PLAYER1_PIECE))
-
-        if maximizingPlayer:
-            value = float('-inf')
-            column = valid_locations[0]
-            
-            # First check regular moves
-            for col in valid_locations:
-                board_copy = board.copy_board()
-                board_copy.drop_piece(col, board.PLAYER1_PIECE)
-                new_score = self.minimax(board_copy, depth-1, alpha, beta, False)[1]
+    def check_abort(self):
+        self.nodes += 1
+        if self.deadline is not None and self.nodes & 255 == 0 and time.monotonic() > self.deadline:
+            raise SearchAborted()
+
+    def own_turn(self, board):
+        """A copy of board with this bot as the side to move
+
+        The game does not pass the turn after a powerup, so the board can
+        still name the opponent when this bot is asked for a move.
+        """
+        board = board.copy_board()
+        board.CURR_PLAYER = self.bot_piece
+        board.PREV_PLAYER = self.opp_piece
+        return board
+
+    def search_moves(self, board, piece, depth, prune=True):
+        """Moves searched for piece: the pending double-move drop, or safe drops and, above depth 1, powerups"""
+        if board.double_move_available[piece]:
+            col = board.double_move_column[piece]
+            return [col] if board.is_valid_location(col) else []
+        # Drops that let the opponent win on top of them are not searched
+        moves = board.get_safe_locations(piece) if prune else board.get_valid_locations()
+        if depth > 1 and moves:
+            moves += self.get_valid_powerup_moves(board, piece)
+        return moves
+
+    def minimax(self, board, depth, alpha, beta, maximizingPlayer, analysis=None):
+        """(move, score) for the side to move, scored from bot_piece's side
+
+        maximizingPlayer is whether bot_piece is to move. Moves are played
+        with Board.apply_move, so each side only has its own unused powerups
+        and a double move keeps the turn for its drop. self.pv[depth] is left
+        holding the node's principal variation. With an ``analysis`` list the
+        node's moves are all searched with the full window and unpruned, and
+        each one's exact score and variation appended to it.
+        """
+        self.check_abort()
+        self.pv[depth] = []
+        winner = board.get_winner()
+        if winner is not None:
+            return (None, 100000000000000 if winner == self.bot_piece else -100000000000000)
+        piece = self.bot_piece if maximizingPlayer else self.opp_piece
+        moves = self.search_moves(board, piece, depth, prune=analysis is None)
+        if not moves:  # Game is over, no more valid moves
+            return (None, 0)
+        if depth == 0:
+            return (None, self.score_position(board, self.bot_piece))
+
+        value = float('-inf') if maximizingPlayer else float('inf')
+        column = moves[0]
+        window = (alpha, beta)
+        for move in moves:
+            board_copy = board.copy_board()
+            board_copy.apply_move(move)
+            child_alpha, child_beta = window if analysis is not None else (alpha, beta)
+            new_score = self.minimax(board_copy, depth-1, child_alpha, child_beta, board_copy.CURR_PLAYER == self.bot_piece)[1]
+            if analysis is not None:
+                analysis.append({'move': move, 'score': new_score, 'pv': [move] + self.pv[depth-1]})
+            if maximizingPlayer:
                 if new_score > value:
                     value = new_score
-                    column = col
+                    column = move
+                    self.pv[depth] = [move] + self.pv[depth-1]
                 alpha = max(alpha, value)
-                if alpha >= beta:
-                    break
-            
-            # Then check powerup moves if depth > 1
-            if depth > 1:
-                powerup_moves = self.get_valid_powerup_moves(board, board.PLAYER1_PIECE)
-                for move_type, powerup, params in powerup_moves:
-                    if params['score'] > value:
-                        value = params['score']
-                        column = ('powerup', powerup, params)
-            
-            return column, value
-
-        else:  # Minimizing player
-            value = float('inf')
-            column = valid_locations[0]
-            
-            # First check regular moves
-            for col in valid_locations:
-                board_copy = board.copy_board()
-                board_copy.drop_piece(col, board.PLAYER2_PIECE)
-                new_score = self.minimax(board_copy, depth-1, alpha, beta, True)[1]
+            else:
                 if new_score < value:
                     value = new_score
-                    column = col
+                    column = move
+                    self.pv[depth] = [move] + self.pv[depth-1]
                 beta = min(beta, value)
-                if alpha >= beta:
+            if alpha >= beta:
+                break
+        return column, value
+
+    def analyze(self, board, budget=None):
+        """Score every regular and powerup move for this bot with one search, best first
+
+        ``budget`` is the search depth and defaults to the bot's depth. The
+        root's moves are searched with the full window, so every score is
+        exact, and each comes with its principal variation. Powerups are the
+        ones the search itself would try.
+        """
+        depth = max(1, self.depth if budget is None else budget)
+        analysis = []
+        self.minimax(self.own_turn(board), depth, float('-inf'), float('inf'), True, analysis)
+        return sorted(analysis, key=lambda x: x['score'], reverse=True)
+
+    def forced_move(self, board):
+        """(move, score) for a pending double move, an immediate win or the only block
+
+        Threats are found for bot_piece: the game does not pass the turn after
+        a powerup, so board.CURR_PLAYER can name the opponent.
+        """
+        piece = self.bot_piece
+        if board.double_move_available[piece]:
+            return board.double_move_column[piece], None
+        if board.winning_move(board.PLAYER1_PIECE) or board.winning_move(board.PLAYER2_PIECE):
+            return None
+        wins, blocks = board.get_threats(piece)
+        if wins:
+            return wins[0], 100000000000000
+        if len(blocks) == 1:
+            board_copy = board.copy_board()
+            board_copy.drop_piece(blocks[0], piece)
+            return blocks[0], self.score_position(board_copy, piece)
+        return None
+
+    def set_time_budget(self, seconds):
+        """Search by iterative deepening for up to seconds per move instead of to a fixed depth"""
+        self.time_limit = seconds
+
+    def batch_factory(self):
+        """Constructor arguments of a copy of this bot, see BatchSearch"""
+        weights = dict(self.weights, powerups=dict(self.powerup_weights))
+        return type(self), (self.bot_piece, self.depth, weights, self.time_limit), {}
+
+    def timed_search(self, board):
+        """Result of the deepest search finished before time_limit runs out"""
+        self.deadline = time.monotonic() + self.time_limit
+        board = self.own_turn(board)
+        best = None
+        try:
+            for depth in range(1, board.ROW_COUNT * board.COLUMN_COUNT - board.num_slots_filled + 1):
+                best = self.minimax(board, depth, float('-inf'), float('inf'), True)
+                if abs(best[1]) >= 100000000000000:
                     break
-            
-            # Then check powerup moves if depth > 1
-            if depth > 1:
-                powerup_moves = self.get_valid_powerup_moves(board, board.PLAYER2_PIECE)
-                for move_type, powerup, params in powerup_moves:
-                    if params['score'] < value:
-                        value = params['score']
-                        column = ('powerup', powerup, params)
-            
-            return column, value
+        except SearchAborted:
+            pass
+        finally:
+            self.deadline = None
+        if best is None:
+            return board.get_valid_locations()[0], None
+        return best
+
+    def search_position(self, board):
+        hit = self.forced_move(board)
+        if hit is not None:
+            return hit
+        if self.time_limit is not None:
+            return self.timed_search(board)
+        return self.minimax(self.own_turn(board), self.depth, float('-inf'), float('inf'), True)
 
     def get_move(self, board):
         """Get the best move considering both regular moves and powerups"""
-        column, _ = self.minimax(board, self.depth, float('-inf'), float('inf'), True)
+        column, _ = self.search_position(board)
         return column 
\ No newline at end of file
@@ -3,52 +3,180 @@ import sys
 import copy
 import time
 import random
+import threading
+from concurrent.futures import wait, FIRST_COMPLETED
+from bots.batch import BatchSearch
+from bots.opening_book import OpeningBook
+from bots.solver import Solver
+from bots.transposition import PersistentTranspositionTable
+from bots.parallel import RolloutPool
 
-class MonteCarloBot():
-    def __init__(self, piece, max_iterations = 20000 , timeout = 2):
+def rollout(state):
+    """Play state out to the end of the game
+
+    Takes immediate wins and blocks immediate losses, otherwise plays randomly.
+    """
+    if state.winning_move(state.PREV_PLAYER):
+        return state
+    while True:
+        valid_locations = state.get_valid_locations()
+        if not valid_locations:
+            break
+        wins, blocks = state.get_threats(state.CURR_PLAYER)
+        if wins:
+            state.drop_piece(wins[0], state.CURR_PLAYER)
+            break
+        col = blocks[0] if blocks else random.choice(valid_locations)
+        state.drop_piece(col, state.CURR_PLAYER)
+    return state
+
+class MonteCarloBot(BatchSearch):
+    def __init__(self, piece, max_iterations = 20000 , timeout = 2, book = None, solver_threshold = 12, cache = None, ponder = False, workers = 1, batch_size = 8):
         self.piece = piece
         self.max_iterations = max_iterations
         self.timeout = timeout
         self.currentNode = None
+        self.book = OpeningBook(book) if isinstance(book, str) else book
+        # Positions with fewer empty cells than this are solved exactly
+        self.solver_threshold = solver_threshold
+        self.solver = Solver()
+        # Root results of earlier searches; an entry backed by at least
+        # 2 ** (cache_min_depth - 1) visits is played without searching
+        self.cache = PersistentTranspositionTable(cache) if cache is not None else None
+        self.cache_min_depth = 10
+        # Opt-in: keep growing currentNode in a background thread during the opponent's turn.
+        # The thread holds the GIL while it searches, so it only pays off against a human
+        self.ponder = ponder
+        self.ponder_thread = None
+        self.ponder_event = None
+        self.ponder_hits = self.ponder_misses = 0
+        # With more than one worker, rollouts run in a RolloutPool while this
+        # process keeps the one tree, batch_size leaves per submitted batch
+        self.workers = workers
+        self.batch_size = batch_size
+        self.rollout_pool = None
+
+    def __getstate__(self):
+        # A running ponder thread and worker pool stay with the process that started them
+        state = self.__dict__.copy()
+        state['ponder_thread'] = None
+        state['ponder_event'] = None
+        state['rollout_pool'] = None
+        return state
+
+    def batch_factory(self):
+        """Constructor arguments of a single-process copy of this bot, see BatchSearch"""
+        return type(self), (self.piece, self.max_iterations, self.timeout), {
+            'book': self.book.path if self.book is not None else None, 'solver_threshold': self.solver_threshold,
+            'cache': self.cache.path if self.cache is not None else None}
+
+    def close(self):
+        """Shut down the rollout workers, if any were started"""
+        self.stop_pondering()
+        if self.rollout_pool is not None:
+            self.rollout_pool.close()
+            self.rollout_pool = None
+
+    def rollout_rates(self):
+        """Rollouts per second of each rollout worker so far"""
+        return self.rollout_pool.rollout_rates() if self.rollout_pool is not None else {}
+
+    def search_tree(self):
+        """Root of the game tree kept in currentNode; every earlier move's nodes stay reachable from it"""
+        node = self.currentNode
+        while node is not None and node.parent is not None:
+            node = node.parent
+        return node
+
+    def start_pondering(self, board):
+        """Search currentNode, the position on board, until stop_pondering is called"""
+        self.stop_pondering()
+        if self.currentNode is None or board.winning_move(board.PREV_PLAYER) or not board.get_valid_locations():
+            return
+        self.ponder_event = threading.Event()
+        self.ponder_thread = threading.Thread(target=self.montecarlo_tree_search,
+                                              args=(board, self.max_iterations, self.currentNode, float('inf'), self.ponder_event),
+                                              daemon=True)
+        self.ponder_thread.start()
+
+    def stop_pondering(self):
+        """Stop the background search; its statistics stay in the tree"""
+        if self.ponder_thread is not None:
+            self.ponder_event.set()
+            self.ponder_thread.join()
+            self.ponder_thread = None
+            self.ponder_event = None
+
+    def set_time_budget(self, seconds):
+        """Search for up to seconds on the next move"""
+        self.timeout = seconds
+
+    def cached_move(self, board):
+        if self.cache is None:
+            return None
+        key, mirrored = board.canonical_key()
+        entry = self.cache.get((key, True))
+        if entry is None or entry[0] < self.cache_min_depth or entry[3] is None:
+            return None
+        col = board.mirror_column(entry[3]) if mirrored else entry[3]
+        return col, entry[2]
 
-    def montecarlo_tree_search(self, board, max_iterations, currentNode, timeout = 100):
+    def cache_result(self, board, col, node):
+        """Remember the chosen move of a root with its win rate and visit count"""
+        if self.cache is None or node.visits == 0:
+            return
+        key, mirrored = board.canonical_key()
+        self.cache.store((key, True), node.visits.bit_length(), PersistentTranspositionTable.EXACT,
+                         node.wins / node.visits, board.mirror_column(col) if mirrored else col)
+
+    def forced_move(self, board):
+        """(column, 1) for an immediate win, (column, None) for the only block"""
+        if board.winning_move(board.PLAYER1_PIECE) or board.winning_move(board.PLAYER2_PIECE):
+            return None
+        wins, blocks = board.get_threats(board.CURR_PLAYER)
+        if wins:
+            return wins[0], 1
+        if len(blocks) == 1:
+            return blocks[0], None
+        return None
+
+    def solver_move(self, board):
+        empty = board.ROW_COUNT * board.COLUMN_COUNT - board.num_slots_filled
+        if empty >= self.solver_threshold or board.winning_move(board.PLAYER1_PIECE) or board.winning_move(board.PLAYER2_PIECE):
+            return None
+        if not self.solver.matches(board):
+            self.solver = Solver.for_board(board)
+        return self.solver.best_move(board)
+
+    def book_move(self, board):
+        if self.book is None:
+            return None
+        return self.book.lookup(board)
+
+    def montecarlo_tree_search(self, board, max_iterations, currentNode, timeout = 100, stop_event = None):
         rootnode = Node(piece=board.PREV_PLAYER, board=board)
 
         if currentNode is not None:
             rootnode = currentNode
 
-        start = time.perf_counter()
-        for i in range(max_iterations):
-            node = rootnode
-            state = board.copy_board()
-
-            # selection
-            # keep going down the tree based on best UCT values until terminal or unexpanded node
-            while node.available_moves == [] and node.children != []:
-                node = node.selection()
-                state.drop_piece(node.move, state.CURR_PLAYER)
-
-            # expand
-            if node.available_moves != []:
-                col = random.choice(node.available_moves)
-                state.drop_piece(col, state.CURR_PLAYER)
-                node = node.expand(col, state)
-
-            # rollout
-            while state.get_valid_locations():
-                col = random.choice(state.get_valid_locations())
-                state.drop_piece(col, state.CURR_PLAYER)
-                if state.winning_move(state.PREV_PLAYER):
-                    break
+        if self.workers > 1:
+            self.parallel_search(board, rootnode, max_iterations, timeout, stop_event)
+        else:
+            start = time.perf_counter()
+            for i in range(max_iterations):
+                node, state = self.select_leaf(rootnode, board)
+                rollout(state)
 
-            # backpropagate
-            while node is not None:
-                node.update(state.search_result(node.piece))
-                node = node.parent
+                # backpropagate
+                while node is not None:
+                    node.update(state.search_result(node.piece))
+                    node = node.parent
 
-            duration = time.perf_counter() - start
-            if duration > timeout:
-                break
+                duration = time.perf_counter() - start
+                if duration > timeout:
+                    break
+                if stop_event is not None and stop_event.is_set():
+                    break
 
         win_ratio = lambda x: x.wins/x.visits
         sorted_children = sorted(rootnode.children, key = win_ratio)[::-1]
@@ -57,23 +185,150 @@ class MonteCarloBot():
         #    print('Move: %s Win Rate: %.2f%%' % (node.move + 1, 100 * node.wins / node.visits))
         #print('Simulations performed: %s\n' % i)
 
-        return rootnode, sorted_children[0].move
+        return rootnode, sorted_children[0].move if sorted_children else None
+
+    def select_leaf(self, rootnode, board):
+        """Select down the tree and expand one move; returns the new node and its position"""
+        node = rootnode
+        state = board.copy_board()
+
+        # selection
+        # keep going down the tree based on best UCT values until terminal or unexpanded node
+        while node.available_moves == [] and node.children != []:
+            node = node.selection()
+            state.drop_piece(node.move, state.CURR_PLAYER)
+
+        # expand
+        if node.available_moves != []:
+            col = random.choice(node.available_moves)
+            state.drop_piece(col, state.CURR_PLAYER)
+            node = node.expand(col, state)
+        return node, state
+
+    def parallel_search(self, board, rootnode, max_iterations, timeout, stop_event):
+        """Grow rootnode with leaf rollouts played in the RolloutPool
+
+        Selection adds a virtual loss to every node on the path, so the
+        descents of one batch, and of batches still in flight, spread over
+        different leaves. Up to two batches per worker are kept in flight and
+        each is backpropagated as soon as it returns; the virtual losses are
+        removed then. Leaves that end the game are scored at once.
+        """
+        if self.rollout_pool is None:
+            self.rollout_pool = RolloutPool(self.workers)
+        in_flight = {}
+        start = time.perf_counter()
+        iterations = 0
+
+        def searching():
+            return (iterations < max_iterations and time.perf_counter() - start <= timeout
+                    and (stop_event is None or not stop_event.is_set()))
+
+        while True:
+            while searching() and len(in_flight) < 2 * self.rollout_pool.workers:
+                leaves, states = [], []
+                for _ in range(min(self.batch_size, max_iterations - iterations)):
+                    node, state = self.select_leaf(rootnode, board)
+                    iterations += 1
+                    if state.winning_move(state.PREV_PLAYER) or not state.get_valid_locations():
+                        node.backpropagate(state.search_result(board.PLAYER1_PIECE))
+                        continue
+                    node.add_virtual_loss()
+                    leaves.append(node)
+                    states.append(state)
+                if leaves:
+                    in_flight[self.rollout_pool.submit(states)] = leaves
+            if not in_flight:
+                break
+            done, _ = wait(in_flight, timeout=max(0.0, timeout - (time.perf_counter() - start)),
+                           return_when=FIRST_COMPLETED)
+            if not done:
+                # Out of time: the batches still running are waited for, so no virtual loss is left behind
+                done, _ = wait(in_flight)
+            for future in done:
+                for node, result in zip(in_flight.pop(future), self.rollout_pool.collect(future)):
+                    node.remove_virtual_loss()
+                    node.backpropagate(result)
 
     def get_child_node(self, node, board, move, piece):
+        """Child of node for move, or a new root node for board if it was never expanded
+
+        A symmetric node only expands one move of each mirror-image pair, so
+        the other move takes over that child's subtree, mirrored.
+        """
         for child in node.children:
             if child.move == move:
                 return child
+        if node.board.is_symmetric():
+            for child in node.children:
+                if child.move == node.board.mirror_column(move):
+                    child.mirror()
+                    return child
         return Node(piece = piece, board = board)
 
+    def search_position(self, board):
+        """Search a standalone position with a fresh tree; the game tree in currentNode is left alone"""
+        hit = self.forced_move(board) or self.book_move(board) or self.solver_move(board) or self.cached_move(board)
+        if hit is not None:
+            return hit
+        rootnode, col = self.montecarlo_tree_search(board, self.max_iterations, None, self.timeout)
+        child = self.get_child_node(rootnode, board, col, board.CURR_PLAYER)
+        self.cache_result(board, col, child)
+        return col, child.wins / child.visits
+
+    def analyze(self, board, budget=None):
+        """Win rate, visits and principal variation for every searched move, best first
+
+        ``budget`` is the search time in seconds and defaults to the bot's timeout.
+        All moves come from one tree search, so nothing is searched twice.
+        """
+        timeout = self.timeout if budget is None else budget
+        rootnode, _ = self.montecarlo_tree_search(board, self.max_iterations, None, timeout)
+
+        analysis = []
+        for child in rootnode.children:
+            pv = [child.move]
+            node = child
+            while node.children:
+                node = max(node.children, key = lambda x: x.visits)
+                pv.append(node.move)
+            analysis.append({'move': child.move, 'win_rate': child.wins / child.visits,
+                             'visits': child.visits, 'pv': pv})
+            if board.is_symmetric() and board.mirror_column(child.move) != child.move:
+                analysis.append({'move': board.mirror_column(child.move), 'win_rate': child.wins / child.visits,
+                                 'visits': child.visits, 'pv': [board.mirror_column(col) for col in pv]})
+        return sorted(analysis, key = lambda x: x['win_rate'], reverse = True)
+
     def get_move(self, board):
+        self.stop_pondering()
+
+        hit = self.forced_move(board) or self.book_move(board) or self.solver_move(board) or self.cached_move(board)
+        if hit is not None:
+            # The search tree is rebuilt from scratch if search takes over again
+            self.currentNode = None
+            return hit[0]
+
         if self.currentNode is None:
             self.currentNode = Node(piece=self.piece, board=board)
         
         if board.PREV_MOVE is not None:
+            pondered = self.currentNode
             self.currentNode = self.get_child_node(self.currentNode, board, board.PREV_MOVE, board.CURR_PLAYER)
+            if self.ponder:
+                # A miss means the opponent's move was never reached and the pondered tree is dropped
+                if self.currentNode.parent is pondered:
+                    self.ponder_hits += 1
+                else:
+                    self.ponder_misses += 1
 
         self.currentNode, col = self.montecarlo_tree_search(board, self.max_iterations, self.currentNode, self.timeout)
         self.currentNode = self.get_child_node(self.currentNode, board, col, board.PREV_PLAYER)
+        self.cache_result(board, col, self.currentNode)
+
+        if self.ponder:
+            ponder_board = board.copy_board()
+            ponder_board.drop_piece(col, board.CURR_PLAYER)
+            self.start_pondering(ponder_board)
         return col
 
 class Node:
@@ -81,15 +336,19 @@ class Node:
         self.board = board.copy_board()
         self.parent = parent
         self.move = move
-        self.available_moves = board.get_valid_locations()
+        # mirror-image moves of a symmetric position share one child
+        self.available_moves = board.get_distinct_locations()
         self.children = []
         self.wins = 0
         self.visits = 0
+        # descents still waiting for their rollout, counted as losses by selection
+        self.virtual_loss = 0
         self.piece = piece
 
     def selection(self):
         # return child with largest UCT value
-        uct_val = lambda x: x.wins / x.visits + np.sqrt(2 * np.log(self.visits) / x.visits)
+        parent_visits = self.visits + self.virtual_loss
+        uct_val = lambda x: x.wins / (x.visits + x.virtual_loss) + np.sqrt(2 * np.log(parent_visits) / (x.visits + x.virtual_loss))
         return sorted(self.children, key = uct_val)[-1]
 
     def expand(self, move, board):
@@ -100,6 +359,34 @@ class Node:
         self.children.append(child)
         return child
 
+    def mirror(self):
+        """Mirror the positions and moves of this subtree in place"""
+        nodes = [self]
+        for node in nodes:
+            nodes.extend(node.children)
+            node.board = node.board.mirror()
+            node.move = node.board.mirror_column(node.move)
+            node.available_moves = [node.board.mirror_column(col) for col in node.available_moves]
+
     def update(self, result):
         self.wins += result
         self.visits += 1
+
+    def backpropagate(self, result):
+        """Update this node and its ancestors with player 1's result"""
+        node = self
+        while node is not None:
+            node.update(result if node.piece == node.board.PLAYER1_PIECE else 1 - result)
+            node = node.parent
+
+    def add_virtual_loss(self):
+        node = self
+        while node is not None:
+            node.virtual_loss += 1
+            node = node.parent
+
+    def remove_virtual_loss(self):
+        node = self
+        while node is not None:
+            node.virtual_loss -= 1
+            node = node.parent
@@ -1,14 +1,24 @@
 import random
 import math
 import time
+import numpy as np
 from board.board import Board
+from bots.batch import BatchSearch
+from bots.evaluation import Evaluation
 
-class MonteCarloCustom:
-    def __init__(self, piece):
+class MonteCarloCustom(BatchSearch):
+    def __init__(self, piece, time_limit=0.5):
         self.name = "Monte Carlo Tree Search Bot (Custom)"
         self.piece = piece
         self.C = 1.41  # Exploration parameter
-        self.time_limit = 0.5  # Reduced time limit to prevent getting stuck
+        self.time_limit = time_limit
+        # RAVE equivalence parameter: the visit count at which a child's own
+        # statistics and its all-moves-as-first statistics weigh the same; 0 disables RAVE
+        self.rave_k = 50
+        # Progressive widening: a node may have int(widening * visits ** widening_exponent)
+        # children (at least one), expanded in the order of move_priors
+        self.widening = 1.0
+        self.widening_exponent = 0.5
         self.powerup_weights = {
             Board.REMOVE_PIECE: 5,
             Board.GRAVITY_FLIP: 6,
@@ -16,35 +26,100 @@ class MonteCarloCustom:
             Board.DOUBLE_MOVE: 8
         }
 
+    def set_time_budget(self, seconds):
+        """Search for up to seconds on the next move"""
+        self.time_limit = seconds
+
+    def batch_factory(self):
+        """Constructor arguments of a copy of this bot, see BatchSearch"""
+        return type(self), (self.piece, self.time_limit), {}
+
     def get_move(self, board):
         """Get the best move using Monte Carlo Tree Search with powerups"""
-        start_time = time.time()
-        root = Node(board, None, None)
-        
+        move, _ = self.search_position(board)
+        return move
+
+    def own_turn(self, board):
+        """board with this bot as the side to move
+
+        The game does not pass the turn after a powerup, so the board can
+        still name the opponent when this bot is asked for a move.
+        """
+        if board.CURR_PLAYER == self.piece:
+            return board
+        board = board.copy_board()
+        board.CURR_PLAYER = self.piece
+        board.PREV_PLAYER = 3 - self.piece
+        return board
+
+    def search_position(self, board):
+        """Return the best move and its estimated value for this bot"""
+        board = self.own_turn(board)
+        # The second drop of a double move must go in the same column
+        if board.double_move_available[board.CURR_PLAYER]:
+            return board.double_move_column[board.CURR_PLAYER], None
+
         # Get available moves including powerups
         available_moves = self.get_available_moves(board)
         
         # If only one move is available, return it immediately
         if len(available_moves) == 1:
-            return available_moves[0]
+            return available_moves[0], None
+
+        # Take an immediate win or the only block without searching
+        if not self.is_terminal(board):
+            wins, blocks = board.get_threats(board.CURR_PLAYER)
+            if wins:
+                return wins[0], 1.0
+            if len(blocks) == 1:
+                return blocks[0], None
         
-        # Run MCTS until time limit
-        iterations = 0
-        max_iterations = 100  # Safety limit
-        while time.time() - start_time < self.time_limit and iterations < max_iterations:
-            node = self.select(root)
-            if not self.is_terminal(node.board):
-                node = self.expand(node)
-            reward = self.simulate(node)
-            self.backpropagate(node, reward)
-            iterations += 1
+        root = self.search(board)
         
         # Select the best move
         best_move = self.get_best_move(root)
         if best_move is None and available_moves:
             # Fallback to random move if no best move found
-            return random.choice(available_moves)
-        return best_move
+            return random.choice(available_moves), None
+        child = root.children[self._get_move_key(best_move)]
+        return best_move, child.value / child.visits if child.visits else None
+
+    def analyze(self, board, budget=None):
+        """Win rate, visits and principal variation of every searched move, best first
+
+        ``budget`` is the search time in seconds and defaults to the bot's time
+        limit. Powerup moves are included and all moves share one search tree.
+        """
+        root = self.search(board, budget)
+        analysis = []
+        for child in root.children.values():
+            if child.visits == 0:
+                continue
+            pv = [child.move]
+            node = child
+            while node.children:
+                node = max(node.children.values(), key=lambda c: c.visits)
+                pv.append(node.move)
+            analysis.append({'move': child.move, 'win_rate': child.value / child.visits,
+                             'visits': child.visits, 'pv': pv})
+        return sorted(analysis, key=lambda x: x['win_rate'], reverse=True)
+
+    def search(self, board, time_limit=None):
+        """Run MCTS from board until the time limit and return the root"""
+        if time_limit is None:
+            time_limit = self.time_limit
+        start_time = time.time()
+        root = Node(self.own_turn(board), None, None)
+        
+        # Run MCTS until time limit
+        while time.time() - start_time < time_limit:
+            node = self.select(root)
+            if not self.is_terminal(node.board):
+                node = self.expand(node)
+            played = []
+            reward = self.simulate(node, played)
+            self.backpropagate(node, reward, played)
+        return root
 
     def is_terminal(self, board):
         """Check if the board is in a terminal state"""
@@ -53,85 +128,89 @@ class MonteCarloCustom:
                 len(board.get_valid_locations()) == 0)
 
     def get_available_moves(self, board):
-        """Get all available moves including powerups"""
-        moves = []
-        valid_locations = board.get_valid_locations()
-        
-        # Add regular moves
-        for col in valid_locations:
-            moves.append(col)
-        
-        # Add powerup moves
-        available_powerups = board.get_available_powerups(board.CURR_PLAYER)
-        for powerup in available_powerups:
-            if powerup == Board.GRAVITY_FLIP:
-                moves.append(('powerup', powerup, {}))
-            elif powerup == Board.SWAP_COLOR:
-                # Add row swaps
-                for row in range(Board.ROW_COUNT):
-                    moves.append(('powerup', powerup, {'is_row': True, 'index': row}))
-                # Add column swaps
-                for col in range(Board.COLUMN_COUNT):
-                    moves.append(('powerup', powerup, {'is_row': False, 'index': col}))
-            elif powerup == Board.REMOVE_PIECE:
-                # Add remove piece moves for columns that have pieces
-                for col in range(Board.COLUMN_COUNT):
-                    if not board.is_valid_location(col):
-                        moves.append(('powerup', powerup, {'col': col}))
-            elif powerup == Board.DOUBLE_MOVE:
-                # Add double move for columns that can fit two pieces
-                for col in valid_locations:
-                    if board.get_next_open_row(col) > 0:  # Can fit at least one more piece
-                        moves.append(('powerup', powerup, {'col': col}))
-        
-        return moves
+        """Get all available moves including powerups
+
+        These are Board.get_legal_moves: each side's unused powerups and,
+        with a double move pending, only the drop in its column.
+        """
+        return board.get_legal_moves()
+
+    def move_priors(self, board, moves):
+        """Cheap score of every move for the side to move, from the position it leads to
+
+        All resulting positions are scored in one numpy pass over the window
+        table with the Evaluation weights, so a win or a block ranks first and
+        a powerup that hands the opponent a line ranks last. Returns the
+        child boards and their scores.
+        """
+        piece = board.CURR_PLAYER
+        children = []
+        for move in moves:
+            child = board.copy_board()
+            child.apply_move(move)
+            children.append(child)
+        cells = np.stack([child.get_board().ravel() for child in children])
+        windows = cells[:, board.get_windows()]
+        own = np.count_nonzero(windows == piece, axis=2)
+        opp = np.count_nonzero(windows == 3 - piece, axis=2)
+        length = board.WINDOW_LENGTH
+        empty = length - own - opp
+        center = cells[:, np.arange(board.ROW_COUNT) * board.COLUMN_COUNT + board.COLUMN_COUNT // 2]
+        weights = Evaluation.WEIGHTS
+        scores = (weights['center'] * np.count_nonzero(center == piece, axis=1)
+                  + weights['four'] * np.count_nonzero(own == length, axis=1)
+                  + weights['three'] * np.count_nonzero((own == length - 1) & (empty == 1), axis=1)
+                  + weights['two'] * np.count_nonzero((own == length - 2) & (empty == 2), axis=1)
+                  + weights['opp_three'] * np.count_nonzero((opp == length - 1) & (empty == 1), axis=1)
+                  + weights['opp_four'] * np.count_nonzero(opp == length, axis=1))
+        return children, scores
+
+    def get_node_moves(self, node):
+        """Available moves of a node's position, best prior first, generated once per node
+
+        Unsafe drops are left out. Moves with equal priors stay in random
+        order. The child boards built for the priors are kept for expansion.
+        """
+        if node.moves is None:
+            # Drops that let the opponent win on top of them are not searched
+            safe = node.board.get_safe_locations(node.board.CURR_PLAYER)
+            moves = self.get_available_moves(node.board)
+            moves = [move for move in moves if isinstance(move, tuple) or move in safe] or moves
+            random.shuffle(moves)
+            node.moves = []
+            if moves:
+                children, scores = self.move_priors(node.board, moves)
+                order = np.argsort(-scores, kind='stable')
+                node.moves = [moves[i] for i in order]
+                node.move_boards = [children[i] for i in order]
+        return node.moves
+
+    def allowed_children(self, node):
+        """How many children progressive widening lets node have at its visit count"""
+        return max(1, int(self.widening * node.visits ** self.widening_exponent))
 
     def select(self, node):
-        """Select a node to expand using UCB1"""
-        while self.is_terminal(node.board):
-            if not node.children:
-                return node
+        """Descend by UCB1 through nodes that may not be widened yet, to a node to expand"""
+        while not self.is_terminal(node.board) and node.children:
+            limit = min(len(self.get_node_moves(node)), self.allowed_children(node))
+            if len(node.children) < limit:
+                break
             node = self.get_best_child(node)
         return node
 
     def expand(self, node):
-        """Expand the node by adding a child"""
-        available_moves = self.get_available_moves(node.board)
-        if not available_moves:
+        """Expand the node's best untried move by prior"""
+        available_moves = self.get_node_moves(node)
+        if len(node.children) >= len(available_moves):
             return node
-        
-        # Try moves that haven't been tried yet
-        untried_moves = []
-        for move in available_moves:
-            move_key = self._get_move_key(move)
-            if move_key not in node.children:
-                untried_moves.append(move)
-        
-        if untried_moves:
-            move = random.choice(untried_moves)
-            # Create a new board with the same state
-            new_board = node.board.copy_board()
-            
-            # Apply the move
-            if isinstance(move, tuple) and move[0] == 'powerup':
-                powerup_type, params = move[1], move[2]
-                if powerup_type == Board.GRAVITY_FLIP:
-                    new_board.gravity_flip(new_board.CURR_PLAYER)
-                elif powerup_type == Board.SWAP_COLOR:
-                    new_board.swap_color(new_board.CURR_PLAYER, params['is_row'], params['index'])
-                elif powerup_type == Board.REMOVE_PIECE:
-                    new_board.remove_piece(params['col'], new_board.CURR_PLAYER)
-                elif powerup_type == Board.DOUBLE_MOVE:
-                    new_board.enable_double_move(new_board.CURR_PLAYER, params['col'])
-            else:
-                new_board.drop_piece(move, new_board.CURR_PLAYER)
-            
-            move_key = self._get_move_key(move)
-            child = Node(new_board, node, move)
-            node.children[move_key] = child
-            return child
-        
-        return node
+
+        # Children are expanded in prior order, so the next untried move is the next in line
+        index = len(node.children)
+        move = available_moves[index]
+        child = Node(node.move_boards[index], node, move)
+        node.move_boards[index] = None
+        node.children[self._get_move_key(move)] = child
+        return child
 
     def _get_move_key(self, move):
         """Convert a move to a hashable key for dictionary lookup"""
@@ -147,8 +226,12 @@ class MonteCarloCustom:
                 return ('powerup', powerup_type, params['col'])
         return move
 
-    def simulate(self, node):
-        """Simulate a random game from the node"""
+    def simulate(self, node, played=None):
+        """Simulate a random game from the node
+
+        The (player, move key) of every simulated move is appended to
+        ``played`` for the RAVE statistics.
+        """
         # Create a new board with the same state
         board = node.board.copy_board()
         
@@ -159,30 +242,50 @@ class MonteCarloCustom:
             available_moves = self.get_available_moves(board)
             if not available_moves:
                 break
-            move = random.choice(available_moves)
-            
-            # Apply the move
-            if isinstance(move, tuple) and move[0] == 'powerup':
-                powerup_type, params = move[1], move[2]
-                if powerup_type == Board.GRAVITY_FLIP:
-                    board.gravity_flip(board.CURR_PLAYER)
-                elif powerup_type == Board.SWAP_COLOR:
-                    board.swap_color(board.CURR_PLAYER, params['is_row'], params['index'])
-                elif powerup_type == Board.REMOVE_PIECE:
-                    board.remove_piece(params['col'], board.CURR_PLAYER)
-                elif powerup_type == Board.DOUBLE_MOVE:
-                    board.enable_double_move(board.CURR_PLAYER, params['col'])
+            # Rollout policy: take an immediate win, block the only threat, else play randomly
+            wins, blocks = board.get_threats(board.CURR_PLAYER)
+            if len(available_moves) == 1:
+                # The drop of a pending double move
+                move = available_moves[0]
+            elif wins:
+                move = wins[0]
+            elif len(blocks) == 1:
+                move = blocks[0]
             else:
-                board.drop_piece(move, board.CURR_PLAYER)
+                move = random.choice(available_moves)
+            
+            player = board.CURR_PLAYER
+            board.apply_move(move)
+            if played is not None:
+                played.append((player, self._get_move_key(move)))
             depth += 1
         
         return self.evaluate_terminal(board)
 
-    def backpropagate(self, node, reward):
-        """Backpropagate the reward up the tree"""
+    def backpropagate(self, node, reward, played=()):
+        """Backpropagate the reward up the tree
+
+        Every node on the way also updates its all-moves-as-first table: each
+        move the player to move there made anywhere later in the iteration,
+        in the tree or in the simulation, counts as if played first. The table
+        is kept by the parent, so all its children share what is learnt about
+        a move, including children not expanded yet.
+        """
+        following = list(played)
         while node:
             node.visits += 1
             node.value += reward
+            if self.rave_k:
+                player = node.board.CURR_PLAYER
+                seen = set()
+                for mover, key in following:
+                    if mover == player and key not in seen:
+                        seen.add(key)
+                        stats = node.amaf.setdefault(key, [0.0, 0])
+                        stats[0] += reward
+                        stats[1] += 1
+            if node.parent is not None:
+                following.insert(0, (node.player, self._get_move_key(node.move)))
             node = node.parent
 
     def get_best_child(self, node):
@@ -206,10 +309,22 @@ class MonteCarloCustom:
         return best_child.move
 
     def ucb1(self, node):
-        """Calculate UCB1 value for a node"""
+        """UCB1 value of a node for the player who moved into it
+
+        The node's win rate is blended with its move's all-moves-as-first win
+        rate from the parent's table, by beta = sqrt(k / (3n + k)), so the
+        RAVE estimate leads while the node has few visits of its own.
+        """
         if node.visits == 0:
             return float('inf')
         exploitation = node.value / node.visits
+        stats = node.parent.amaf.get(self._get_move_key(node.move)) if self.rave_k else None
+        if stats is not None:
+            beta = math.sqrt(self.rave_k / (3 * node.visits + self.rave_k))
+            exploitation = (1 - beta) * exploitation + beta * stats[0] / stats[1]
+        # Values are kept from this bot's side; the opponent picks what is worst for it
+        if node.player != self.piece:
+            exploitation = 1 - exploitation
         exploration = self.C * math.sqrt(math.log(node.parent.visits) / node.visits)
         return exploitation + exploration
 
@@ -229,4 +344,10 @@ class Node:
         self.move = move
         self.children = {}
         self.visits = 0
-        self.value = 0.0 
\ No newline at end of file
+        self.value = 0.0
+        # The player who made move, then the node's moves by prior and their boards once generated
+        self.player = parent.board.CURR_PLAYER if parent is not None else None
+        self.moves = None
+        self.move_boards = None
+        # All-moves-as-first statistics: move key -> [value, visits]
+        self.amaf = {} 
\ No newline at end of file
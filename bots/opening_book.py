@@ -0,0 +1,133 @@
+import mmap
+import struct
+import argparse
+from board.board import Board
+
+class OpeningBook:
+    """Read-only opening book backed by a memory-mapped file
+
+    The file is a fixed header followed by fixed-size records sorted by the
+    mirror-normalised position key (Board.canonical_key). Each record holds the
+    best column and its score for the side to move in that orientation, so a
+    lookup is a binary search over the mapping with no load-time parsing.
+    """
+    MAGIC = b'C4BK'
+    VERSION = 1
+    HEADER = struct.Struct('<4sHHI')  # magic, version, key size, record count
+    VALUE = struct.Struct('<bq')      # best column, score
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.key_size, self.count = self.HEADER.unpack_from(self.data, 0)
+        if magic != self.MAGIC or version != self.VERSION:
+            raise ValueError(f"{path} is not a version {self.VERSION} opening book")
+        self.record_size = self.key_size + self.VALUE.size
+
+    def __getstate__(self):
+        # The mapping cannot be pickled; workers reopen the file instead
+        return {'path': self.path}
+
+    def __setstate__(self, state):
+        self.__init__(state['path'])
+
+    def __len__(self):
+        return self.count
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+    def lookup(self, board):
+        """Return (column, score) for the side to move, or None if the position is not in the book"""
+        if board.geometry != (Board.ROW_COUNT, Board.COLUMN_COUNT, Board.WINDOW_LENGTH):
+            # Books hold classic positions only
+            return None
+        key, mirrored = board.canonical_key()
+        if len(key) != self.key_size:
+            return None
+
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            offset = self.HEADER.size + mid * self.record_size
+            record_key = self.data[offset:offset + self.key_size]
+            if record_key < key:
+                lo = mid + 1
+            elif record_key > key:
+                hi = mid
+            else:
+                col, score = self.VALUE.unpack_from(self.data, offset + self.key_size)
+                if mirrored:
+                    col = board.mirror_column(col)
+                return col, score
+        return None
+
+    @classmethod
+    def write(cls, path, entries):
+        """Write a book from a {canonical key: (column, score)} mapping"""
+        keys = sorted(entries)
+        key_size = len(keys[0]) if keys else 0
+        with open(path, 'wb') as f:
+            f.write(cls.HEADER.pack(cls.MAGIC, cls.VERSION, key_size, len(keys)))
+            for key in keys:
+                col, score = entries[key]
+                f.write(key)
+                f.write(cls.VALUE.pack(col, score))
+        return len(keys)
+
+    @classmethod
+    def generate(cls, path, plies, depth, progress=None):
+        """Search every classic position up to ``plies`` moves deep and write the book
+
+        Positions are enumerated from both starting players, skipping mirror
+        duplicates, and deduplicated by their mirror-normalised key; positions that are already decided are
+        skipped. Each remaining position is searched from its canonical
+        orientation by a MiniMaxBot of the given depth.
+        """
+        from bots.minimax import MiniMaxBot
+
+        bots = {piece: MiniMaxBot(piece, depth) for piece in (Board.PLAYER1_PIECE, Board.PLAYER2_PIECE)}
+        positions = {}
+        frontier = [Board(Board.PLAYER1_PIECE), Board(Board.PLAYER2_PIECE)]
+        for ply in range(plies + 1):
+            next_frontier = []
+            for board in frontier:
+                key, mirrored = board.canonical_key()
+                if key in positions:
+                    continue
+                positions[key] = board.mirror() if mirrored else board
+                if ply == plies:
+                    continue
+                for col in board.get_distinct_locations():
+                    child = board.copy_board()
+                    child.drop_piece(col, child.CURR_PLAYER)
+                    if not child.winning_move(child.PREV_PLAYER) and not child.check_draw():
+                        next_frontier.append(child)
+            frontier = next_frontier
+
+        entries = {}
+        for i, (key, board) in enumerate(positions.items()):
+            col, score = bots[board.CURR_PLAYER].search_position(board)
+            entries[key] = (col, int(score))
+            if progress is not None:
+                progress(i + 1, len(positions))
+        return cls.write(path, entries)
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a Connect 4 opening book")
+    parser.add_argument('path')
+    parser.add_argument('--plies', type=int, default=4)
+    parser.add_argument('--depth', type=int, default=7)
+    args = parser.parse_args()
+
+    def progress(done, total):
+        if done % 100 == 0 or done == total:
+            print(f"{done}/{total} positions searched")
+
+    count = OpeningBook.generate(args.path, args.plies, args.depth, progress)
+    print(f"Wrote {count} positions to {args.path}")
+
+if __name__ == '__main__':
+    main()
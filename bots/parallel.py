@@ -0,0 +1,150 @@
+import os
+import time
+import atexit
+import random
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from board.board import Board
+from bots.transposition import SharedTranspositionTable
+
+# Per-process state of a Lazy SMP worker, set up by init_smp_worker
+_worker = {}
+
+def init_smp_worker(tt_name, slots, stop_event):
+    _worker['tt'] = SharedTranspositionTable.attach(tt_name, slots)
+    _worker['stop_event'] = stop_event
+
+def smp_search(board_bytes, piece, depth, worker_id, time_limit, geometry=None, weights=None, moves=None):
+    """Search one root as Lazy SMP worker ``worker_id``
+
+    weights are the evaluation weights of the calling bot and moves its root
+    moves (by default the safe drops). Odd workers search one ply deeper than asked, and every worker rotates
+    the root move order by its id, so helpers explore different parts of the
+    tree and share what they find through the table. Returns the deepest
+    completed iteration as (depth, column, value, nodes).
+    """
+    from bots.minimax import MiniMaxBot
+
+    board = Board.from_bytes(board_bytes, geometry)
+    bot = MiniMaxBot(piece, depth, solver_threshold=0, weights=weights)
+    bot.tt = _worker['tt']
+    bot.stop_event = _worker['stop_event']
+    if time_limit is not None:
+        bot.deadline = time.monotonic() + time_limit
+
+    if moves is None:
+        moves = board.get_safe_locations(piece)
+    shift = worker_id % len(moves)
+    moves = moves[shift:] + moves[:shift]
+
+    max_depth = board.ROW_COUNT * board.COLUMN_COUNT if time_limit is not None else depth + worker_id % 2
+    best = bot.iterative_deepening(board, max_depth, moves)
+    if best is None:
+        return None
+    return best + (bot.nodes,)
+
+class LazySMP:
+    """Lazy SMP alpha-beta over a pool of worker processes
+
+    All workers search the same root and share a SharedTranspositionTable.
+    Without a time limit the search ends when worker 0 completes the requested
+    depth; with one, every worker deepens until the deadline. Either way the
+    deepest completed result wins.
+    """
+
+    def __init__(self, workers=None, slots=1 << 20):
+        self.workers = workers or os.cpu_count()
+        self.tt = SharedTranspositionTable.create(slots)
+        self.stop_event = multiprocessing.Event()
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=init_smp_worker,
+                                        initargs=(self.tt.name, slots, self.stop_event))
+        self.nodes = 0
+        self.closed = False
+        atexit.register(self.close)
+
+    def search(self, board, piece, depth, time_limit=None, weights=None, moves=None):
+        """Return (column, value) for piece to move on board
+
+        weights are evaluation weights for the workers' bots and moves the
+        root moves to search, by default the safe drops.
+        """
+        self.stop_event.clear()
+        board_bytes = board.to_bytes()
+        if moves is None:
+            moves = board.get_safe_locations(piece)
+        futures = [self.pool.submit(smp_search, board_bytes, piece, depth, i, time_limit, board.geometry,
+                                    weights, moves)
+                   for i in range(self.workers)]
+
+        if time_limit is None:
+            futures[0].result()
+            self.stop_event.set()
+        results = [future.result() for future in futures]
+
+        completed = [(result, i) for i, result in enumerate(results) if result is not None]
+        self.nodes = sum(result[3] for result, _ in completed)
+        if not completed:
+            return moves[0], None
+        (_, col, value, _), _ = max(completed, key=lambda x: (x[0][0], -x[1]))
+        return col, value
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.pool.shutdown()
+            self.tt.close()
+
+
+def init_rollout_worker():
+    # Forked workers start with the parent's random state; without a reseed they play identical rollouts
+    random.seed()
+
+def rollout_batch(boards, geometry=None):
+    """Play out a batch of leaf positions
+
+    Returns (worker pid, player 1's result for each board, seconds spent).
+    """
+    from bots.montecarlo import rollout
+
+    start = time.perf_counter()
+    results = []
+    for data in boards:
+        state = Board.from_bytes(data, geometry)
+        rollout(state)
+        results.append(state.search_result(Board.PLAYER1_PIECE))
+    return os.getpid(), results, time.perf_counter() - start
+
+
+class RolloutPool:
+    """Worker processes that play out batches of MCTS leaves for tree-parallel search
+
+    The tree stays in the calling process; only leaf positions cross to the
+    workers. Rollouts and busy seconds are counted per worker process.
+    """
+
+    def __init__(self, workers=None):
+        self.workers = workers or os.cpu_count()
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=init_rollout_worker)
+        self.stats = {}  # worker pid -> [rollouts, seconds]
+        self.closed = False
+        atexit.register(self.close)
+
+    def submit(self, boards):
+        return self.pool.submit(rollout_batch, [board.to_bytes() for board in boards], boards[0].geometry)
+
+    def collect(self, future):
+        """Player 1's results of a finished batch, in submission order"""
+        pid, results, seconds = future.result()
+        stats = self.stats.setdefault(pid, [0, 0.0])
+        stats[0] += len(results)
+        stats[1] += seconds
+        return results
+
+    def rollout_rates(self):
+        """Rollouts per second of busy time, per worker pid"""
+        return {pid: rollouts / seconds if seconds else 0.0 for pid, (rollouts, seconds) in self.stats.items()}
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.pool.shutdown()
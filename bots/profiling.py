@@ -0,0 +1,187 @@
+import gc
+import sys
+import json
+import time
+import types
+import inspect
+import threading
+import resource
+import sysconfig
+import tracemalloc
+from board.board import Board
+
+def peak_rss(who=resource.RUSAGE_SELF):
+    """Peak resident set size in bytes (ru_maxrss is in kilobytes except on macOS)"""
+    return resource.getrusage(who).ru_maxrss * (1 if sys.platform == 'darwin' else 1024)
+
+STDLIB = sysconfig.get_paths()['stdlib']
+
+def function_lines(function):
+    """(filename, line) of every source line of function"""
+    lines, first = inspect.getsourcelines(function)
+    filename = inspect.getsourcefile(function)
+    return {(filename, first + i) for i in range(len(lines))}
+
+def allocation_site(traceback, skip=()):
+    """Innermost frame of an allocation outside the standard library, this
+    module and the skip lines, so board copies are charged to the caller of
+    copy_board"""
+    for frame in reversed(traceback):
+        if not frame.filename.startswith(STDLIB) and frame.filename != __file__ \
+                and (frame.filename, frame.lineno) not in skip:
+            return frame
+    return traceback[-1]
+
+def tree_nodes(root):
+    """Every node of the tree under root; children may be a list or a dict"""
+    nodes = []
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        nodes.append(node)
+        children = node.children
+        stack.extend(children.values() if isinstance(children, dict) else list(children))
+    return nodes
+
+def node_size(node):
+    """Approximate bytes held by one tree node: the node and everything it
+    references except other nodes, classes, modules and functions"""
+    skip = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType)
+    seen = {id(node)}
+    stack = [node]
+    size = 0
+    while stack:
+        obj = stack.pop()
+        size += sys.getsizeof(obj)
+        for ref in gc.get_referents(obj):
+            if id(ref) in seen or isinstance(ref, skip) or type(ref) is type(node):
+                continue
+            seen.add(id(ref))
+            stack.append(ref)
+    return size
+
+
+class SearchProfiler:
+    """Opt-in memory profiling of the bots' moves
+
+    Between begin_move and end_move the profiler counts the Board.copy_board
+    calls of the thread that began the move, so a bot's ponder thread is not
+    charged to the move; end_move then records the size of the search tree
+    the bot keeps (bots expose it with a ``search_tree`` method), an
+    approximate size per node from a sample of ``sample`` nodes and the
+    process's peak RSS. With
+    ``trace_allocations`` the move's allocations still alive at its end are
+    diffed from tracemalloc snapshots, ``frames`` deep, and the ``top``
+    allocation sites kept. Tracing slows the bots down several times, so
+    budgets measured with it overrun.
+    """
+
+    def __init__(self, trace_allocations=True, top=10, sample=100, frames=16):
+        self.trace_allocations = trace_allocations
+        self.top = top
+        self.frames = frames
+        self.sample = sample
+        self.moves = []
+        self.copies = 0
+        self._copy_board = None
+        self._copy_lines = function_lines(Board.copy_board)
+        self._snapshot = None
+        self._move_start = None
+        self._move_copies = 0
+        self._move_thread = None
+
+    def start(self):
+        """Count board copies and, if tracing, start tracemalloc"""
+        if self._copy_board is not None:
+            return
+        self._copy_board = Board.copy_board
+        copy_board = self._copy_board
+
+        def counting_copy_board(board):
+            if threading.get_ident() == self._move_thread:
+                self.copies += 1
+            return copy_board(board)
+
+        Board.copy_board = counting_copy_board
+        if self.trace_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+
+    def stop(self):
+        if self._copy_board is None:
+            return
+        Board.copy_board = self._copy_board
+        self._copy_board = None
+        self._snapshot = None
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def take_snapshot(self):
+        snapshot = tracemalloc.take_snapshot()
+        return snapshot.filter_traces((tracemalloc.Filter(False, tracemalloc.__file__),
+                                       tracemalloc.Filter(False, __file__)))
+
+    def begin_move(self):
+        self.start()
+        self._move_copies = self.copies
+        self._move_thread = threading.get_ident()
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+            self._snapshot = self.take_snapshot()
+        self._move_start = time.perf_counter()
+
+    def end_move(self, player, piece):
+        """Record the move player (playing piece) just searched; returns the entry"""
+        seconds = time.perf_counter() - self._move_start
+        entry = {'ply': len(self.moves), 'player': piece, 'bot': type(player).__name__,
+                 'seconds': round(seconds, 4), 'board_copies': self.copies - self._move_copies,
+                 'tree_nodes': None, 'bytes_per_node': None,
+                 'peak_rss': peak_rss(), 'peak_rss_children': peak_rss(resource.RUSAGE_CHILDREN)}
+
+        root = player.search_tree() if hasattr(player, 'search_tree') else None
+        if root is not None:
+            nodes = tree_nodes(root)
+            step = max(1, len(nodes) // self.sample)
+            sizes = [node_size(node) for node in nodes[::step]]
+            entry['tree_nodes'] = len(nodes)
+            entry['bytes_per_node'] = sum(sizes) // len(sizes)
+
+        if self._snapshot is not None:
+            current, peak = tracemalloc.get_traced_memory()
+            entry['traced_bytes'] = current
+            entry['traced_peak'] = peak
+            entry['hot_spots'] = self.hot_spots(self.take_snapshot().compare_to(self._snapshot, 'traceback'))
+            self._snapshot = None
+        self.moves.append(entry)
+        return entry
+
+    def hot_spots(self, stats):
+        """The top allocation sites of snapshot differences, largest growth first"""
+        sites = {}
+        for stat in stats:
+            frame = allocation_site(stat.traceback, self._copy_lines)
+            site = sites.setdefault((frame.filename, frame.lineno), [0, 0])
+            site[0] += stat.size_diff
+            site[1] += stat.count_diff
+        top = sorted(sites.items(), key=lambda item: abs(item[1][0]), reverse=True)[:self.top]
+        return [{'file': filename, 'line': line, 'size_diff': size, 'count_diff': count}
+                for (filename, line), (size, count) in top]
+
+    def summary(self, piece):
+        """Totals and maxima over piece's moves, or None if it made none"""
+        moves = [entry for entry in self.moves if entry['player'] == piece]
+        if not moves:
+            return None
+        sized = [entry for entry in moves if entry['tree_nodes'] is not None]
+        return {'moves': len(moves),
+                'board_copies': sum(entry['board_copies'] for entry in moves),
+                'max_tree_nodes': max((entry['tree_nodes'] for entry in sized), default=None),
+                'bytes_per_node': sized[-1]['bytes_per_node'] if sized else None,
+                'peak_rss': max(entry['peak_rss'] for entry in moves)}
+
+    def report(self):
+        return {'players': {piece: self.summary(piece) for piece in (Board.PLAYER1_PIECE, Board.PLAYER2_PIECE)},
+                'moves': self.moves}
+
+    def dump(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.report(), f, indent=1)
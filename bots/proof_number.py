@@ -0,0 +1,212 @@
+import json
+import time
+import argparse
+from board.board import Board
+from bots.minimax import SearchAborted
+
+INF = 10 ** 9
+
+class ProofNumberSearch:
+    """Depth-first proof-number search (df-pn) over Board positions
+
+    Solves a position for the side to move as a win, draw or loss, together
+    with a move that achieves the result. Classic search only considers drops;
+    with ``powerups`` every legal powerup move is searched as well (see
+    Board.get_legal_moves).
+
+    A win is proven with one search for "the side to move wins"; if that is
+    disproven, a second search for "the side to move does not lose" tells a
+    draw from a loss. Proof and disproof numbers of every visited position are
+    kept in a transposition table keyed by Board.key(), the root's side and the
+    target, as they are proofs for that side. Once it holds
+    ``max_entries`` positions the unsolved ones are dropped, so memory stays
+    bounded while proven results survive. ``max_nodes`` caps the number of
+    expanded positions per call; a search that hits it returns 'unknown'.
+    """
+    WIN = 'win'
+    DRAW = 'draw'
+    LOSS = 'loss'
+    UNKNOWN = 'unknown'
+
+    def __init__(self, max_entries=1_000_000, max_nodes=None, powerups=False):
+        self.max_entries = max_entries
+        self.max_nodes = max_nodes
+        self.powerups = powerups
+        self.table = {}
+        self.nodes = 0
+
+    def outcome(self, board):
+        """Result for root_piece when board is over: 1 win, 0 draw, -1 loss; None otherwise"""
+        mover = board.PREV_PLAYER
+        if board.winning_move(mover):
+            winner = mover
+        elif board.winning_move(board.CURR_PLAYER):
+            winner = board.CURR_PLAYER
+        elif board.check_draw():
+            return 0
+        else:
+            return None
+        return 1 if winner == self.root_piece else -1
+
+    def lookup(self, key, board):
+        """(proof, disproof) numbers of a child, evaluating it if it is terminal"""
+        entry = self.table.get((key, self.root_piece, self.target))
+        if entry is not None:
+            return entry
+        result = self.outcome(board)
+        if result is None:
+            if not self.legal_moves(board):
+                # No drops or powerups left: the game cannot go on, count it a draw
+                result = 0
+            else:
+                return 1, 1
+        entry = (0, INF) if result >= self.target else (INF, 0)
+        self.store(key, entry)
+        return entry
+
+    def store(self, key, entry):
+        if len(self.table) >= self.max_entries:
+            self.table = {k: v for k, v in self.table.items() if v[0] == 0 or v[1] == 0}
+            if len(self.table) >= self.max_entries // 2:
+                self.table.clear()
+        self.table[(key, self.root_piece, self.target)] = entry
+
+    def legal_moves(self, board):
+        return board.get_legal_moves() if self.powerups else board.get_valid_locations()
+
+    def children(self, board):
+        result = []
+        for move in self.legal_moves(board):
+            child = board.copy_board()
+            child.apply_move(move)
+            result.append((move, child, child.key()))
+        return result
+
+    def mid(self, board, key, pn_limit, dn_limit):
+        """Expand board until its proof or disproof number reaches its limit"""
+        self.nodes += 1
+        if self.max_nodes is not None and self.nodes > self.max_nodes:
+            raise SearchAborted()
+        children = self.children(board)
+        or_node = board.CURR_PLAYER == self.root_piece
+
+        while True:
+            numbers = [self.lookup(child_key, child) for _, child, child_key in children]
+            # In the node's own terms phi is minimised over children and delta summed
+            if or_node:
+                phis = [pn for pn, dn in numbers]
+                deltas = [dn for pn, dn in numbers]
+            else:
+                phis = [dn for pn, dn in numbers]
+                deltas = [pn for pn, dn in numbers]
+            phi = min(phis)
+            delta = min(sum(deltas), INF)
+            pn, dn = (phi, delta) if or_node else (delta, phi)
+            if pn >= pn_limit or dn >= dn_limit or pn == 0 or dn == 0:
+                self.store(key, (pn, dn))
+                return pn, dn
+
+            phi_limit, delta_limit = (pn_limit, dn_limit) if or_node else (dn_limit, pn_limit)
+            best = min(range(len(children)), key=lambda i: phis[i])
+            second = min((phis[i] for i in range(len(children)) if i != best), default=INF)
+            child_phi_limit = min(phi_limit, second + 1)
+            child_delta_limit = min(delta_limit - delta + deltas[best], INF)
+            child_pn_limit, child_dn_limit = ((child_phi_limit, child_delta_limit) if or_node
+                                              else (child_delta_limit, child_phi_limit))
+            _, child, child_key = children[best]
+            self.mid(child, child_key, child_pn_limit, child_dn_limit)
+
+    def prove(self, board, target):
+        """True if the side to move can force a result of at least target, False if not"""
+        self.target = target
+        key = board.key()
+        pn, dn = self.lookup(key, board)
+        if pn != 0 and dn != 0:
+            pn, dn = self.mid(board, key, INF, INF)
+        return pn == 0
+
+    def proof_move(self, board):
+        """A move whose position is proven for the current target"""
+        for move, child, child_key in self.children(board):
+            if self.lookup(child_key, child)[0] == 0:
+                return move
+        return None
+
+    def solve(self, board):
+        """Return (result, move) for the side to move
+
+        result is 'win', 'draw', 'loss' or 'unknown' when the node budget ran
+        out. move achieves a win or draw; for a loss it is None.
+        """
+        self.root_piece = board.CURR_PLAYER
+        self.nodes = 0
+        if self.outcome(board) is not None or not self.legal_moves(board):
+            return self.UNKNOWN, None
+        try:
+            if self.prove(board, 1):
+                return self.WIN, self.proof_move(board)
+            if self.prove(board, 0):
+                return self.DRAW, self.proof_move(board)
+            return self.LOSS, None
+        except SearchAborted:
+            return self.UNKNOWN, None
+
+
+def parse_position(line):
+    """A board from a to_notation line or a move string such as ``4453``"""
+    if '/' in line:
+        return Board.from_notation(line)
+    return Board.from_moves(line)
+
+def solve_file(input_path, output_path, max_nodes=None, max_entries=1_000_000, powerups=False, progress=None):
+    """Solve every position in input_path, one per line, into JSON lines at output_path
+
+    Results are appended and flushed one at a time; positions already in the
+    output are skipped, so an interrupted run resumes where it stopped. The
+    transposition table is shared by all positions of a run.
+    """
+    search = ProofNumberSearch(max_entries, max_nodes, powerups)
+    done = 0
+    try:
+        with open(output_path) as f:
+            done = sum(1 for line in f if line.strip())
+    except FileNotFoundError:
+        pass
+
+    solved = index = 0
+    with open(input_path) as positions, open(output_path, 'a') as output:
+        for line in positions:
+            line = line.strip()
+            if not line:
+                continue
+            index += 1
+            if index <= done:
+                continue
+            start = time.perf_counter()
+            result, move = search.solve(parse_position(line))
+            record = {'position': line, 'result': result, 'move': move, 'nodes': search.nodes,
+                      'seconds': round(time.perf_counter() - start, 3)}
+            output.write(json.dumps(record) + '\n')
+            output.flush()
+            solved += 1
+            if progress is not None:
+                progress(index, record)
+    return solved
+
+def main():
+    parser = argparse.ArgumentParser(description="Solve Connect 4 positions with proof-number search")
+    parser.add_argument('input', help="positions, one per line, in board notation or as move strings")
+    parser.add_argument('output', help="JSON lines file results are appended to")
+    parser.add_argument('--max-nodes', type=int, default=None)
+    parser.add_argument('--max-entries', type=int, default=1_000_000)
+    parser.add_argument('--powerups', action='store_true', help="also search powerup moves")
+    args = parser.parse_args()
+
+    def progress(line, record):
+        print(f"{line}: {record['result']} {record['move']} ({record['nodes']} nodes, {record['seconds']}s)")
+
+    count = solve_file(args.input, args.output, args.max_nodes, args.max_entries, args.powerups, progress)
+    print(f"Solved {count} positions into {args.output}")
+
+if __name__ == '__main__':
+    main()
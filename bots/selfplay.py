@@ -0,0 +1,246 @@
+import os
+import json
+import math
+import zlib
+import random
+import struct
+import argparse
+import numpy as np
+from multiprocessing import Pool
+from board.board import Board
+
+RECORD = struct.Struct(f'<{len(Board(1).to_bytes())}sf{Board.COLUMN_COUNT}fbB')  # position, value, policy, outcome, ply
+# Minimax scores are squashed into record values as tanh(score / MINIMAX_VALUE_SCALE)
+MINIMAX_VALUE_SCALE = 100
+# The same layout as a numpy structured dtype, for reading records in bulk
+RECORD_DTYPE = np.dtype([('position', np.uint8, len(Board(1).to_bytes())), ('value', '<f4'),
+                         ('policy', '<f4', Board.COLUMN_COUNT), ('outcome', 'i1'), ('ply', 'u1')])
+
+# Each pool worker keeps its two bots for all the games it plays
+_worker_players = None
+
+def make_player(player_type, piece, options):
+    from bots.minimax import MiniMaxBot
+    from bots.montecarlo import MonteCarloBot
+
+    if player_type == 'minimax':
+        return MiniMaxBot(piece, depth=options.get('depth', 5))
+    if player_type == 'montecarlo':
+        return MonteCarloBot(piece, timeout=options.get('timeout', 0.5))
+    raise ValueError(f"Unknown self-play player type '{player_type}'")
+
+def search(player, board, options):
+    """(value, policy) of a position for the side to move, None without an analysis
+
+    Values are in [-1, 1] like outcomes, whichever bot searched. MCTS maps its
+    best win rate there and reports the root visit distribution. Minimax
+    squashes its best score, so forced wins and losses are 1 and -1, and
+    spreads the policy evenly over the best moves.
+    """
+    policy = np.zeros(board.COLUMN_COUNT, dtype=np.float32)
+    if hasattr(player, 'montecarlo_tree_search'):
+        analysis = player.analyze(board, options.get('timeout', 0.5))
+        if not analysis:
+            return None
+        for entry in analysis:
+            policy[entry['move']] = entry['visits']
+        value = 2 * analysis[0]['win_rate'] - 1
+    else:
+        analysis = player.analyze(board, options.get('depth', 5))
+        if not analysis:
+            return None
+        for entry in analysis:
+            if entry['score'] == analysis[0]['score']:
+                policy[entry['move']] = 1
+        value = math.tanh(analysis[0]['score'] / MINIMAX_VALUE_SCALE)
+    return value, policy / policy.sum()
+
+def init_worker(p1_type, p2_type, options):
+    global _worker_players
+    _worker_players = {Board.PLAYER1_PIECE: make_player(p1_type, Board.PLAYER1_PIECE, options),
+                       Board.PLAYER2_PIECE: make_player(p2_type, Board.PLAYER2_PIECE, options),
+                       'options': options}
+
+def play_game(game_id):
+    """Play one seeded game headless and return its packed records
+
+    The first ``random_plies`` moves are random so games differ; every later
+    position is searched, recorded and played by the policy's best move. A
+    position the bot returns no analysis for is played at random unrecorded.
+    """
+    options = _worker_players['options']
+    random.seed(options.get('seed', 0) + game_id)
+    np.random.seed((options.get('seed', 0) + game_id) % 2 ** 32)
+    board = Board(Board.PLAYER1_PIECE if game_id % 2 == 0 else Board.PLAYER2_PIECE)
+
+    positions = []
+    ply = 0
+    while not board.winning_move(board.PREV_PLAYER) and not board.check_draw():
+        searched = None
+        if ply >= options.get('random_plies', 4):
+            searched = search(_worker_players[board.CURR_PLAYER], board, options)
+        if searched is None:
+            col = random.choice(board.get_valid_locations())
+        else:
+            value, policy = searched
+            positions.append((board.to_bytes(), board.CURR_PLAYER, value, policy, ply))
+            col = int(np.argmax(policy))
+        board.drop_piece(col, board.CURR_PLAYER)
+        ply += 1
+
+    winner = board.PREV_PLAYER if board.winning_move(board.PREV_PLAYER) else None
+    records = []
+    for position, piece, value, policy, ply in positions:
+        outcome = 0 if winner is None else (1 if winner == piece else -1)
+        records.append(RECORD.pack(position, value, *policy, outcome, ply))
+    return b''.join(records)
+
+def generate_games(p1_type, p2_type, games, start=0, processes=None, options=None):
+    """Yield (game id, packed records) for games start .. games - 1, in order
+
+    Games are played in a process pool; results are consumed as they arrive,
+    so only the games in flight are held in memory.
+    """
+    options = options or {}
+    if processes == 1:
+        init_worker(p1_type, p2_type, options)
+        for game_id in range(start, games):
+            yield game_id, play_game(game_id)
+        return
+    with Pool(processes, initializer=init_worker, initargs=(p1_type, p2_type, options)) as pool:
+        yield from zip(range(start, games), pool.imap(play_game, range(start, games)))
+
+
+class ShardWriter:
+    """Writes records into zlib-compressed shards listed in ``index.json``
+
+    A shard is compressed as it is written and closed once its compressed
+    size reaches ``shard_size`` bytes. Only closed shards enter the index, so
+    after an interruption ``games`` in the index says where to resume and any
+    unlisted shard is a partial one to discard.
+    """
+    INDEX = 'index.json'
+
+    def __init__(self, directory, shard_size=64 << 20):
+        self.directory = directory
+        self.shard_size = shard_size
+        os.makedirs(directory, exist_ok=True)
+        self.index = self.read_index(directory)
+        listed = {shard['name'] for shard in self.index['shards']}
+        for name in os.listdir(directory):
+            if name.startswith('shard-') and name not in listed:
+                os.remove(os.path.join(directory, name))
+        self.file = None
+
+    @classmethod
+    def read_index(cls, directory):
+        try:
+            with open(os.path.join(directory, cls.INDEX)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {'record_size': RECORD.size, 'games': 0, 'records': 0, 'shards': []}
+
+    @property
+    def games(self):
+        """Games already written to closed shards"""
+        return self.index['games']
+
+    def open_shard(self):
+        self.name = f"shard-{len(self.index['shards']):05d}.bin.z"
+        self.file = open(os.path.join(self.directory, self.name), 'wb')
+        self.compressor = zlib.compressobj(6)
+        self.shard_games = self.shard_records = 0
+
+    def write_game(self, records):
+        if self.file is None:
+            self.open_shard()
+        # A sync flush pushes out what the compressor buffered, so the file
+        # offset is the shard's compressed size so far
+        self.file.write(self.compressor.compress(records) + self.compressor.flush(zlib.Z_SYNC_FLUSH))
+        self.shard_games += 1
+        self.shard_records += len(records) // RECORD.size
+        if self.file.tell() >= self.shard_size:
+            self.close_shard()
+
+    def close_shard(self):
+        self.file.write(self.compressor.flush())
+        self.file.close()
+        self.file = None
+        self.index['shards'].append({'name': self.name, 'games': self.shard_games, 'records': self.shard_records})
+        self.index['games'] += self.shard_games
+        self.index['records'] += self.shard_records
+        path = os.path.join(self.directory, self.INDEX)
+        with open(path + '.tmp', 'w') as f:
+            json.dump(self.index, f, indent=1)
+        os.replace(path + '.tmp', path)
+
+    def close(self):
+        if self.file is not None:
+            self.close_shard()
+
+
+def read_chunks(directory, chunk_size=1 << 20):
+    """Yield the raw records of the index's shards in whole-record chunks of about chunk_size bytes"""
+    index = ShardWriter.read_index(directory)
+    for shard in index['shards']:
+        decompressor = zlib.decompressobj()
+        pending = b''
+        with open(os.path.join(directory, shard['name']), 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                pending += decompressor.decompress(chunk)
+                usable = len(pending) - len(pending) % RECORD.size
+                if usable:
+                    yield pending[:usable]
+                pending = pending[usable:]
+
+def read_records(directory):
+    """Yield (board, value, policy, outcome, ply) for every record in the index's shards"""
+    for chunk in read_chunks(directory, 1 << 16):
+        for fields in RECORD.iter_unpack(chunk):
+            position, value, *policy, outcome, ply = fields
+            yield Board.from_bytes(position), value, np.array(policy, dtype=np.float32), outcome, ply
+
+def read_arrays(directory):
+    """Yield the index's records as RECORD_DTYPE arrays, one per chunk"""
+    for chunk in read_chunks(directory):
+        yield np.frombuffer(chunk, dtype=RECORD_DTYPE)
+
+def run_selfplay(directory, games, p1_type='montecarlo', p2_type='montecarlo', processes=None,
+                 shard_size=64 << 20, options=None, progress=None):
+    """Play games into shards under directory, resuming after the games already indexed"""
+    writer = ShardWriter(directory, shard_size)
+    start = writer.games
+    try:
+        for game_id, records in generate_games(p1_type, p2_type, games, start, processes, options):
+            writer.write_game(records)
+            if progress is not None:
+                progress(game_id + 1, games)
+    finally:
+        writer.close()
+    return writer.games - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate Connect 4 training data from headless self-play")
+    parser.add_argument('directory')
+    parser.add_argument('--games', type=int, default=100)
+    parser.add_argument('--p1', choices=['minimax', 'montecarlo'], default='montecarlo')
+    parser.add_argument('--p2', choices=['minimax', 'montecarlo'], default='montecarlo')
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--shard-size', type=int, default=64 << 20, help="compressed bytes per shard")
+    parser.add_argument('--timeout', type=float, default=0.5, help="MCTS seconds per move")
+    parser.add_argument('--depth', type=int, default=5, help="minimax search depth")
+    parser.add_argument('--random-plies', type=int, default=4)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    options = {'timeout': args.timeout, 'depth': args.depth, 'random_plies': args.random_plies, 'seed': args.seed}
+
+    def progress(done, total):
+        if done % 10 == 0 or done == total:
+            print(f"{done}/{total} games played")
+
+    count = run_selfplay(args.directory, args.games, args.p1, args.p2, args.processes, args.shard_size, options, progress)
+    print(f"Wrote {count} games to {args.directory}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,212 @@
+from board.board import Board, get_bitboard_masks
+
+class Solver:
+    """Exact negamax solver for classic positions
+
+    Positions are converted to bitboards (one column of ROW_COUNT+1 bits per
+    board column, for any board size and line length) and searched with
+    alpha-beta, null-window bisection on the score, a transposition table and
+    pruning of moves that lose immediately.
+
+    Scores are from the side to move: positive scores win, with larger values
+    for faster wins (the number of the winner's stones left unplayed), negative
+    scores lose and 0 is a draw.
+    """
+
+    def __init__(self, rows=Board.ROW_COUNT, columns=Board.COLUMN_COUNT, max_entries=4_000_000,
+                 connect=Board.WINDOW_LENGTH):
+        self.rows = rows
+        self.columns = columns
+        self.connect = connect
+        self.cells = rows * columns
+        self.max_entries = max_entries
+        self.tt = {}
+        self.nodes = 0
+
+        self.bottom_mask, self.board_mask, self.column_masks, self.top_masks = get_bitboard_masks(rows, columns)
+        # Bit shifts along the horizontal and both diagonals
+        self.shifts = (rows + 1, rows, rows + 2)
+        if connect == 4:
+            # winning_cells is the solver's hot path; classic connect-4 uses the unrolled version
+            self.winning_cells = self.winning_cells_four
+        # Explore columns from the centre outwards
+        self.column_order = sorted(range(columns), key=lambda c: (abs(columns // 2 - c), c))
+
+    @classmethod
+    def for_board(cls, board, max_entries=4_000_000):
+        return cls(board.ROW_COUNT, board.COLUMN_COUNT, max_entries, board.WINDOW_LENGTH)
+
+    def matches(self, board):
+        """Whether this solver was built for board's geometry"""
+        return (self.rows, self.columns, self.connect) == board.geometry
+
+    def encode(self, board):
+        """Return (position, mask, moves) bitboards for the side to move"""
+        height = self.rows + 1
+        position = mask = 0
+        for c in range(self.columns):
+            for r in range(self.rows):
+                cell = board.get_row_col(r, c)
+                if cell != board.EMPTY:
+                    bit = 1 << (c * height + r)
+                    mask |= bit
+                    if cell == board.CURR_PLAYER:
+                        position |= bit
+        return position, mask, bin(mask).count('1')
+
+    def winning_cells(self, position, mask):
+        """Empty cells that would complete a line of ``connect`` for the stones in position"""
+        n = self.connect - 1
+        # Vertical: only the cell on top of a column can complete it
+        r = position << 1
+        for i in range(2, n + 1):
+            r &= position << i
+        for shift in self.shifts:
+            # A cell completes a line with a stones on one side and n - a on the other;
+            # below[a] / above[a] mark cells with a run of a stones in each direction
+            below = [-1]
+            above = [-1]
+            for i in range(1, n + 1):
+                below.append(below[-1] & (position << i * shift))
+                above.append(above[-1] & (position >> i * shift))
+            for a in range(n + 1):
+                r |= below[a] & above[n - a]
+        return r & (self.board_mask ^ mask)
+
+    def winning_cells_four(self, position, mask):
+        """winning_cells for lines of four"""
+        h = self.rows
+        # Vertical
+        r = (position << 1) & (position << 2) & (position << 3)
+        for shift in (h + 1, h, h + 2):
+            # Horizontal and both diagonals
+            p = (position << shift) & (position << 2 * shift)
+            r |= p & (position << 3 * shift)
+            r |= p & (position >> shift)
+            p = (position >> shift) & (position >> 2 * shift)
+            r |= p & (position << shift)
+            r |= p & (position >> 3 * shift)
+        return r & (self.board_mask ^ mask)
+
+    def possible(self, mask):
+        return (mask + self.bottom_mask) & self.board_mask
+
+    def can_win_next(self, position, mask):
+        return self.winning_cells(position, mask) & self.possible(mask)
+
+    def non_losing_moves(self, position, mask):
+        """Playable cells that do not hand the opponent an immediate win"""
+        possible = self.possible(mask)
+        opponent_win = self.winning_cells(position ^ mask, mask)
+        forced = possible & opponent_win
+        if forced:
+            if forced & (forced - 1):
+                # Two threats at once cannot both be blocked
+                return 0
+            possible = forced
+        return possible & ~(opponent_win >> 1)
+
+    def negamax(self, position, mask, moves, alpha, beta):
+        # The side to move has no immediate win here
+        self.nodes += 1
+        playable = self.non_losing_moves(position, mask)
+        if playable == 0:
+            return -((self.cells - moves) // 2)
+        if moves >= self.cells - 2:
+            return 0
+
+        lower = -((self.cells - 2 - moves) // 2)
+        if alpha < lower:
+            alpha = lower
+            if alpha >= beta:
+                return alpha
+        upper = (self.cells - 1 - moves) // 2
+
+        key = position + mask
+        entry = self.tt.get(key)
+        if entry is not None:
+            is_lower, value = entry
+            if is_lower:
+                if alpha < value:
+                    alpha = value
+                    if alpha >= beta:
+                        return alpha
+            elif value < upper:
+                upper = value
+        if beta > upper:
+            beta = upper
+            if alpha >= beta:
+                return beta
+
+        # Order candidate moves by how many winning cells they create
+        candidates = []
+        for i, col in enumerate(self.column_order):
+            move = playable & self.column_masks[col]
+            if move:
+                threats = bin(self.winning_cells(position | move, mask)).count('1')
+                candidates.append((-threats, i, move))
+        candidates.sort()
+
+        for _, _, move in candidates:
+            child_position = position ^ mask
+            child_mask = mask | move
+            score = -self.negamax(child_position, child_mask, moves + 1, -beta, -alpha)
+            if score >= beta:
+                self.store(key, True, score)
+                return score
+            if score > alpha:
+                alpha = score
+
+        self.store(key, False, alpha)
+        return alpha
+
+    def store(self, key, is_lower, value):
+        if len(self.tt) >= self.max_entries:
+            self.tt.clear()
+        self.tt[key] = (is_lower, value)
+
+    def solve_bitboard(self, position, mask, moves):
+        if self.can_win_next(position, mask):
+            return (self.cells + 1 - moves) // 2
+
+        # Narrow the score window with null-window searches
+        lo = -((self.cells - moves) // 2)
+        hi = (self.cells + 1 - moves) // 2
+        while lo < hi:
+            med = lo + (hi - lo) // 2
+            if med <= 0 and lo // 2 < med:
+                med = lo // 2
+            elif med >= 0 and hi // 2 > med:
+                med = hi // 2
+            r = self.negamax(position, mask, moves, med, med + 1)
+            if r <= med:
+                hi = r
+            else:
+                lo = r
+        return lo
+
+    def solve(self, board):
+        """Exact score of a position where nobody has won yet"""
+        return self.solve_bitboard(*self.encode(board))
+
+    def analyze(self, board):
+        """Exact score of every legal column, as a {column: score} dict"""
+        position, mask, moves = self.encode(board)
+        scores = {}
+        for col in self.column_order:
+            if mask & self.top_masks[col]:
+                continue
+            move = (mask + self.bottom_mask) & self.column_masks[col]
+            if self.winning_cells(position, mask) & move:
+                scores[col] = (self.cells + 1 - moves) // 2
+            elif moves + 1 == self.cells:
+                scores[col] = 0
+            else:
+                scores[col] = -self.solve_bitboard(position ^ mask, mask | move, moves + 1)
+        return scores
+
+    def best_move(self, board):
+        """Return (column, score) of the best move, preferring central columns on ties"""
+        scores = self.analyze(board)
+        col = max(scores, key=lambda c: (scores[c], -self.column_order.index(c)))
+        return col, scores[col]
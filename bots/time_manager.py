@@ -0,0 +1,101 @@
+import time
+import numpy as np
+
+class GameClock:
+    """Chess-style game clock: each player starts with ``base`` seconds and
+    gains ``increment`` seconds after every completed turn
+
+    Only the player to move has a running clock. ``switch`` charges the
+    elapsed time to that player, adds the increment and starts the other clock.
+    """
+
+    def __init__(self, base=60, increment=1):
+        self.base = base
+        self.increment = increment
+        self.remaining = {1: float(base), 2: float(base)}
+        self.running = None
+        self.started = None
+
+    def start(self, piece):
+        self.running = piece
+        self.started = time.perf_counter()
+
+    def elapsed(self):
+        """Seconds used so far on the current turn"""
+        if self.running is None:
+            return 0
+        return time.perf_counter() - self.started
+
+    def time_left(self, piece):
+        """Seconds left for piece, counting the turn in progress"""
+        if piece == self.running:
+            return self.remaining[piece] - self.elapsed()
+        return self.remaining[piece]
+
+    def flagged(self, piece):
+        return self.time_left(piece) <= 0
+
+    def switch(self, piece):
+        """End piece's turn and start the opponent's clock; returns the turn's duration"""
+        used = self.elapsed()
+        self.remaining[piece] -= used
+        if self.remaining[piece] > 0:
+            self.remaining[piece] += self.increment
+        self.start(2 if piece == 1 else 1)
+        return used
+
+    def stop(self):
+        if self.running is not None:
+            self.remaining[self.running] -= self.elapsed()
+            self.running = None
+
+
+class TimeManager:
+    """Per-move search budgets from the time left on a game clock
+
+    The budget is the remaining time spread over the moves the player is
+    still expected to make, plus most of the increment. It is scaled down in
+    the opening, where the book and shallow searches suffice, and in the
+    endgame, which the solver handles, and scaled up in volatile positions
+    with many open three-in-a-rows. A budget never exceeds ``max_fraction``
+    of the remaining time and always leaves ``reserve`` seconds on the clock.
+    """
+
+    def __init__(self, increment=0, min_moves_left=4, max_fraction=0.3, reserve=0.1, min_budget=0.01):
+        self.increment = increment
+        self.min_moves_left = min_moves_left
+        self.max_fraction = max_fraction
+        self.reserve = reserve
+        self.min_budget = min_budget
+
+    def moves_left(self, board):
+        """Moves the player to move can still expect to make"""
+        empty = board.ROW_COUNT * board.COLUMN_COUNT - board.num_slots_filled
+        return max((empty + 1) // 2, self.min_moves_left)
+
+    def phase_factor(self, board):
+        filled = board.num_slots_filled
+        empty = board.ROW_COUNT * board.COLUMN_COUNT - filled
+        if filled < 4:
+            return 0.5
+        if empty <= 12:
+            return 0.5
+        return 1.0
+
+    def volatility(self, board):
+        """1.0 for a quiet position, up to 2.0 with many open three-in-a-rows"""
+        cells = np.asarray(board.board).ravel()[board.get_windows()]
+        empties = np.count_nonzero(cells == 0, axis=1)
+        threes = 0
+        for piece in (board.PLAYER1_PIECE, board.PLAYER2_PIECE):
+            threes += np.count_nonzero((np.count_nonzero(cells == piece, axis=1) == board.WINDOW_LENGTH - 1) & (empties == 1))
+        return 1.0 + min(threes, 10) / 10
+
+    def budget(self, board, time_left):
+        """Seconds to spend on the move in board with time_left on the clock"""
+        available = time_left - self.reserve
+        if available <= self.min_budget:
+            return self.min_budget
+        share = available / self.moves_left(board) + 0.75 * self.increment
+        share *= self.phase_factor(board) * self.volatility(board)
+        return max(self.min_budget, min(share, available * self.max_fraction))
@@ -0,0 +1,264 @@
+import os
+import mmap
+import fcntl
+import struct
+import hashlib
+from multiprocessing import shared_memory
+import numpy as np
+
+class TranspositionTable:
+    """In-memory transposition table for alpha-beta search
+
+    Entries are (depth, flag, value, move) tuples keyed by a position key.
+    The table is cleared once it reaches ``max_entries`` so long batches and
+    long sessions stay bounded.
+    """
+    EXACT = 0
+    LOWER = 1
+    UPPER = 2
+
+    def __init__(self, max_entries=1_000_000):
+        self.max_entries = max_entries
+        self.entries = {}
+        self.hits = 0
+        self.stores = 0
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.hits += 1
+        return entry
+
+    def store(self, key, depth, flag, value, move):
+        if len(self.entries) >= self.max_entries:
+            self.entries.clear()
+        self.entries[key] = (depth, flag, value, move)
+        self.stores += 1
+
+    def clear(self):
+        self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class LayeredTranspositionTable:
+    """Reads from a fast primary table before a backing table and stores into both"""
+
+    def __init__(self, primary, backing):
+        self.primary = primary
+        self.backing = backing
+
+    def get(self, key):
+        entry = self.primary.get(key)
+        if entry is None:
+            entry = self.backing.get(key)
+        return entry
+
+    def store(self, key, depth, flag, value, move):
+        self.primary.store(key, depth, flag, value, move)
+        self.backing.store(key, depth, flag, value, move)
+
+    def clear(self):
+        self.primary.clear()
+
+    def __len__(self):
+        return len(self.primary)
+
+
+class SlotTable:
+    """Fixed-size, lock-free table of search results over an int64 buffer
+
+    Each slot is three int64 words: a check word, the value's float64 bits and
+    a packed (depth, flag, move, generation) info word. The check word is the key's hash
+    XORed with the other two, so a slot torn by a concurrent write simply fails
+    verification and reads as a miss. Keys are hashed with blake2b so every
+    process maps a key to the same slot. Subclasses provide the buffer.
+    """
+    EXACT = TranspositionTable.EXACT
+    LOWER = TranspositionTable.LOWER
+    UPPER = TranspositionTable.UPPER
+    WORDS = 3
+
+    def __init__(self, buffer, slots, writable=True):
+        self.slots = slots
+        self.writable = writable
+        self.table = np.ndarray((slots, self.WORDS), dtype=np.int64, buffer=buffer)
+        self.values = self.table[:, 1].view(np.float64)
+        self.generation = 0
+        self.hits = 0
+        self.stores = 0
+
+    def hash_key(self, key):
+        data, maximizing = key
+        digest = hashlib.blake2b(data + (b'\x01' if maximizing else b'\x00'), digest_size=8).digest()
+        return int.from_bytes(digest, 'little', signed=True)
+
+    def read(self, key):
+        """Return (slot, info, value) for key, with info 0 on a miss"""
+        h = self.hash_key(key)
+        slot = h % self.slots
+        check, bits, info = (int(x) for x in self.table[slot])
+        if check ^ bits ^ info != h:
+            return slot, 0, 0
+        return slot, info, float(self.values[slot])
+
+    def get(self, key):
+        _, info, value = self.read(key)
+        if info == 0:
+            return None
+        self.hits += 1
+        move = (info >> 10 & 0x3ff) - 1
+        return info & 0xff, info >> 8 & 3, value, None if move < 0 else move
+
+    def replaces(self, slot, depth):
+        """Whether a new entry of this depth may overwrite slot"""
+        return True
+
+    def store(self, key, depth, flag, value, move):
+        if not self.writable:
+            return
+        h = self.hash_key(key)
+        slot = h % self.slots
+        if not self.replaces(slot, depth):
+            return
+        bits = int(np.float64(value).view(np.int64))
+        # Bit 20 marks the slot as used, so a stored info word is never zero
+        info = (min(depth, 0xff) | flag << 8 | (0 if move is None else move + 1) << 10 | 1 << 20
+                | (self.generation & 0xffff) << 21)
+        self.table[slot] = (h ^ bits ^ info, bits, info)
+        self.stores += 1
+
+    def clear(self):
+        self.table.fill(0)
+
+    def __len__(self):
+        return int(np.count_nonzero(self.table[:, 2]))
+
+
+class SharedTranspositionTable(SlotTable):
+    """SlotTable in ``multiprocessing.shared_memory`` for parallel search
+
+    Newer entries always replace older ones.
+    """
+
+    def __init__(self, shm, slots, owner=False):
+        super().__init__(shm.buf, slots)
+        self.shm = shm
+        self.owner = owner
+
+    @classmethod
+    def create(cls, slots=1 << 20):
+        shm = shared_memory.SharedMemory(create=True, size=slots * cls.WORDS * 8)
+        table = cls(shm, slots, owner=True)
+        table.clear()
+        return table
+
+    @classmethod
+    def attach(cls, name, slots):
+        return cls(shared_memory.SharedMemory(name=name), slots)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def close(self):
+        del self.table, self.values
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+class PersistentTranspositionTable(SlotTable):
+    """SlotTable in a memory-mapped file that survives between processes
+
+    Opening maps the file without reading it, so startup cost does not grow
+    with the cache. One process at a time holds the writer lock (fcntl.flock);
+    others open the file read-only and their stores are ignored, and read it as
+    empty until the writer has laid it out. Every writer
+    session bumps a generation counter in the header. When slots collide, an
+    entry from an older generation is always evicted and one from the current
+    generation is only replaced by a search at least as deep.
+    """
+    MAGIC = b'C4TT'
+    VERSION = 2
+    HEADER = struct.Struct('<4sHxxQQ')  # magic, version, slots, generation
+    HEADER_SIZE = 64
+
+    def __init__(self, path, slots=1 << 20, writable=True):
+        self.path = path
+        self.file = None
+        self.data = None
+        self.writable = False
+        if writable:
+            self.file = os.fdopen(os.open(path, os.O_RDWR | os.O_CREAT), 'r+b')
+            try:
+                fcntl.flock(self.file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                self.writable = True
+            except OSError:
+                self.file.close()
+                self.file = None
+        if self.writable:
+            if self.read_header() is None:
+                # Only the lock holder lays the file out: the full size before the
+                # header, so a reader that sees the header can map every slot
+                self.file.truncate(self.HEADER_SIZE + slots * self.WORDS * 8)
+                self.file.seek(0)
+                self.file.write(self.HEADER.pack(self.MAGIC, self.VERSION, slots, 0))
+                self.file.flush()
+        elif os.path.exists(path):
+            self.file = open(path, 'rb')
+
+        header = self.read_header()
+        if header is None:
+            # Not created yet or still being laid out by its writer: read as empty
+            super().__init__(bytearray(slots * self.WORDS * 8), slots, writable=False)
+            return
+        magic, version, slots, generation = header
+        if magic != self.MAGIC or version != self.VERSION:
+            raise ValueError(f"{path} is not a version {self.VERSION} transposition cache")
+        if os.fstat(self.file.fileno()).st_size < self.HEADER_SIZE + slots * self.WORDS * 8:
+            raise ValueError(f"{path} is smaller than its {slots} slots")
+
+        access = mmap.ACCESS_WRITE if self.writable else mmap.ACCESS_READ
+        self.data = mmap.mmap(self.file.fileno(), 0, access=access)
+        buffer = memoryview(self.data)[self.HEADER_SIZE:self.HEADER_SIZE + slots * self.WORDS * 8]
+        super().__init__(buffer, slots, self.writable)
+        if self.writable:
+            generation += 1
+            self.HEADER.pack_into(self.data, 0, self.MAGIC, self.VERSION, slots, generation)
+        self.generation = generation
+
+    def read_header(self):
+        """(magic, version, slots, generation) of the file, None if it has no header yet"""
+        if self.file is None:
+            return None
+        data = os.pread(self.file.fileno(), self.HEADER.size, 0)
+        if len(data) < self.HEADER.size or not any(data):
+            return None
+        return self.HEADER.unpack(data)
+
+    def __getstate__(self):
+        # Copies in other processes reopen the file, read-only unless the lock is free
+        return {'path': self.path}
+
+    def __setstate__(self, state):
+        self.__init__(state['path'])
+
+    def replaces(self, slot, depth):
+        info = int(self.table[slot, 2])
+        if info == 0 or (info >> 21 & 0xffff) != (self.generation & 0xffff):
+            return True
+        return depth >= info & 0xff
+
+    def flush(self):
+        if self.writable:
+            self.data.flush()
+
+    def close(self):
+        del self.table, self.values
+        self.flush()
+        if self.data is not None:
+            self.data.close()
+        if self.file is not None:
+            self.file.close()
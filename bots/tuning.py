@@ -0,0 +1,187 @@
+import os
+import json
+import argparse
+import numpy as np
+from board.board import Board, get_windows
+from bots.evaluation import Evaluation
+from bots.minimax_custom import MinimaxCustom
+from bots.selfplay import read_arrays
+
+# Feature order per evaluator, matching the weight names each one loads
+FEATURES = {
+    'evaluation': ['center', 'four', 'three', 'two', 'opp_three', 'opp_four'],
+    'minimax_custom': ['center', 'four', 'opp_three', 'three', 'opp_two', 'two'],
+}
+DEFAULT_WEIGHTS = {'evaluation': Evaluation.WEIGHTS, 'minimax_custom': MinimaxCustom.WEIGHTS}
+
+
+class PositionStore:
+    """Labelled positions held as flat numpy arrays
+
+    Each position is its packed Board.to_bytes() encoding (two bits per cell)
+    and the game outcome for the side to move (1 win, 0 draw, -1 loss), so a
+    million positions take about 17 MB. The encoding does not hold the board
+    size, so all positions of a store share one ``geometry``.
+    """
+    CLASSIC = (Board.ROW_COUNT, Board.COLUMN_COUNT, Board.WINDOW_LENGTH)
+
+    def __init__(self, positions, outcomes, geometry=CLASSIC):
+        self.positions = np.ascontiguousarray(positions, dtype=np.uint8)
+        self.outcomes = np.asarray(outcomes, dtype=np.int8)
+        self.geometry = tuple(int(n) for n in geometry)
+
+    def __len__(self):
+        return len(self.outcomes)
+
+    @classmethod
+    def from_boards(cls, boards, outcomes):
+        """A store of boards that all have the same geometry; raises ValueError otherwise"""
+        geometries = {board.geometry for board in boards}
+        if len(geometries) > 1:
+            raise ValueError(f"boards of different geometries cannot share a store: {sorted(geometries)}")
+        positions = np.array([np.frombuffer(board.to_bytes(), dtype=np.uint8) for board in boards])
+        return cls(positions, outcomes, geometries.pop() if geometries else cls.CLASSIC)
+
+    @classmethod
+    def from_selfplay(cls, directory):
+        """Load every record of a bots.selfplay output directory (always classic boards)"""
+        positions, outcomes = [], []
+        for records in read_arrays(directory):
+            positions.append(records['position'])
+            outcomes.append(records['outcome'])
+        if not positions:
+            return cls(np.zeros((0, len(Board(1).to_bytes())), dtype=np.uint8), [])
+        return cls(np.concatenate(positions), np.concatenate(outcomes))
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        geometry = data['geometry'] if 'geometry' in data else cls.CLASSIC
+        return cls(data['positions'], data['outcomes'], geometry)
+
+    def save(self, path):
+        np.savez_compressed(path, positions=self.positions, outcomes=self.outcomes, geometry=np.array(self.geometry))
+
+    def cells(self, start, stop):
+        """Cell values (rows * columns per position, bottom row first) and side to move"""
+        packed = self.positions[start:stop]
+        side = packed[:, 0] & 3
+        body = packed[:, 5:]
+        cells = np.stack((body >> 6, body >> 4 & 3, body >> 2 & 3, body & 3), axis=2).reshape(len(packed), -1)
+        rows, columns, _ = self.geometry
+        return cells[:, :rows * columns], side
+
+    def features(self, evaluator='evaluation', chunk=100_000):
+        """Feature matrix for every position, scored for the side to move
+
+        Column i counts what weight FEATURES[evaluator][i] multiplies in that
+        evaluator's score_position, so the score is features @ weights.
+        """
+        rows, columns, length = self.geometry
+        windows = get_windows(rows, columns, length)
+        center = np.arange(rows) * columns + columns // 2
+        names = FEATURES[evaluator]
+        result = np.zeros((len(self), len(names)), dtype=np.float32)
+        for start in range(0, len(self), chunk):
+            cells, side = self.cells(start, start + chunk)
+            side = side[:, None]
+            window_cells = cells[:, windows]
+            own = np.count_nonzero(window_cells == side[:, :, None], axis=2)
+            empty = np.count_nonzero(window_cells == Board.EMPTY, axis=2)
+            opp = length - own - empty
+            # As in the evaluators, 'four' is a full line and 'three'/'two' one and two short of it
+            counts = {
+                'center': np.count_nonzero(cells[:, center] == side, axis=1),
+                'four': np.count_nonzero(own == length, axis=1),
+                'three': np.count_nonzero((own == length - 1) & (empty == 1), axis=1),
+                'two': np.count_nonzero((own == length - 2) & (empty == 2), axis=1),
+                'opp_three': np.count_nonzero((opp == length - 1) & (empty == 1), axis=1),
+                'opp_two': np.count_nonzero((opp == length - 2) & (empty == 2), axis=1),
+                'opp_four': np.count_nonzero(opp == length, axis=1),
+            }
+            result[start:start + len(side)] = np.stack([counts[name] for name in names], axis=1)
+        return result
+
+
+def sigmoid(x):
+    return 1 / (1 + np.exp(-np.clip(x, -50, 50)))
+
+def texel_error(features, results, weights, scale):
+    return float(np.mean((results - sigmoid(features @ weights / scale)) ** 2))
+
+def fit_scale(features, results, weights):
+    """The score-to-probability scale that best fits the starting weights"""
+    scales = np.geomspace(1, 10000, 81)
+    errors = [texel_error(features, results, weights, scale) for scale in scales]
+    return float(scales[int(np.argmin(errors))])
+
+def tune(store, evaluator='evaluation', weights=None, epochs=500, learning_rate=0.5, progress=None):
+    """Fit window weights to game outcomes by gradient descent (Texel tuning)
+
+    Minimises the mean squared error between the outcome (1 win, 0.5 draw,
+    0 loss) and sigmoid(score / scale). The scale is fitted to the starting
+    weights first and then held, so tuned weights stay on the same scale as
+    the hand-picked ones. Features that never occur in the data (four in a
+    row is always a finished game) keep their starting weight.
+    Returns (weights dict, error before, error after).
+    """
+    names = FEATURES[evaluator]
+    start = dict(DEFAULT_WEIGHTS[evaluator] if weights is None else weights)
+    features = store.features(evaluator)
+    results = (store.outcomes.astype(np.float32) + 1) / 2
+    w = np.array([start[name] for name in names], dtype=np.float64)
+    scale = fit_scale(features, results, w)
+    before = texel_error(features, results, w, scale)
+
+    # Descend in units of each feature's spread so one learning rate suits all
+    spread = features.std(axis=0)
+    free = spread > 0
+    normalised = features[:, free] / spread[free]
+    v = w[free] * spread[free] / scale
+    for epoch in range(epochs):
+        predicted = sigmoid(normalised @ v + features[:, ~free] @ w[~free] / scale)
+        error = predicted - results
+        gradient = 2 * normalised.T @ (error * predicted * (1 - predicted)) / len(results)
+        v -= learning_rate * gradient
+        if progress is not None and (epoch + 1) % 100 == 0:
+            progress(epoch + 1, float(np.mean(error ** 2)))
+    w[free] = v * scale / spread[free]
+
+    # Scores stay integers, as with the hand-picked weights
+    tuned = {name: int(round(value)) for name, value in zip(names, w)}
+    return tuned, before, texel_error(features, results, np.array([tuned[name] for name in names]), scale)
+
+def export_weights(path, evaluator, weights):
+    """Write weights into ``path`` under the evaluator's section, keeping other sections"""
+    data = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            data = json.load(f)
+    section = dict(data.get(evaluator, {}))
+    section.update(weights)
+    data[evaluator] = section
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=1)
+
+def main():
+    parser = argparse.ArgumentParser(description="Tune evaluation weights on self-play positions")
+    parser.add_argument('data', help="bots.selfplay directory or a saved .npz position store")
+    parser.add_argument('output', help="JSON weights file for Evaluation / MinimaxCustom")
+    parser.add_argument('--evaluator', choices=sorted(FEATURES), default='evaluation')
+    parser.add_argument('--epochs', type=int, default=500)
+    parser.add_argument('--learning-rate', type=float, default=0.5)
+    args = parser.parse_args()
+
+    store = PositionStore.load(args.data) if args.data.endswith('.npz') else PositionStore.from_selfplay(args.data)
+    print(f"Loaded {len(store)} positions")
+
+    def progress(epoch, error):
+        print(f"epoch {epoch}: error {error:.5f}")
+
+    weights, before, after = tune(store, args.evaluator, epochs=args.epochs,
+                                  learning_rate=args.learning_rate, progress=progress)
+    export_weights(args.output, args.evaluator, weights)
+    print(f"Error {before:.5f} -> {after:.5f}; wrote {weights} to {args.output}")
+
+if __name__ == '__main__':
+    main()
@@ -1,33 +1,71 @@
 import sys
 import os
-import pygame
 import numpy as np
 import math
 import random
 import time
 from bots import *
-from board import *
+from board import Board
 from players.human import Human
 from players.human_custom import HumanCustom
 from bots.minimax_custom import MinimaxCustom
+from bots.time_manager import GameClock, TimeManager
+from bots.profiling import SearchProfiler
+from board.records import RecordLog, DRAW, UNFINISHED
 
 # Hide pygame welcome message
 os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = "hide"
 
+# pygame and the graphics module are only loaded once a UI is created, so
+# headless games and bot-only processes never pay for them
+pygame = None
+GBoard = EventLoop = None
+
+def init_graphics():
+    global pygame, GBoard, EventLoop
+    if pygame is None:
+        import pygame as pygame_module
+        from board.graphics import GBoard as gboard_class, EventLoop as event_loop_class
+        pygame, GBoard, EventLoop = pygame_module, gboard_class, event_loop_class
+    pygame.init()
+
 class Connect4Game:
-    def __init__(self, p1, p2, ui=True):
+    def __init__(self, p1, p2, ui=True, clock=None, seed=None, record=None, player_configs=None, geometry=None,
+                 profiler=None):
         self.p1 = p1
         self.p2 = p2
         self.ui = ui
-        self.board = Board(random.randint(Board.PLAYER1_PIECE, Board.PLAYER2_PIECE))
+        # Every game is seeded, so a recorded game can be reproduced with the same bots
+        self.seed = random.randrange(2 ** 32) if seed is None else seed
+        random.seed(self.seed)
+        # geometry is an optional (rows, columns, connect) for non-standard boards
+        self.board = Board(random.randint(Board.PLAYER1_PIECE, Board.PLAYER2_PIECE), *(geometry or ()))
+        if ui:
+            init_graphics()
         self.graphics_board = GBoard(self.board) if ui else None
         self.game_over = False
         self.turn = self.board.CURR_PLAYER
         self.time_p1 = self.time_p2 = 0
         self.moves_count_p1 = self.moves_count_p2 = 0
-        self.PLAYER_COLOUR = [GBoard.RED, GBoard.YELLOW]
+        self.PLAYER_COLOUR = [GBoard.RED, GBoard.YELLOW] if ui else None
         self.human_move = None
         self.waiting_for_human = False
+        self.event_loop = EventLoop() if ui else None
+        # Optional GameClock; bots that support it get per-move budgets from it
+        self.clock = clock
+        self.time_manager = TimeManager(clock.increment) if clock is not None else None
+        # Optional RecordLog the game is appended to move by move
+        self.record = record
+        self.player_configs = player_configs or [player_config(p1), player_config(p2)]
+        self.result = UNFINISHED
+        self.move_started = None
+        # Optional SearchProfiler measuring the memory each bot move uses
+        self.profiler = profiler
+
+    def is_human_turn(self):
+        if self.turn == Board.PLAYER1_PIECE:
+            return isinstance(self.p1, Human)
+        return isinstance(self.p2, Human)
 
     def next_turn(self):
         print(f"\nPlayer {self.turn}'s Turn\n")
@@ -38,13 +76,55 @@ class Connect4Game:
 
         self.turn = Board.PLAYER2_PIECE if self.turn == Board.PLAYER1_PIECE else Board.PLAYER1_PIECE
 
+    def clock_timeout(self):
+        """Milliseconds until the player to move runs out of time, or None without a clock"""
+        if self.clock is None:
+            return None
+        return max(1, int(self.clock.time_left(self.turn) * 1000) + 1)
+
+    def set_time_budget(self, player, piece):
+        if self.clock is not None and hasattr(player, 'set_time_budget'):
+            player.set_time_budget(self.time_manager.budget(self.board, self.clock.time_left(piece)))
+
+    def out_of_time(self, piece):
+        if self.clock is None or not self.clock.flagged(piece):
+            return False
+        winner = Board.PLAYER2_PIECE if piece == Board.PLAYER1_PIECE else Board.PLAYER1_PIECE
+        if self.ui:
+            self.graphics_board.write_on_board(f"PLAYER {winner} WINS ON TIME!",
+                                               self.PLAYER_COLOUR[winner - 1], 350, 50, 60, True)
+            self.graphics_board.update_gboard()
+        print(f"\nPLAYER {piece} RAN OUT OF TIME, PLAYER {winner} WINS!")
+        self.result = winner
+        return True
+
+    def get_bot_move(self, player, piece):
+        self.set_time_budget(player, piece)
+        if self.profiler is None:
+            return player.get_move(self.board)
+        self.profiler.begin_move()
+        move = player.get_move(self.board)
+        self.profiler.end_move(player, piece)
+        return move
+
+    def end_turn(self, piece):
+        """Switch turns unless piece still has the second drop of a double move"""
+        if not self.board.double_move_available[piece]:
+            self.next_turn()
+            if self.clock is not None:
+                self.clock.switch(piece)
+
     def check_win(self, piece):
-        if self.board.winning_move(piece):
+        # A powerup can complete a line for the opponent too
+        winner = self.board.get_winner(piece)
+        if winner is not None:
+            piece = winner
             if self.ui:
                 self.graphics_board.write_on_board(f"PLAYER {piece} WINS!", 
                                                  self.PLAYER_COLOUR[piece - 1], 350, 50, 70, True)
                 self.graphics_board.update_gboard()
             print(f"\nPLAYER {piece} WINS!")
+            self.result = piece
             return True
         
         if self.board.check_draw():
@@ -52,52 +132,28 @@ class Connect4Game:
                 self.graphics_board.write_on_board("IT'S A TIE!", self.graphics_board.LIGHTBLUE, 350, 50, 70, True)
                 self.graphics_board.update_gboard()
             print("\nIT'S A TIE!")
+            self.result = DRAW
             return True
         return False
 
     def handle_move(self, move, player_piece):
-        if isinstance(move, tuple):
-            if move[0] == 'powerup':
-                powerup_type = move[1]
-                params = move[2]
-                success = self.board.use_powerup(powerup_type, player_piece, **params)
-                if success:
-                    print(f"Player {player_piece} used powerup {powerup_type}")
-                    if self.ui:
-                        self.graphics_board.draw_gboard(self.board)
-                        self.graphics_board.update_gboard()
-                    return True
-                return False
-            elif move[0] == 'double':
-                col = move[1]
-                if self.board.is_valid_location(col):
-                    # Execute first move
-                    self.board.drop_piece(col, player_piece)
-                    # Set up for second move
-                    self.board.double_move_available[player_piece] = True
-                    self.board.double_move_column[player_piece] = col
-                    if self.ui:
-                        self.graphics_board.draw_gboard(self.board)
-                        self.graphics_board.update_gboard()
-                    return True
-                return False
-        else:
-            if self.board.is_valid_location(move):
-                # If this is a second move of a double move, check the column
-                if self.board.double_move_available[player_piece]:
-                    if move != self.board.double_move_column[player_piece]:
-                        print("Invalid move: Must use the same column for double move")
-                        return False
-                self.board.drop_piece(move, player_piece)
-                # Reset double move state after second move
-                if self.board.double_move_available[player_piece]:
-                    self.board.double_move_available[player_piece] = False
-                    self.board.double_move_column[player_piece] = None
-                if self.ui:
-                    self.graphics_board.draw_gboard(self.board)
-                    self.graphics_board.update_gboard()
-                return True
-        return False
+        if not isinstance(move, tuple) and self.board.is_valid_location(move) \
+                and self.board.double_move_available[player_piece] \
+                and move != self.board.double_move_column[player_piece]:
+            print("Invalid move: Must use the same column for double move")
+            return False
+        if not self.board.apply_player_move(move, player_piece):
+            return False
+        if self.record is not None:
+            now = time.perf_counter()
+            self.record.add_move(move, player_piece, now - self.move_started)
+            self.move_started = now
+        if isinstance(move, tuple) and move[0] == 'powerup':
+            print(f"Player {player_piece} used powerup {move[1]}")
+        if self.ui:
+            self.graphics_board.draw_gboard(self.board)
+            self.graphics_board.update_gboard()
+        return True
 
     def handle_human_input(self, event):
         if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
@@ -115,10 +171,23 @@ class Connect4Game:
             self.graphics_board.draw_gboard(self.board)
             self.graphics_board.update_gboard()
 
+        if self.clock is not None:
+            self.clock.start(self.turn)
+        if self.record is not None:
+            self.record.start_game(self.board.CURR_PLAYER, self.seed, self.player_configs, time.time())
+            self.move_started = time.perf_counter()
+
         while not self.game_over:
+            if self.out_of_time(self.turn):
+                self.game_over = True
+
             # Handle events for human players
-            if self.ui:
-                for event in pygame.event.get():
+            if self.ui and not self.game_over:
+                if self.is_human_turn() and self.human_move is None:
+                    events = self.event_loop.events(self.clock_timeout())
+                else:
+                    events = self.event_loop.poll()
+                for event in events:
                     if event.type == pygame.QUIT:
                         sys.exit()
                     if isinstance(self.p1, Human) and self.turn == Board.PLAYER1_PIECE:
@@ -136,13 +205,13 @@ class Connect4Game:
                     else:
                         continue
                 else:
-                    move = self.p1.get_move(self.board)
+                    move = self.get_bot_move(self.p1, Board.PLAYER1_PIECE)
                 
-                if self.handle_move(move, Board.PLAYER1_PIECE):
+                if self.out_of_time(Board.PLAYER1_PIECE):
+                    self.game_over = True
+                elif self.handle_move(move, Board.PLAYER1_PIECE):
                     self.moves_count_p1 += 1
-                    # Only switch turns if not in double move state
-                    if not self.board.double_move_available[Board.PLAYER1_PIECE]:
-                        self.next_turn()
+                    self.end_turn(Board.PLAYER1_PIECE)
                     self.game_over = self.check_win(Board.PLAYER1_PIECE)
             end = time.perf_counter()
             self.time_p1 += (end - start)
@@ -157,55 +226,128 @@ class Connect4Game:
                     else:
                         continue
                 else:
-                    move = self.p2.get_move(self.board)
+                    move = self.get_bot_move(self.p2, Board.PLAYER2_PIECE)
                 
-                if self.handle_move(move, Board.PLAYER2_PIECE):
+                if self.out_of_time(Board.PLAYER2_PIECE):
+                    self.game_over = True
+                elif self.handle_move(move, Board.PLAYER2_PIECE):
                     self.moves_count_p2 += 1
-                    # Only switch turns if not in double move state
-                    if not self.board.double_move_available[Board.PLAYER2_PIECE]:
-                        self.next_turn()
+                    self.end_turn(Board.PLAYER2_PIECE)
                     self.game_over = self.check_win(Board.PLAYER2_PIECE)
             end = time.perf_counter()
             self.time_p2 += (end - start)
 
             if self.game_over:
+                self.stop_pondering()
+                if self.clock is not None:
+                    self.clock.stop()
+                if self.record is not None:
+                    self.record.end_game(self.result)
                 if self.ui:
                     pygame.time.wait(1000)
                 self.print_game_stats()
                 if self.ui:
                     sys.exit()
 
+    def stop_pondering(self):
+        for player in (self.p1, self.p2):
+            if hasattr(player, 'stop_pondering'):
+                player.stop_pondering()
+
     def print_game_stats(self):
         print("\nPlayer 1")
         print(f"TIME: {round(self.time_p1, 2):.2f} seconds")
         print(f"MOVES: {self.moves_count_p1}")
+        if self.clock is not None:
+            print(f"CLOCK: {self.clock.remaining[Board.PLAYER1_PIECE]:.2f} seconds left")
+        self.print_rollout_rates(self.p1)
+        self.print_ponder_stats(self.p1)
+        self.print_profile(Board.PLAYER1_PIECE)
         print("\nPlayer 2")
         print(f"TIME: {round(self.time_p2, 2):.2f} seconds")
         print(f"MOVES: {self.moves_count_p2}")
+        if self.clock is not None:
+            print(f"CLOCK: {self.clock.remaining[Board.PLAYER2_PIECE]:.2f} seconds left")
+        self.print_rollout_rates(self.p2)
+        self.print_ponder_stats(self.p2)
+        self.print_profile(Board.PLAYER2_PIECE)
+
+    def print_rollout_rates(self, player):
+        rates = player.rollout_rates() if hasattr(player, 'rollout_rates') else {}
+        for i, rate in enumerate(rates.values()):
+            print(f"WORKER {i + 1}: {rate:.0f} rollouts/second")
+
+    def print_ponder_stats(self, player):
+        if getattr(player, 'ponder', False):
+            print(f"PONDER: {player.ponder_hits} hits, {player.ponder_misses} misses")
+
+    def print_profile(self, piece):
+        summary = self.profiler.summary(piece) if self.profiler is not None else None
+        if summary is None:
+            return
+        print(f"PEAK RSS: {summary['peak_rss'] / 2 ** 20:.1f} MB")
+        print(f"BOARD COPIES: {summary['board_copies']}")
+        if summary['max_tree_nodes'] is not None:
+            print(f"TREE: {summary['max_tree_nodes']} nodes, ~{summary['bytes_per_node']} bytes per node")
+
+def player_config(player):
+    """Class name and plain settings of a player, as stored in game records"""
+    config = {'class': type(player).__name__}
+    for name, value in vars(player).items():
+        if isinstance(value, (int, float, str, bool, type(None))) and not name.startswith('_'):
+            config[name] = value
+    return config
 
 # Bot configuration
 BOT_CONFIG = {
     'human': {'class': Human, 'name': 'Human'},
-    'minimax': {'class': MiniMaxBot, 'name': 'MiniMax Bot'},
-    'montecarlo': {'class': MonteCarloBot, 'name': 'Monte Carlo Tree Search Bot'},
+    'minimax': {'class': MiniMaxBot, 'name': 'MiniMax Bot', 'cache': True},
+    'montecarlo': {'class': MonteCarloBot, 'name': 'Monte Carlo Tree Search Bot', 'cache': True, 'ponder': True},
     'human_custom': {'class': HumanCustom, 'name': 'Human (Custom)'},
-    'minimax_custom': {'class': MinimaxCustom, 'name': 'MiniMax Bot (Custom)'},
+    'minimax_custom': {'class': MinimaxCustom, 'name': 'MiniMax Bot (Custom)', 'depth': 4},
     'montecarlo_custom': {'class': MonteCarloCustom, 'name': 'Monte Carlo Tree Search Bot (Custom)'}
 }
 
-def create_player(player_type, piece):
+def create_player(player_type, piece, cache_dir=None, ponder=False):
     if player_type is None or player_type == "human":
         return Human(piece)
     
     if player_type in BOT_CONFIG:
-        return BOT_CONFIG[player_type]['class'](piece)
+        config = BOT_CONFIG[player_type]
+        options = {}
+        if cache_dir is not None and config.get('cache'):
+            # Bots of the same type share one cache file; the first one opened
+            # in a process writes to it, any others read from it
+            os.makedirs(cache_dir, exist_ok=True)
+            options['cache'] = os.path.join(cache_dir, f"{player_type}.tt")
+        if ponder and config.get('ponder'):
+            options['ponder'] = True
+        if 'depth' in config:
+            options['depth'] = config['depth']
+        return config['class'](piece, **options)
     
     print(f"Error: Unknown player type '{player_type}'")
     sys.exit(1)
 
-def start_game(p1_type, p2_type, ui=True):
-    p1 = create_player(p1_type, Board.PLAYER1_PIECE)
-    p2 = create_player(p2_type, Board.PLAYER2_PIECE)
+def start_game(p1_type, p2_type, ui=True, cache_dir=None, ponder=False, time_control=None, record_path=None, seed=None,
+               geometry=None, profile_path=None):
+    """Play one game
+
+    time_control is an optional (base seconds, increment seconds) clock,
+    record_path a game log (see board.records) the game is appended to and
+    geometry an optional (rows, columns, connect) board. Record logs only
+    hold standard 6x7 connect-four games. With profile_path the bots' moves
+    are profiled (see bots.profiling) and the report written there as JSON.
+    With ponder, bots that support it think on a human opponent's time.
+    """
+    if geometry is not None and record_path is not None:
+        print("Error: Only standard boards can be recorded!")
+        sys.exit(1)
+
+    # A ponder thread shares the interpreter lock with the other player's
+    # search, so bots only ponder on a human's time
+    p1 = create_player(p1_type, Board.PLAYER1_PIECE, cache_dir, ponder and p2_type in (None, 'human'))
+    p2 = create_player(p2_type, Board.PLAYER2_PIECE, cache_dir, ponder and p1_type in (None, 'human'))
 
     print(f"\nPlayer 1 is set as a {BOT_CONFIG.get(p1_type, {'name': 'Human'})['name']}")
     print(f"Player 2 is set as a {BOT_CONFIG.get(p2_type, {'name': 'Human'})['name']}\n")
@@ -214,14 +356,62 @@ def start_game(p1_type, p2_type, ui=True):
         print("Error: Cannot play game as Human without UI!")
         sys.exit(1)
 
-    game = Connect4Game(p1, p2, ui)
-    game.play()
+    clock = GameClock(*time_control) if time_control is not None else None
+    record = RecordLog(record_path) if record_path is not None else None
+    configs = [{'type': p1_type or 'human', **player_config(p1)}, {'type': p2_type or 'human', **player_config(p2)}]
+    profiler = SearchProfiler() if profile_path is not None else None
+    game = Connect4Game(p1, p2, ui, clock, seed, record, configs, geometry, profiler)
+    try:
+        game.play()
+    finally:
+        if record is not None:
+            record.close()
+        if profiler is not None:
+            profiler.stop()
+            profiler.dump(profile_path)
 
 def main():
     main_screen()
 
+def run_menu(graphics_board, title, subtitle, button_list):
+    """Run a button menu, sleeping between events and redrawing only on hover changes"""
+    event_loop = EventLoop()
+
+    while True:
+        if event_loop.dirty:
+            graphics_board.write_on_board(title, graphics_board.RED, 350, 100, 60, True)
+            graphics_board.write_on_board(subtitle, graphics_board.YELLOW, 350, 175, 30, True)
+            for button in button_list:
+                graphics_board.draw_button(button, graphics_board.screen)
+
+        event_loop.flip()
+
+        for event in event_loop.events():
+            if event.type == pygame.QUIT:
+                sys.exit()
+
+            elif event.type == pygame.MOUSEBUTTONDOWN:
+                if event.button == 1:
+                    for button in button_list:
+                        if button['button position'].collidepoint(event.pos):
+                            if(button['args'] != None):
+                                button['callback'](button['args'])
+                            else:
+                                button['callback']()
+                            event_loop.mark_dirty()
+
+            elif event.type == pygame.MOUSEMOTION:
+                for button in button_list:
+                    if button['button position'].collidepoint(event.pos):
+                        colour = graphics_board.RED
+                    else:
+                        colour = graphics_board.WHITE
+                    if button['color'] != colour:
+                        button['color'] = colour
+                        event_loop.mark_dirty()
+
 def main_screen():
-    pygame.init()
+    init_graphics()
     pygame.display.set_caption("Connect Four | AI Project")
     temp_board = Board(1)
     graphics_board = GBoard(temp_board)
@@ -240,34 +430,10 @@ def main_screen():
 
     button_list = [player_vs_player_button, player_vs_bot_button, bot_vs_bot_button, custom_game_button, quit_button]
 
-    while True:
-        graphics_board.write_on_board("CONNECT 4 GAME", graphics_board.RED , 350 , 100, 60, True)
-        graphics_board.write_on_board("CHOOSE ONE OF THE OPTIONS TO PLAY", graphics_board.YELLOW , 350 , 175, 30, True)
-
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                sys.exit()
-            
-            elif event.type == pygame.MOUSEBUTTONDOWN:
-                if event.button == 1:
-                    for button in button_list:
-                        if button['button position'].collidepoint(event.pos):
-                            button['callback']()
-            
-            elif event.type == pygame.MOUSEMOTION:
-                for button in button_list:
-                    if button['button position'].collidepoint(event.pos):
-                        button['color'] = graphics_board.RED
-                    else:
-                        button['color'] = graphics_board.WHITE
-
-        for button in button_list:
-            graphics_board.draw_button(button, graphics_board.screen)
-
-        pygame.display.update()
+    run_menu(graphics_board, "CONNECT 4 GAME", "CHOOSE ONE OF THE OPTIONS TO PLAY", button_list)
 
 def bot_vs_human_screen():
-    pygame.init()
+    init_graphics()
     temp_board = Board(1)
     graphics_board = GBoard(temp_board)
 
@@ -285,34 +451,10 @@ def bot_vs_human_screen():
 
     button_list = [minimax_button, montecarlo_button, back_button, quit_button]
 
-    while True:
-        graphics_board.write_on_board("CONNECT 4 GAME", graphics_board.RED , 350 , 100, 60, True)
-        graphics_board.write_on_board("CHOOSE THE BOT TO PLAY AGAINST", graphics_board.YELLOW , 350 , 175, 30, True)
-
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                sys.exit()
-
-            elif event.type == pygame.MOUSEBUTTONDOWN:
-                if event.button == 1:
-                    for button in button_list:
-                        if button['button position'].collidepoint(event.pos):
-                            button['callback']()
-            
-            elif event.type == pygame.MOUSEMOTION:
-                for button in button_list:
-                    if button['button position'].collidepoint(event.pos):
-                        button['color'] = graphics_board.RED
-                    else:
-                        button['color'] = graphics_board.WHITE
-
-        for button in button_list:
-            graphics_board.draw_button(button, graphics_board.screen)
-
-        pygame.display.update()
+    run_menu(graphics_board, "CONNECT 4 GAME", "CHOOSE THE BOT TO PLAY AGAINST", button_list)
 
 def bot_vs_bot_screen():
-    pygame.init()
+    init_graphics()
     temp_board = Board(1)
     graphics_board = GBoard(temp_board)
 
@@ -337,37 +479,10 @@ def bot_vs_bot_screen():
 
     button_list = [minimax_button, montecarlo_button, back_button, quit_button]
 
-    while True:
-        graphics_board.write_on_board("CONNECT 4 GAME", graphics_board.RED , 350 , 100, 60, True)
-        graphics_board.write_on_board("CHOOSE ANY TWO BOT(S) TO PLAY", graphics_board.YELLOW , 350 , 175, 30, True)
-
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                sys.exit()
-
-            elif event.type == pygame.MOUSEBUTTONDOWN:
-                if event.button == 1:
-                    for button in button_list:
-                        if button['button position'].collidepoint(event.pos):
-                            if(button['args'] != None):
-                                button['callback'](button['args'])
-                            else:
-                                button['callback']()
-            
-            elif event.type == pygame.MOUSEMOTION:
-                for button in button_list:
-                    if button['button position'].collidepoint(event.pos):
-                        button['color'] = graphics_board.RED
-                    else:
-                        button['color'] = graphics_board.WHITE                
-        
-        for button in button_list:
-            graphics_board.draw_button(button, graphics_board.screen)
-
-        pygame.display.update()
+    run_menu(graphics_board, "CONNECT 4 GAME", "CHOOSE ANY TWO BOT(S) TO PLAY", button_list)
 
 def custom_game_screen():
-    pygame.init()
+    init_graphics()
     temp_board = Board(1)
     graphics_board = GBoard(temp_board)
 
@@ -388,34 +503,10 @@ def custom_game_screen():
 
     button_list = [player_vs_player_button, player_vs_bot_button, bot_vs_bot_button, back_button, quit_button]
 
-    while True:
-        graphics_board.write_on_board("CONNECT 4 GAME", graphics_board.RED , 350 , 100, 60, True)
-        graphics_board.write_on_board("CHOOSE ONE OF THE OPTIONS TO PLAY", graphics_board.YELLOW , 350 , 175, 30, True)
-
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                sys.exit()
-            
-            elif event.type == pygame.MOUSEBUTTONDOWN:
-                if event.button == 1:
-                    for button in button_list:
-                        if button['button position'].collidepoint(event.pos):
-                            button['callback']()
-            
-            elif event.type == pygame.MOUSEMOTION:
-                for button in button_list:
-                    if button['button position'].collidepoint(event.pos):
-                        button['color'] = graphics_board.RED
-                    else:
-                        button['color'] = graphics_board.WHITE
-
-        for button in button_list:
-            graphics_board.draw_button(button, graphics_board.screen)
-
-        pygame.display.update()
+    run_menu(graphics_board, "CONNECT 4 GAME", "CHOOSE ONE OF THE OPTIONS TO PLAY", button_list)
 
 def custom_human_vs_bot_screen():
-    pygame.init()
+    init_graphics()
     temp_board = Board(1)
     graphics_board = GBoard(temp_board)
 
@@ -437,34 +528,10 @@ def custom_human_vs_bot_screen():
 
     button_list = [minimax_button, minimax_custom_button, montecarlo_custom_button, back_button, quit_button]
 
-    while True:
-        graphics_board.write_on_board("CUSTOM GAME MODE", graphics_board.RED, 350, 100, 60, True)
-        graphics_board.write_on_board("CHOOSE THE BOT TO PLAY AGAINST", graphics_board.YELLOW, 350, 175, 30, True)
-
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                sys.exit()
-
-            elif event.type == pygame.MOUSEBUTTONDOWN:
-                if event.button == 1:
-                    for button in button_list:
-                        if button['button position'].collidepoint(event.pos):
-                            button['callback']()
-            
-            elif event.type == pygame.MOUSEMOTION:
-                for button in button_list:
-                    if button['button position'].collidepoint(event.pos):
-                        button['color'] = graphics_board.RED
-                    else:
-                        button['color'] = graphics_board.WHITE
-
-        for button in button_list:
-            graphics_board.draw_button(button, graphics_board.screen)
-
-        pygame.display.update()
+    run_menu(graphics_board, "CUSTOM GAME MODE", "CHOOSE THE BOT TO PLAY AGAINST", button_list)
 
 def custom_bot_vs_bot_screen():
-    pygame.init()
+    init_graphics()
     temp_board = Board(1)
     graphics_board = GBoard(temp_board)
 
@@ -490,34 +557,7 @@ def custom_bot_vs_bot_screen():
 
     button_list = [minimax_button, minimax_custom_button, montecarlo_custom_button, back_button, quit_button]
 
-    while True:
-        graphics_board.write_on_board("CUSTOM GAME MODE", graphics_board.RED, 350, 100, 60, True)
-        graphics_board.write_on_board("CHOOSE ANY TWO BOT(S) TO PLAY", graphics_board.YELLOW, 350, 175, 30, True)
-
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                sys.exit()
-
-            elif event.type == pygame.MOUSEBUTTONDOWN:
-                if event.button == 1:
-                    for button in button_list:
-                        if button['button position'].collidepoint(event.pos):
-                            if(button['args'] != None):
-                                button['callback'](button['args'])
-                            else:
-                                button['callback']()
-            
-            elif event.type == pygame.MOUSEMOTION:
-                for button in button_list:
-                    if button['button position'].collidepoint(event.pos):
-                        button['color'] = graphics_board.RED
-                    else:
-                        button['color'] = graphics_board.WHITE
-
-        for button in button_list:
-            graphics_board.draw_button(button, graphics_board.screen)
-
-        pygame.display.update()
+    run_menu(graphics_board, "CUSTOM GAME MODE", "CHOOSE ANY TWO BOT(S) TO PLAY", button_list)
 
 if __name__ == '__main__':
     main()
@@ -76,8 +76,8 @@ class HumanCustom:
         """Get column input from player"""
         while True:
             try:
-                col = int(input(f"Enter column (0-{Board.COLUMN_COUNT-1}): "))
-                if 0 <= col < Board.COLUMN_COUNT:
+                col = int(input(f"Enter column (0-{board.COLUMN_COUNT-1}): "))
+                if 0 <= col < board.COLUMN_COUNT:
                     if self.selected_powerup is None:
                         if col in valid_locations:
                             return col
@@ -95,7 +95,7 @@ class HumanCustom:
                             else:
                                 print("Invalid column. Please try again.")
                 else:
-                    print(f"Column must be between 0 and {Board.COLUMN_COUNT-1}")
+                    print(f"Column must be between 0 and {board.COLUMN_COUNT-1}")
             except ValueError:
                 print("Please enter a valid number.")
 
@@ -115,16 +115,16 @@ class HumanCustom:
         while True:
             try:
                 if is_row:
-                    index = int(input(f"Enter row (0-{Board.ROW_COUNT-1}): "))
-                    if 0 <= index < Board.ROW_COUNT:
+                    index = int(input(f"Enter row (0-{board.ROW_COUNT-1}): "))
+                    if 0 <= index < board.ROW_COUNT:
                         return index
                     else:
-                        print(f"Row must be between 0 and {Board.ROW_COUNT-1}")
+                        print(f"Row must be between 0 and {board.ROW_COUNT-1}")
                 else:
-                    index = int(input(f"Enter column (0-{Board.COLUMN_COUNT-1}): "))
-                    if 0 <= index < Board.COLUMN_COUNT:
+                    index = int(input(f"Enter column (0-{board.COLUMN_COUNT-1}): "))
+                    if 0 <= index < board.COLUMN_COUNT:
                         return index
                     else:
-                        print(f"Column must be between 0 and {Board.COLUMN_COUNT-1}")
+                        print(f"Column must be between 0 and {board.COLUMN_COUNT-1}")
             except ValueError:
                 print("Please enter a valid number.") 
\ No newline at end of file
@@ -0,0 +1,380 @@
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import itertools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from board import Board
+from bots import MiniMaxBot, MonteCarloBot, MonteCarloCustom
+from bots.minimax_custom import MinimaxCustom
+from bots.time_manager import GameClock, TimeManager
+
+# Bots the server can host, constructed like game.create_player does
+SERVER_BOTS = {
+    'minimax': MiniMaxBot,
+    'montecarlo': MonteCarloBot,
+    'minimax_custom': MinimaxCustom,
+    'montecarlo_custom': MonteCarloCustom,
+}
+
+# Each pool worker keeps one bot per (type, piece) and reuses its caches across games
+_worker_bots = {}
+
+def bot_move(bot_type, piece, board_bytes, budget):
+    """Run in a pool worker: the bot's move for a board in to_bytes form"""
+    bot = _worker_bots.get((bot_type, piece))
+    if bot is None:
+        bot = _worker_bots[(bot_type, piece)] = SERVER_BOTS[bot_type](piece)
+    bot.set_time_budget(budget)
+    move, _ = bot.search_position(Board.from_bytes(board_bytes))
+    if isinstance(move, tuple):
+        # Bots can keep notes of their own in the params, such as a score
+        move = ('powerup', move[1], {key: value for key, value in move[2].items() if key != 'score'})
+    return move
+
+def encode_move(move):
+    return list(move) if isinstance(move, tuple) else int(move)
+
+def decode_move(data):
+    """A move from its JSON form: a column, or ["powerup", type, params]"""
+    if isinstance(data, list):
+        return ('powerup', int(data[1]), dict(data[2]))
+    return int(data)
+
+
+class ProtocolError(Exception):
+    """A request the server rejects; the message is sent back to the client"""
+
+
+class Match:
+    """One human-vs-bot game held by the server"""
+
+    def __init__(self, match_id, bot_type, human_piece, base, increment):
+        self.id = match_id
+        self.bot_type = bot_type
+        self.human_piece = human_piece
+        self.bot_piece = Board.PLAYER2_PIECE if human_piece == Board.PLAYER1_PIECE else Board.PLAYER1_PIECE
+        self.board = Board(random.randint(Board.PLAYER1_PIECE, Board.PLAYER2_PIECE))
+        self.clock = GameClock(base, increment)
+        self.clock.start(self.board.CURR_PLAYER)
+        self.time_manager = TimeManager(increment)
+        self.lock = asyncio.Lock()
+        self.result = None
+        self.moves = []
+
+    def finish(self, result):
+        self.result = result
+        self.clock.stop()
+
+    def check_over(self, mover):
+        winner = self.board.get_winner(mover)
+        if winner is not None:
+            self.finish(f'player {winner} wins')
+        elif self.board.check_draw() or not self.board.get_legal_moves():
+            self.finish('draw')
+        return self.result is not None
+
+    def check_time(self):
+        piece = self.board.CURR_PLAYER
+        if self.result is None and self.clock.flagged(piece):
+            self.finish(f'player {self.board.get_opp_player(piece)} wins on time')
+        return self.result is not None
+
+    def play(self, move, piece):
+        if not self.board.apply_move(move):
+            raise ProtocolError(f'illegal move {encode_move(move)}')
+        self.moves.append(encode_move(move))
+        if self.board.CURR_PLAYER != piece:
+            self.clock.switch(piece)
+        self.check_over(piece)
+
+    def state(self):
+        return {'game': self.id, 'board': self.board.to_notation(), 'turn': self.board.CURR_PLAYER,
+                'you': self.human_piece, 'result': self.result, 'moves': self.moves,
+                'clock': {str(piece): round(self.clock.time_left(piece), 3) for piece in (1, 2)}}
+
+
+class MatchServer:
+    """Hosts many concurrent matches over a JSON-lines socket protocol
+
+    Every request is one JSON object per line with an ``op`` field; each gets
+    exactly one JSON reply. Requests on one connection are handled in order,
+    so a client waiting for a bot reply is not read from until it is sent.
+
+    ``{"op": "new", "bot": "minimax", "piece": 1, "base": 60, "increment": 1}``
+        starts a game with the human as ``piece``; the bot moves first if it
+        is its turn. ``{"op": "move", "game": id, "move": 3}`` plays a column
+        (or ``["powerup", type, params]``) and returns once the bot has
+        replied. ``state``, ``resign`` and ``metrics`` do what they say.
+
+    Bot searches run in a process pool with a budget from the bot's game
+    clock. At most ``max_queue`` searches wait for a worker; beyond that,
+    moves are refused with ``busy`` and the client should retry. A player,
+    human or bot, whose clock runs out loses the game, and a bot whose
+    search fails or returns an illegal move forfeits it. Finished games are
+    dropped ``keep_finished`` seconds after they end.
+    """
+
+    def __init__(self, processes=None, max_queue=64, keep_finished=60):
+        self.workers = processes or os.cpu_count() or 1
+        # Workers come from a fork server so they do not inherit client sockets
+        self.pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('forkserver'))
+        self.max_queue = max_queue
+        self.keep_finished = keep_finished
+        self.slots = asyncio.Semaphore(self.workers)
+        self.matches = {}
+        self.finished_at = {}
+        self.ids = itertools.count(1)
+        self.queued = 0
+        self.in_flight = 0
+        self.connections = 0
+        self.counters = {'games': 0, 'requests': 0, 'bot_moves': 0, 'busy': 0, 'errors': 0, 'timeouts': 0,
+                         'bot_errors': 0}
+        self.bot_seconds = 0.0
+
+    def metrics(self):
+        return {'matches': len(self.matches), 'connections': self.connections,
+                'queue_depth': self.queued, 'in_flight': self.in_flight, 'workers': self.workers,
+                'avg_bot_seconds': round(self.bot_seconds / self.counters['bot_moves'], 4) if self.counters['bot_moves'] else 0,
+                **self.counters}
+
+    async def run_bot(self, match):
+        """Play bot moves until it is the human's turn or the game is over"""
+        loop = asyncio.get_running_loop()
+        while match.result is None and match.board.CURR_PLAYER == match.bot_piece:
+            time_left = match.clock.time_left(match.bot_piece)
+            budget = match.time_manager.budget(match.board, time_left)
+            self.queued += 1
+            try:
+                await self.slots.acquire()
+            finally:
+                self.queued -= 1
+            self.in_flight += 1
+            started = time.perf_counter()
+            try:
+                future = loop.run_in_executor(self.pool, bot_move, match.bot_type, match.bot_piece,
+                                              match.board.to_bytes(), budget)
+            except BaseException:
+                self.release_slot()
+                raise
+            # The slot is held until the worker is done, even when the game stops waiting for it
+            future.add_done_callback(self.release_slot)
+            failed = False
+            try:
+                move = await asyncio.wait_for(asyncio.shield(future), max(time_left, 0) + 1)
+            except asyncio.TimeoutError:
+                # The worker finishes its search regardless; the result is ignored
+                self.counters['timeouts'] += 1
+                move = None
+            except Exception:
+                failed = True
+                move = None
+            self.counters['bot_moves'] += 1
+            self.bot_seconds += time.perf_counter() - started
+            if match.check_time():
+                break
+            if failed or (move is not None and move not in match.board.get_legal_moves()):
+                self.counters['bot_errors'] += 1
+                match.finish(f'player {match.human_piece} wins by forfeit')
+                break
+            if move is None:
+                match.finish(f'player {match.human_piece} wins on time')
+                break
+            match.play(move, match.bot_piece)
+
+    def release_slot(self, future=None):
+        if future is not None and not future.cancelled():
+            future.exception()   # an abandoned search's error is not reported
+        self.in_flight -= 1
+        self.slots.release()
+
+    def get_match(self, request):
+        match = self.matches.get(request.get('game'))
+        if match is None:
+            raise ProtocolError('unknown game')
+        return match
+
+    def admit(self):
+        """Refuse requests that would need a bot search while the queue is full"""
+        if self.queued >= self.max_queue:
+            self.counters['busy'] += 1
+            raise ProtocolError('busy')
+
+    async def handle(self, request):
+        op = request.get('op')
+        if op in ('new', 'move'):
+            self.admit()
+
+        if op == 'new':
+            bot_type = request.get('bot', 'minimax')
+            if bot_type not in SERVER_BOTS:
+                raise ProtocolError(f'unknown bot {bot_type}')
+            piece = int(request.get('piece', Board.PLAYER1_PIECE))
+            if piece not in (Board.PLAYER1_PIECE, Board.PLAYER2_PIECE):
+                raise ProtocolError(f'invalid piece {piece}')
+            match = Match(next(self.ids), bot_type, piece,
+                          float(request.get('base', 60)), float(request.get('increment', 1)))
+            self.matches[match.id] = match
+            self.counters['games'] += 1
+            async with match.lock:
+                await self.run_bot(match)
+            self.mark_finished(match)
+            return match.state()
+
+        if op == 'move':
+            match = self.get_match(request)
+            async with match.lock:
+                if not match.check_time():
+                    if match.result is not None or match.board.CURR_PLAYER != match.human_piece:
+                        raise ProtocolError('not your turn')
+                    match.play(decode_move(request.get('move')), match.human_piece)
+                    await self.run_bot(match)
+                self.mark_finished(match)
+                return match.state()
+
+        if op == 'state':
+            match = self.get_match(request)
+            match.check_time()
+            return match.state()
+
+        if op == 'resign':
+            match = self.get_match(request)
+            if match.result is None:
+                match.finish(f'player {match.bot_piece} wins by resignation')
+            self.mark_finished(match)
+            return match.state()
+
+        if op == 'metrics':
+            return self.metrics()
+
+        raise ProtocolError(f'unknown op {op}')
+
+    def mark_finished(self, match):
+        if match.result is not None:
+            self.finished_at.setdefault(match.id, time.monotonic())
+
+    async def sweep(self, interval=0.5):
+        """Flag games whose player to move ran out of time and drop old finished ones"""
+        while True:
+            await asyncio.sleep(interval)
+            now = time.monotonic()
+            for match in list(self.matches.values()):
+                if not match.lock.locked() and match.check_time():
+                    self.mark_finished(match)
+            for match_id, finished in list(self.finished_at.items()):
+                if now - finished > self.keep_finished:
+                    del self.finished_at[match_id]
+                    self.matches.pop(match_id, None)
+
+    async def serve_client(self, reader, writer):
+        self.connections += 1
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                self.counters['requests'] += 1
+                try:
+                    reply = {'ok': True, **await self.handle(json.loads(line))}
+                except (ProtocolError, ValueError, TypeError, KeyError) as error:
+                    self.counters['errors'] += 1
+                    reply = {'ok': False, 'error': str(error)}
+                writer.write(json.dumps(reply).encode() + b'\n')
+                # Do not read more from a client that is not reading its replies
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.connections -= 1
+            writer.close()
+
+    async def start(self, host='127.0.0.1', port=8765):
+        self.sweeper = asyncio.create_task(self.sweep())
+        self.server = await asyncio.start_server(self.serve_client, host, port)
+        return self.server
+
+    async def close(self, grace=1.0):
+        self.sweeper.cancel()
+        self.server.close()
+        # Let handlers of clients that already hung up see their end of stream
+        deadline = time.monotonic() + grace
+        while self.connections and time.monotonic() < deadline:
+            await asyncio.sleep(0.01)
+        await self.server.wait_closed()
+        self.pool.shutdown(cancel_futures=True)
+
+
+async def request(reader, writer, message):
+    writer.write(json.dumps(message).encode() + b'\n')
+    await writer.drain()
+    return json.loads(await reader.readline())
+
+async def scripted_client(host='127.0.0.1', port=8765, bot='minimax', base=30, increment=0.5, seed=None, piece=None):
+    """Play one game as a random-moving human, as piece or a random one; returns the final state"""
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        piece = rng.randint(1, 2) if piece is None else piece
+        new_game = {'op': 'new', 'bot': bot, 'piece': piece, 'base': base, 'increment': increment}
+        state = await request(reader, writer, new_game)
+        while not state['ok'] and state['error'] == 'busy':
+            await asyncio.sleep(0.1)
+            state = await request(reader, writer, new_game)
+        while state['ok'] and state['result'] is None:
+            board = Board.from_notation(state['board'])
+            # Powerups included, as a powerup game can run out of drops
+            move = encode_move(rng.choice(board.get_legal_moves()))
+            reply = await request(reader, writer, {'op': 'move', 'game': state['game'], 'move': move})
+            if not reply['ok'] and reply['error'] == 'busy':
+                await asyncio.sleep(0.1)
+                continue
+            state = reply
+        return state
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+async def demo(games, bot, processes, port):
+    """Serve on localhost and play games scripted clients at once against it"""
+    server = MatchServer(processes)
+    await server.start(port=port)
+    results = await asyncio.gather(*(scripted_client(port=port, bot=bot, seed=i) for i in range(games)))
+    for state in results:
+        print(f"game {state.get('game')}: {state.get('result') or state.get('error')}")
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    print(json.dumps(await request(reader, writer, {'op': 'metrics'})))
+    writer.close()
+    await writer.wait_closed()
+    await server.close()
+
+async def serve(host, port, processes, max_queue):
+    server = MatchServer(processes, max_queue)
+    await server.start(host, port)
+    print(f"Serving Connect 4 on {host}:{port} with {server.workers} bot workers")
+    async with server.server:
+        await server.server.serve_forever()
+
+def main():
+    parser = argparse.ArgumentParser(description="Connect 4 match server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--max-queue', type=int, default=64)
+    parser.add_argument('--demo', type=int, metavar='GAMES', help="play scripted games against a local server and exit")
+    parser.add_argument('--bot', choices=sorted(SERVER_BOTS), default='minimax')
+    args = parser.parse_args()
+
+    if args.demo:
+        asyncio.run(demo(args.demo, args.bot, args.processes, args.port))
+    else:
+        try:
+            asyncio.run(serve(args.host, args.port, args.processes, args.max_queue))
+        except KeyboardInterrupt:
+            sys.exit(0)
+
+if __name__ == '__main__':
+    main()
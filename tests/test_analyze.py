@@ -0,0 +1,39 @@
+import math
+from board.board import Board
+from bots.minimax import MiniMaxBot
+from bots.minimax_custom import MinimaxCustom
+
+def replay(board, pv):
+    board = board.copy_board()
+    for move in pv:
+        assert move in board.get_legal_moves()
+        board.apply_move(move)
+
+def test_minimax_analysis_scores_are_exact():
+    board = Board.from_moves("4453")
+    bot = MiniMaxBot(board.CURR_PLAYER, depth=4, solver_threshold=0)
+    analysis = bot.analyze(board)
+    assert sorted(entry['move'] for entry in analysis) == board.get_valid_locations()
+    for entry in analysis:
+        child = board.copy_board()
+        child.drop_piece(entry['move'], bot.bot_piece)
+        fresh = MiniMaxBot(board.CURR_PLAYER, solver_threshold=0)
+        assert entry['score'] == fresh.minimax(child, 3, -math.inf, math.inf, False)[1]
+        assert entry['pv'][0] == entry['move'] and len(entry['pv']) <= 4
+        replay(board, entry['pv'])
+    assert max(len(entry['pv']) for entry in analysis) == 4
+
+def test_minimax_custom_analysis_searches_powerups():
+    board = Board.from_notation("7/7/7/3y3/2ryr2/1yrry2 2 - 4 -")
+    bot = MinimaxCustom(Board.PLAYER2_PIECE, depth=3)
+    analysis = bot.analyze(board)
+    assert any(isinstance(entry['move'], tuple) for entry in analysis)
+    for entry in analysis:
+        child = bot.own_turn(board)
+        child.apply_move(entry['move'])
+        fresh = MinimaxCustom(Board.PLAYER2_PIECE)
+        assert entry['score'] == fresh.minimax(child, 2, float('-inf'), float('inf'), child.CURR_PLAYER == bot.bot_piece)[1]
+        assert entry['pv'][0] == entry['move'] and len(entry['pv']) <= 3
+        replay(bot.own_turn(board), entry['pv'])
+    assert max(len(entry['pv']) for entry in analysis) == 3
+    assert analysis[0]['score'] == bot.search_position(board)[1]
@@ -0,0 +1,94 @@
+import math
+import pytest
+import threading
+import numpy as np
+from board.board import Board
+from board.batch import BoardBatch
+from bots.minimax import MiniMaxBot
+
+def test_non_classic_batch_round_trips():
+    boards = []
+    for cols in ([0, 1, 0, 1, 0, 1, 0], [4, 4, 5, 5, 6, 6, 7]):
+        board = Board(Board.PLAYER1_PIECE, 7, 9, 5)
+        for col in cols:
+            board.drop_piece(col, board.CURR_PLAYER)
+        boards.append(board)
+
+    batch = BoardBatch.from_boards(boards)
+    for i, board in enumerate(boards):
+        copy = batch.to_board(i)
+        assert copy.geometry == (7, 9, 5)
+        assert np.array_equal(copy.board, board.board)
+        assert copy.get_valid_locations() == board.get_valid_locations()
+        for piece in (Board.PLAYER1_PIECE, Board.PLAYER2_PIECE):
+            assert copy.winning_move(piece) == board.winning_move(piece)
+    # Four in a row is not a win when five are needed
+    assert not batch.to_board(0).winning_move(Board.PLAYER1_PIECE)
+
+def test_worker_processes_rebuild_the_bot_instead_of_pickling_it():
+    boards = [Board.from_moves(moves) for moves in ("4", "44", "43", "345", "4455", "1234", "7", "76")]
+    bot = MiniMaxBot(Board.PLAYER2_PIECE, 3, solver_threshold=0, weights={'center': 5})
+    expected = [MiniMaxBot(Board.PLAYER2_PIECE, 3, solver_threshold=0, weights={'center': 5}).search_position(board)
+                for board in boards]
+    bot.lock = threading.Lock()
+    assert bot.get_moves(boards, processes=2, chunksize=2) == expected
+
+def test_a_forced_block_is_scored_like_a_search():
+    # Yellow must block column 3
+    board = Board.from_notation("7/7/7/7/6y/rrr3y 2 - - -")
+    bot = MiniMaxBot(Board.PLAYER2_PIECE, 4, solver_threshold=0)
+    col, score = bot.forced_move(board)
+    assert (col, score) == MiniMaxBot(Board.PLAYER2_PIECE, 4, solver_threshold=0).minimax(
+        board, 4, -math.inf, math.inf, True)
+
+def assert_batch_matches_boards(batch, boards):
+    valid = batch.valid_mask()
+    for i, board in enumerate(boards):
+        copy = batch.to_board(i)
+        assert np.array_equal(copy.board, board.board)
+        assert copy.num_slots_filled == board.num_slots_filled
+        assert (copy.CURR_PLAYER, copy.PREV_PLAYER, copy.PREV_MOVE) == (board.CURR_PLAYER, board.PREV_PLAYER, board.PREV_MOVE)
+        for piece in (Board.PLAYER1_PIECE, Board.PLAYER2_PIECE):
+            assert copy.powerups_used[piece] == sorted(board.powerups_used[piece])
+            assert copy.double_move_available[piece] == board.double_move_available[piece]
+            assert copy.double_move_column[piece] == board.double_move_column[piece]
+            assert batch.winning_move(piece)[i] == board.winning_move(piece)
+        lines = [piece for piece in (Board.PLAYER1_PIECE, Board.PLAYER2_PIECE) if board.winning_move(piece)]
+        assert batch.done[i] == bool(lines or not board.get_valid_locations())
+        if len(lines) == 1:
+            assert batch.winner[i] == lines[0]
+        expected = [board.is_valid_location(col) and not batch.done[i] for col in range(board.COLUMN_COUNT)]
+        assert valid[i].tolist() == expected
+
+@pytest.mark.parametrize('geometry', [(6, 7, 4), (5, 8, 4)])
+def test_random_drops_and_powerups_match_per_game_boards(geometry):
+    rng = np.random.default_rng(0)
+    boards = [Board(Board.PLAYER1_PIECE, *geometry) for _ in range(24)]
+    batch = BoardBatch.from_boards(boards)
+    rows, columns, _ = geometry
+    for step in range(60):
+        active = ~batch.done
+        pieces = batch.curr_player.copy()
+        cols = rng.integers(columns, size=len(boards))
+        ops = ['drop'] * 4 + [Board.REMOVE_PIECE, Board.GRAVITY_FLIP, Board.SWAP_COLOR, Board.DOUBLE_MOVE]
+        op = ops[rng.integers(len(ops))]
+        if op == 'drop':
+            valid = batch.valid_mask()
+            cols = np.where(valid, rng.random(valid.shape), -1.0).argmax(axis=1)
+            batch.drop_piece(cols, active=active)
+            for i in np.flatnonzero(active):
+                boards[i].drop_piece(int(cols[i]), boards[i].CURR_PLAYER)
+            continue
+        kwargs = {}
+        if op == Board.SWAP_COLOR:
+            kwargs = {'is_row': bool(rng.integers(2)), 'index': int(rng.integers(rows))}
+        success = batch.use_powerup(op, active=active, col=cols, **kwargs)
+        for i, board in enumerate(boards):
+            used = False
+            if active[i]:
+                board_kwargs = dict(kwargs) if kwargs else {'col': int(cols[i])}
+                used = bool(board.use_powerup(op, int(pieces[i]), **board_kwargs))
+            assert success[i] == used
+        assert_batch_matches_boards(batch, boards)
+    assert_batch_matches_boards(batch, boards)
+    assert batch.done.any()
@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+from board.board import Board
+
+def classic():
+    return Board.from_moves('4453321')
+
+def powerups():
+    board = Board.from_moves('44536712')
+    board.apply_move(('powerup', Board.SWAP_COLOR, {'is_row': True, 'index': 0}))
+    board.apply_move(('powerup', Board.REMOVE_PIECE, {'col': 3}))
+    board.apply_move(('powerup', Board.DOUBLE_MOVE, {'col': 1}))
+    return board
+
+def state(board):
+    return (board.board.tolist(), board.CURR_PLAYER, board.geometry,
+            {piece: sorted(used) for piece, used in board.powerups_used.items()},
+            board.double_move_available, board.double_move_column)
+
+POSITIONS = [classic, powerups]
+
+@pytest.mark.parametrize('make', POSITIONS)
+def test_bytes_round_trip(make):
+    board = make()
+    copy = Board.from_bytes(board.to_bytes())
+    assert state(copy) == state(board)
+    assert (copy.PREV_PLAYER, copy.PREV_MOVE) == (board.PREV_PLAYER, board.PREV_MOVE)
+    assert copy.num_slots_filled == board.num_slots_filled
+    assert copy.to_bytes() == board.to_bytes()
+    assert copy.key() == board.key()
+
+@pytest.mark.parametrize('make', POSITIONS)
+def test_notation_round_trip(make):
+    board = make()
+    copy = Board.from_notation(board.to_notation())
+    assert state(copy) == state(board)
+    assert copy.to_notation() == board.to_notation()
+    assert copy.key() == board.key()
+
+def test_powerup_position_state():
+    board = powerups()
+    assert board.double_move_available[board.CURR_PLAYER]
+    assert board.key() != classic().key()
+
+def test_key_ignores_history_but_not_side_to_move():
+    # The same cells reached in a different order share a key
+    assert Board.from_moves('4453').key() == Board.from_moves('5344').key()
+    board = classic()
+    other = board.copy_board()
+    other.CURR_PLAYER = board.PREV_PLAYER
+    assert other.key() != board.key()
+
+def test_non_classic_round_trip():
+    board = Board(Board.PLAYER2_PIECE, 7, 9, 5)
+    for col in (0, 8, 4, 4, 2):
+        board.drop_piece(col, board.CURR_PLAYER)
+    assert state(Board.from_bytes(board.to_bytes(), board.geometry)) == state(board)
+    assert state(Board.from_notation(board.to_notation(), connect=5)) == state(board)
+
+@pytest.mark.parametrize('make', POSITIONS)
+def test_mirror_symmetry(make):
+    board = make()
+    mirror = board.mirror()
+    assert np.array_equal(mirror.board, board.board[:, ::-1])
+    assert state(mirror.mirror()) == state(board)
+    assert mirror.canonical_key()[0] == board.canonical_key()[0]
+    key, mirrored = board.canonical_key()
+    assert key == (mirror.key() if mirrored else board.key())
+    assert key == min(board.key(), mirror.key())
+
+def test_symmetric_position_has_one_canonical_key():
+    board = Board.from_moves('4444')
+    assert board.is_symmetric()
+    assert board.canonical_key() == (board.key(), False)
+    assert board.get_distinct_locations() == [0, 1, 2, 3]
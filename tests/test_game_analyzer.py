@@ -0,0 +1,56 @@
+import json
+import random
+from board.board import Board
+from board.records import RecordLog
+from bots.analysis import GameAnalyzer
+
+def random_game(seed):
+    rng = random.Random(seed)
+    board = Board(Board.PLAYER1_PIECE)
+    moves = []
+    while not board.winning_move(board.PREV_PLAYER) and not board.check_draw():
+        col = rng.choice(board.get_valid_locations())
+        moves.append((col, board.CURR_PLAYER))
+        board.drop_piece(col, board.CURR_PLAYER)
+    return moves
+
+def write_log(path, games):
+    log = RecordLog(path)
+    for seed, moves in enumerate(games):
+        log.start_game(Board.PLAYER1_PIECE, seed, [], 0.0)
+        for move, piece in moves:
+            log.add_move(move, piece, 0.01)
+        log.end_game(moves[-1][1])
+    log.close()
+
+def test_mirrored_and_repeated_positions_are_searched_once(tmp_path):
+    game = random_game(0)
+    mirrored = [(Board.COLUMN_COUNT - 1 - col, piece) for col, piece in game]
+    write_log(str(tmp_path / 'games.log'), [game, mirrored, game])
+    analyzer = GameAnalyzer(depth=2, processes=1, batch_games=2)
+    analyzer.analyze_log(str(tmp_path / 'games.log'), str(tmp_path / 'out.jsonl'))
+    board = Board(Board.PLAYER1_PIECE)
+    keys = set()
+    for col, piece in game:
+        keys.add(board.canonical_key()[0])
+        board.drop_piece(col, piece)
+    assert analyzer.positions == 3 * len(game)
+    assert analyzer.searched == len(keys)
+    first, second, third = [json.loads(line) for line in open(tmp_path / 'out.jsonl')]
+    assert third['moves'] == first['moves']
+    for move, mirror in zip(first['moves'], second['moves']):
+        assert mirror['move'] == Board.COLUMN_COUNT - 1 - move['move']
+        assert (mirror['score'], mirror['best_score'], mirror['blunder']) == (move['score'], move['best_score'], move['blunder'])
+
+def test_a_resumed_run_skips_annotated_games_and_matches_a_full_run(tmp_path):
+    log = str(tmp_path / 'games.log')
+    write_log(log, [random_game(seed) for seed in range(5)])
+    full = tmp_path / 'full.jsonl'
+    assert GameAnalyzer(depth=2, processes=1, batch_games=2).analyze_log(log, str(full)) == 5
+
+    # A run that stopped after three games, in the middle of writing the fourth
+    lines = full.read_text().splitlines(keepends=True)
+    resumed = tmp_path / 'resumed.jsonl'
+    resumed.write_text(''.join(lines[:3]) + lines[3][:20])
+    assert GameAnalyzer(depth=2, processes=1, batch_games=2).analyze_log(log, str(resumed)) == 2
+    assert resumed.read_text() == full.read_text()
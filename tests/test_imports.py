@@ -0,0 +1,35 @@
+import os
+import sys
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Seconds a fresh interpreter may take to import the headless modules; about 0.12 s
+# is measured, nearly all of it numpy, so only a heavy new dependency trips this
+IMPORT_BUDGET = 1.0
+
+def import_times(code):
+    """{module: (cumulative seconds, nesting level)} of what a fresh interpreter imports to run code"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=ROOT,
+                            capture_output=True, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if cumulative.strip().isdigit():
+            times[name.strip()] = (int(cumulative) / 1e6, (len(name) - len(name.lstrip()) - 1) // 2)
+    return times
+
+def test_headless_imports_do_not_load_pygame():
+    # A fresh interpreter, since this test process may have loaded pygame already
+    code = ("import sys, board, bots, game, bots.human, players.human_custom; "
+            "sys.exit('pygame' in sys.modules)")
+    assert subprocess.run([sys.executable, '-c', code], cwd=ROOT).returncode == 0
+
+def test_headless_import_time_is_bounded():
+    times = import_times("import board, bots.minimax, bots.montecarlo")
+    assert 'pygame' not in times
+    total = sum(seconds for seconds, level in times.values() if level == 0)
+    slowest = sorted(times.items(), key=lambda item: item[1][0], reverse=True)[:5]
+    assert total < IMPORT_BUDGET, f"imports took {total:.2f} s; slowest: {slowest}"
@@ -0,0 +1,25 @@
+from board.board import Board
+from bots.minimax_custom import MinimaxCustom
+
+def test_forced_move_wins_for_the_bot_after_a_powerup():
+    # Both sides threaten to win; the board still names player 2 to move,
+    # as it does after player 1 used a powerup
+    board = Board.from_notation("7/7/7/r5y/r5y/r5y 2 2 - -")
+    bot = MinimaxCustom(Board.PLAYER1_PIECE)
+    assert bot.forced_move(board) == (0, 100000000000000)
+
+def test_player_two_searches_for_its_own_win():
+    # Yellow makes an open three on the bottom row with column 1; nobody has powerups left
+    board = Board.from_notation("7/7/7/7/7/2yy1rr 2 1234 1234 -")
+    bot = MinimaxCustom(Board.PLAYER2_PIECE)
+    assert bot.search_position(board) == (1, 100000000000000)
+
+def test_player_two_only_plays_its_own_unused_powerups():
+    # Player 2 has used its double move; player 1 has used nothing
+    board = Board.from_notation("7/7/7/3y3/2ryr2/1yrry2 2 - 4 -")
+    bot = MinimaxCustom(Board.PLAYER2_PIECE, depth=2)
+    legal = board.get_legal_moves()
+    analysis = bot.analyze(board)
+    assert any(isinstance(entry['move'], tuple) for entry in analysis)
+    assert all(entry['move'] in legal for entry in analysis)
+    assert bot.get_move(board) in legal
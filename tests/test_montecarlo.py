@@ -0,0 +1,108 @@
+import time
+import numpy as np
+from board.board import Board
+from bots.montecarlo import MonteCarloBot, Node
+from bots.parallel import RolloutPool
+
+def all_nodes(root):
+    nodes = [root]
+    for node in nodes:
+        nodes.extend(node.children)
+    return nodes
+
+def test_virtual_loss_is_removed_after_backpropagation():
+    board = Board.from_moves("44")
+    root = Node(piece=board.PREV_PLAYER, board=board)
+    state = board.copy_board()
+    state.drop_piece(3, state.CURR_PLAYER)
+    child = root.expand(3, state)
+    state.drop_piece(2, state.CURR_PLAYER)
+    leaf = child.expand(2, state)
+
+    leaf.add_virtual_loss()
+    assert [node.virtual_loss for node in (root, child, leaf)] == [1, 1, 1]
+    # Selection counts the pending descent as a visit without a win
+    assert root.selection() is child
+    leaf.remove_virtual_loss()
+    leaf.backpropagate(1)
+    assert [node.virtual_loss for node in (root, child, leaf)] == [0, 0, 0]
+    assert [node.visits for node in (root, child, leaf)] == [1, 1, 1]
+    # Player 1's win is a win for the nodes player 1 moved into
+    assert [node.wins for node in (child, leaf)] == [1, 0]
+
+def test_rollout_pool_plays_out_every_board():
+    pool = RolloutPool(2)
+    try:
+        boards = [Board.from_moves(moves) for moves in ("4453", "1122334", "")]
+        results = pool.collect(pool.submit(boards))
+        assert len(results) == len(boards) and set(results) <= {0, 0.5, 1}
+        assert results[1] == 1   # player 1 has already won
+        assert pool.rollout_rates()
+    finally:
+        pool.close()
+
+def test_parallel_search_returns_a_legal_move():
+    board = Board.from_moves("4453")
+    bot = MonteCarloBot(board.CURR_PLAYER, max_iterations=300, timeout=10, solver_threshold=0, workers=2)
+    try:
+        root, col = bot.montecarlo_tree_search(board, bot.max_iterations, None, bot.timeout)
+    finally:
+        bot.close()
+    assert col in board.get_valid_locations()
+    assert root.visits == 300
+    assert all(node.virtual_loss == 0 for node in all_nodes(root))
+
+def test_a_ponder_hit_keeps_the_pondered_subtree():
+    board = Board(Board.PLAYER1_PIECE)
+    bot = MonteCarloBot(Board.PLAYER1_PIECE, max_iterations=10 ** 6, timeout=0.2, solver_threshold=0, ponder=True)
+    try:
+        col = bot.get_move(board)
+        board.drop_piece(col, Board.PLAYER1_PIECE)
+        thread, pondered = bot.ponder_thread, bot.currentNode
+        time.sleep(0.2)
+        assert thread.is_alive() and pondered.children
+        reply = pondered.children[0]
+        board.drop_piece(reply.move, Board.PLAYER2_PIECE)
+        bot.get_move(board)
+        assert not thread.is_alive()
+        assert (bot.ponder_hits, bot.ponder_misses) == (1, 0)
+        assert bot.currentNode.parent is reply
+    finally:
+        bot.close()
+
+def test_a_ponder_miss_starts_a_new_tree():
+    board = Board(Board.PLAYER1_PIECE)
+    # One iteration per search, so the pondered position has a single reply
+    bot = MonteCarloBot(Board.PLAYER1_PIECE, max_iterations=1, solver_threshold=0, ponder=True)
+    try:
+        col = bot.get_move(board)
+        board.drop_piece(col, Board.PLAYER1_PIECE)
+        thread, pondered = bot.ponder_thread, bot.currentNode
+        thread.join()
+        searched = {pondered.children[0].move, board.mirror_column(pondered.children[0].move)}
+        board.drop_piece(next(c for c in board.get_valid_locations() if c not in searched), Board.PLAYER2_PIECE)
+        bot.get_move(board)
+        assert (bot.ponder_hits, bot.ponder_misses) == (0, 1)
+        assert bot.currentNode.parent.parent is None
+        thread = bot.ponder_thread
+    finally:
+        bot.close()
+    assert not thread.is_alive()
+
+def test_the_mirror_image_move_reuses_the_mirrored_subtree():
+    board = Board.from_moves("4")
+    bot = MonteCarloBot(Board.PLAYER1_PIECE, max_iterations=500, timeout=10, solver_threshold=0)
+    root, _ = bot.montecarlo_tree_search(board, 500, None)
+    # The symmetric root only expands columns 0 to 3
+    assert sorted(child.move for child in root.children) == [0, 1, 2, 3]
+    searched = next(child for child in root.children if child.move == 1)
+    played = board.copy_board()
+    played.drop_piece(5, played.CURR_PLAYER)
+    child = bot.get_child_node(root, played, 5, played.PREV_PLAYER)
+    assert child is searched and child.move == 5 and child.visits > 0
+    assert np.array_equal(child.board.board, played.board)
+    for node in all_nodes(child)[1:]:
+        expected = node.parent.board.copy_board()
+        expected.drop_piece(node.move, expected.CURR_PLAYER)
+        assert np.array_equal(node.board.board, expected.board)
+        assert not set(node.available_moves) & {c.move for c in node.children}
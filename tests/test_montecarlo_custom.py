@@ -0,0 +1,37 @@
+import random
+from types import SimpleNamespace
+from board.board import Board
+from bots import montecarlo_custom
+from bots.montecarlo_custom import MonteCarloCustom
+
+def tree_nodes(node):
+    yield node
+    for child in node.children.values():
+        yield from tree_nodes(child)
+
+def test_search_follows_the_turn_and_powerup_rules():
+    random.seed(0)
+    board = Board.from_notation("7/7/7/3y3/2ryr2/1yrry2 1 - 4 -")
+    bot = MonteCarloCustom(Board.PLAYER1_PIECE)
+    root = bot.search(board, 0.5)
+    powerups = 0
+    for node in tree_nodes(root):
+        if node.parent is None:
+            continue
+        parent = node.parent.board
+        assert node.player == parent.CURR_PLAYER
+        assert node.move in parent.get_legal_moves()
+        if isinstance(node.move, tuple):
+            powerups += 1
+            assert node.move[1] not in parent.powerups_used[node.player]
+            assert node.move[1] in node.board.powerups_used[node.player]
+            # Only a double move keeps the turn
+            assert (node.board.CURR_PLAYER == node.player) == (node.move[1] == Board.DOUBLE_MOVE)
+    assert powerups
+
+def test_search_runs_until_its_time_limit(monkeypatch):
+    # Each loop check advances a fake clock 10 ms, so a 1.5 s search is about 150 iterations
+    clock = iter(range(1000))
+    monkeypatch.setattr(montecarlo_custom, 'time', SimpleNamespace(time=lambda: next(clock) / 100))
+    root = MonteCarloCustom(Board.PLAYER1_PIECE).search(Board(Board.PLAYER1_PIECE), 1.5)
+    assert root.visits == 149
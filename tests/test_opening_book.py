@@ -0,0 +1,44 @@
+import math
+from board.board import Board
+from bots.minimax import MiniMaxBot
+from bots.opening_book import OpeningBook
+
+def test_a_mirrored_position_gets_the_mirrored_column(tmp_path):
+    # Red in column 1 and yellow in column 4: not symmetric, so only one orientation is canonical
+    board = Board.from_moves("25")
+    key, mirrored = board.canonical_key()
+    canonical = board.mirror() if mirrored else board
+    path = str(tmp_path / 'book.bin')
+    OpeningBook.write(path, {key: (2, 17)})
+    book = OpeningBook(path)
+    try:
+        assert book.lookup(canonical) == (2, 17)
+        other = canonical.mirror()
+        assert other.canonical_key() == (key, True)
+        assert book.lookup(other) == (4, 17)
+        assert book.lookup(Board.from_moves("24")) is None
+        assert book.lookup(Board(Board.PLAYER1_PIECE, 7, 9, 5)) is None
+    finally:
+        book.close()
+
+def test_a_generated_book_holds_every_position_with_its_searched_move(tmp_path):
+    path = str(tmp_path / 'book.bin')
+    # Both empty boards and the four distinct first drops from each
+    assert OpeningBook.generate(path, plies=1, depth=3) == 10
+    book = OpeningBook(path)
+    try:
+        assert len(book) == 10
+        for first in (Board.PLAYER1_PIECE, Board.PLAYER2_PIECE):
+            for col in range(Board.COLUMN_COUNT):
+                board = Board(first)
+                board.drop_piece(col, first)
+                book_col, score = book.lookup(board)
+                bot = MiniMaxBot(board.CURR_PLAYER, 3)
+                scores = {}
+                bot.minimax(board, 3, -math.inf, math.inf, True, analysis=scores)
+                if book_col not in scores:
+                    book_col = board.mirror_column(book_col)
+                # The book's move is a best move of this orientation, with the search's score
+                assert scores[book_col] == max(scores.values()) == score
+    finally:
+        book.close()
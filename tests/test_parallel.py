@@ -0,0 +1,31 @@
+import threading
+from board.board import Board
+from bots import parallel
+from bots.minimax import MiniMaxBot
+from bots.transposition import TranspositionTable
+
+def run_smp_search(board, piece, depth, **kwargs):
+    parallel._worker.update(tt=TranspositionTable(), stop_event=threading.Event())
+    return parallel.smp_search(board.to_bytes(), piece, depth, 0, None, board.geometry, **kwargs)
+
+def test_smp_search_uses_the_bot_weights():
+    weights = {'center': -50}
+    board = Board(Board.PLAYER1_PIECE)
+    serial = MiniMaxBot(Board.PLAYER1_PIECE, 2, solver_threshold=0, weights=weights)
+    col, _ = serial.search_position(board)
+    assert col != board.COLUMN_COUNT // 2
+    assert run_smp_search(board, Board.PLAYER1_PIECE, 2, weights=serial.weights)[1] == col
+
+def test_smp_search_keeps_to_the_given_moves():
+    board = Board(Board.PLAYER1_PIECE)
+    assert run_smp_search(board, Board.PLAYER1_PIECE, 2, moves=[0, 6])[1] in (0, 6)
+
+def test_lazy_smp_plays_the_single_process_move():
+    # Red's drop in column 3 makes an open three, a double threat
+    board = Board.from_notation("7/7/7/7/6y/1rr3y 1 - - -")
+    serial = MiniMaxBot(Board.PLAYER1_PIECE, 5, solver_threshold=0)
+    smp = MiniMaxBot(Board.PLAYER1_PIECE, 5, solver_threshold=0, workers=2)
+    try:
+        assert smp.search_position(board) == serial.search_position(board) == (3, 100000000000000)
+    finally:
+        smp.close()
@@ -0,0 +1,17 @@
+import numpy as np
+from board.board import Board
+from board.batch import BoardBatch
+
+def test_gravity_flip_turns_columns_over_without_floating_pieces():
+    board = Board.from_notation("7/7/7/r6/yr5/yyr4 1 - - -")
+    assert board.use_powerup(Board.GRAVITY_FLIP, Board.PLAYER1_PIECE)
+    assert board.to_notation().split()[0] == "7/7/7/y6/yy5/rrr4"
+    assert board.get_valid_locations() == list(range(board.COLUMN_COUNT))
+
+def test_batch_gravity_flip_matches_board():
+    boards = [Board.from_moves(moves) for moves in ("4453", "1112223", "7", "")]
+    batch = BoardBatch.from_boards(boards)
+    batch.gravity_flip(np.ones(len(boards), dtype=bool))
+    for i, board in enumerate(boards):
+        board.gravity_flip(board.CURR_PLAYER)
+        assert (batch.to_board(i).board == board.board).all()
@@ -0,0 +1,46 @@
+import json
+import threading
+from board.board import Board
+from bots.montecarlo import MonteCarloBot
+from bots.profiling import SearchProfiler
+
+def test_copies_of_other_threads_are_not_charged_to_the_move():
+    board = Board(Board.PLAYER1_PIECE)
+    profiler = SearchProfiler(trace_allocations=False)
+    try:
+        profiler.begin_move()
+        background = threading.Thread(target=lambda: [board.copy_board() for _ in range(100)])
+        background.start()
+        for _ in range(5):
+            board.copy_board()
+        background.join()
+        entry = profiler.end_move(MonteCarloBot(Board.PLAYER1_PIECE), Board.PLAYER1_PIECE)
+    finally:
+        profiler.stop()
+    assert entry['board_copies'] == 5
+    assert Board.copy_board.__name__ == 'copy_board'
+
+def test_the_report_is_dumped_as_json(tmp_path):
+    board = Board(Board.PLAYER1_PIECE)
+    bot = MonteCarloBot(Board.PLAYER1_PIECE, max_iterations=50, solver_threshold=0)
+    profiler = SearchProfiler(top=3)
+    try:
+        profiler.begin_move()
+        bot.get_move(board)
+        profiler.end_move(bot, Board.PLAYER1_PIECE)
+    finally:
+        profiler.stop()
+    path = tmp_path / 'profile.json'
+    profiler.dump(str(path))
+
+    report = json.loads(path.read_text())
+    assert report['players']['2'] is None
+    summary = report['players']['1']
+    assert summary['moves'] == 1 and summary['board_copies'] > 0
+    move, = report['moves']
+    assert move['bot'] == 'MonteCarloBot' and move['player'] == Board.PLAYER1_PIECE
+    assert move['board_copies'] == summary['board_copies']
+    assert move['tree_nodes'] == summary['max_tree_nodes'] > 1
+    assert move['peak_rss'] == summary['peak_rss'] > 0
+    assert 0 < len(move['hot_spots']) <= 3
+    assert set(move['hot_spots'][0]) == {'file', 'line', 'size_diff', 'count_diff'}
@@ -0,0 +1,27 @@
+import random
+from board.board import Board
+from bots.proof_number import ProofNumberSearch
+
+def endgame(seed, empty=16):
+    """A position of a random game with ``empty`` cells left and no winner yet"""
+    rng = random.Random(seed)
+    while True:
+        board = Board(Board.PLAYER1_PIECE)
+        while board.ROW_COUNT * board.COLUMN_COUNT - board.num_slots_filled > empty:
+            board.drop_piece(rng.choice(board.get_valid_locations()), board.CURR_PLAYER)
+            if board.winning_move(board.PREV_PLAYER):
+                break
+        else:
+            return board
+
+def test_children_solved_after_parent_match_fresh_search():
+    # One search object is reused across positions, as solve_file does, so
+    # the children (other side to move) must not read the parent's proofs
+    for seed in range(3):
+        parent = endgame(seed)
+        search = ProofNumberSearch()
+        search.solve(parent)
+        for col in parent.get_valid_locations():
+            child = parent.copy_board()
+            child.drop_piece(col, child.CURR_PLAYER)
+            assert search.solve(child)[0] == ProofNumberSearch().solve(child)[0]
@@ -0,0 +1,73 @@
+import os
+import numpy as np
+from board.board import Board
+from board.records import DRAW, UNFINISHED, RecordLog, RecordReader, index_path, rebuild_index
+
+RED, YELLOW = Board.PLAYER1_PIECE, Board.PLAYER2_PIECE
+# Every powerup, and double moves in both recorded forms with their second drops
+MOVES = [(3, RED), (3, YELLOW), (('powerup', Board.REMOVE_PIECE, {'col': 3}), RED), (4, YELLOW),
+         (('powerup', Board.SWAP_COLOR, {'is_row': True, 'index': 0}), RED), (2, YELLOW),
+         (('powerup', Board.GRAVITY_FLIP, {}), RED), (('powerup', Board.DOUBLE_MOVE, {'col': 5}), YELLOW),
+         (5, YELLOW), (('double', 6), RED), (6, RED)]
+
+def write_game(log, moves, result=None, seed=7):
+    log.start_game(RED, seed, [{'type': 'minimax'}, {'type': 'montecarlo'}], 1700000000.5)
+    for i, (move, piece) in enumerate(moves):
+        log.add_move(move, piece, 0.25 * i)
+    if result is not None:
+        log.end_game(result)
+
+def test_games_round_trip_through_the_log(tmp_path):
+    path = str(tmp_path / 'games.log')
+    log = RecordLog(path)
+    write_game(log, MOVES, DRAW)
+    write_game(log, MOVES[:3], seed=8)
+    log.close()
+
+    reader = RecordReader(path)
+    try:
+        assert len(reader) == 2
+        record = reader[0]
+        assert (record.first_player, record.seed, record.start_time) == (RED, 7, 1700000000.5)
+        assert record.configs == [{'type': 'minimax'}, {'type': 'montecarlo'}]
+        assert record.moves == MOVES and record.result == DRAW
+        assert record.times == [0.25 * i for i in range(len(MOVES))]
+        board = Board(RED)
+        for ply, (move, piece) in enumerate(MOVES):
+            assert np.array_equal(record.replay(ply).board, board.board)
+            assert board.apply_player_move(move, piece)
+        assert np.array_equal(record.replay().board, board.board)
+        assert board.powerups_used == {RED: [1, 3, 2], YELLOW: [4]}
+        unfinished = list(reader)[1]
+        assert unfinished.moves == MOVES[:3] and unfinished.result == UNFINISHED and unfinished.seed == 8
+    finally:
+        reader.close()
+
+def test_a_log_cut_off_by_a_crash_is_reindexed_and_appended_to(tmp_path):
+    path = str(tmp_path / 'games.log')
+    log = RecordLog(path)
+    write_game(log, MOVES, RED)
+    write_game(log, MOVES[:4])
+    log.close()
+    # The last move frame is cut short, and the index is lost
+    with open(path, 'r+b') as f:
+        f.truncate(os.path.getsize(path) - 2)
+    os.remove(index_path(path))
+    assert rebuild_index(path) == 2
+    reader = RecordReader(path)
+    assert reader[1].moves == MOVES[:3]
+    reader.close()
+
+    log = RecordLog(path)
+    write_game(log, MOVES[:2], YELLOW)
+    log.close()
+    reader = RecordReader(path)
+    try:
+        assert [game.moves for game in reader] == [MOVES, MOVES[:3], MOVES[:2]]
+        assert [game.result for game in reader] == [RED, UNFINISHED, YELLOW]
+    finally:
+        reader.close()
+    # A start frame cut short is not counted as a game
+    with open(path, 'ab') as f:
+        f.write(b'S\x01\x07')
+    assert rebuild_index(path) == 3
@@ -0,0 +1,44 @@
+import random
+import pytest
+from board.board import Board
+from bots import selfplay
+from bots.minimax import MiniMaxBot
+from bots.selfplay import RECORD, ShardWriter, make_player, read_records, search
+
+def random_game(rng, plies=20):
+    board = Board(Board.PLAYER1_PIECE)
+    records = []
+    for ply in range(plies):
+        policy = [rng.random() for _ in range(board.COLUMN_COUNT)]
+        records.append(RECORD.pack(board.to_bytes(), rng.random(), *policy, rng.choice((-1, 0, 1)), ply))
+        board.drop_piece(rng.choice(board.get_valid_locations()), board.CURR_PLAYER)
+    return b''.join(records)
+
+def test_shards_rotate_at_their_compressed_size(tmp_path):
+    rng = random.Random(0)
+    writer = ShardWriter(str(tmp_path), shard_size=500)
+    for _ in range(10):
+        writer.write_game(random_game(rng))
+    writer.close()
+
+    index = ShardWriter.read_index(str(tmp_path))
+    assert len(index['shards']) > 1
+    assert index['games'] == 10
+    assert sum(1 for _ in read_records(str(tmp_path))) == index['records'] == 200
+
+def test_values_share_the_outcome_scale():
+    # Red wins at once in column 0
+    board = Board.from_notation("7/7/7/r6/ry5/ry1y3 1 - - -")
+    minimax = make_player('minimax', Board.PLAYER1_PIECE, {})
+    assert search(minimax, board, {'depth': 2})[0] == 1.0
+    value, policy = search(minimax, Board(Board.PLAYER1_PIECE), {'depth': 2})
+    assert -1 < value < 1 and policy.sum() == pytest.approx(1)
+    montecarlo = make_player('montecarlo', Board.PLAYER1_PIECE, {})
+    value, policy = search(montecarlo, board, {'timeout': 0.2})
+    assert -1 <= value <= 1 and policy.sum() == pytest.approx(1)
+
+def test_positions_without_an_analysis_are_played_unrecorded(monkeypatch):
+    monkeypatch.setattr(selfplay, '_worker_players', None)
+    monkeypatch.setattr(MiniMaxBot, 'analyze', lambda self, board, budget=None: [])
+    selfplay.init_worker('minimax', 'minimax', {'depth': 1})
+    assert selfplay.play_game(0) == b''
@@ -0,0 +1,104 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import server
+from board.board import Board
+from server import MatchServer, SERVER_BOTS, scripted_client, request
+
+async def start_server(**kwargs):
+    match_server = MatchServer(**kwargs)
+    await match_server.start(port=0)
+    return match_server, match_server.server.sockets[0].getsockname()[1]
+
+def test_scripted_games_against_every_bot():
+    games = [(bot, piece) for bot in sorted(SERVER_BOTS) for piece in (Board.PLAYER1_PIECE, Board.PLAYER2_PIECE)]
+
+    async def run():
+        match_server, port = await start_server(processes=2)
+        try:
+            results = await asyncio.gather(*(scripted_client(port=port, bot=bot, base=5, increment=0.1, seed=i, piece=piece)
+                                             for i, (bot, piece) in enumerate(games)))
+            return results, match_server.metrics()
+        finally:
+            await match_server.close()
+
+    results, metrics = asyncio.run(run())
+    for (bot, piece), state in zip(games, results):
+        assert state['ok'], (bot, state)
+        assert state['you'] == piece
+        assert state['result'] is not None and 'forfeit' not in state['result'], (bot, state)
+        board = Board.from_notation(state['board'])
+        if state['result'] == 'draw':
+            assert board.check_draw() or not board.get_legal_moves()
+        elif not state['result'].endswith('on time'):
+            assert board.get_winner() is not None
+    assert metrics['games'] == len(games)
+    assert metrics['bot_moves'] > 0
+    assert metrics['errors'] == metrics['bot_errors'] == 0
+    assert metrics['queue_depth'] == metrics['in_flight'] == 0
+
+def test_moves_are_refused_while_the_queue_is_full():
+    async def run():
+        match_server, port = await start_server(processes=1, max_queue=1)
+        try:
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            state = await request(reader, writer, {'op': 'new', 'bot': 'minimax', 'piece': 1, 'base': 5, 'increment': 0})
+            assert state['ok'] and state['turn'] == 1
+            # With the only worker taken, the bot's reply to this move waits in the queue
+            await match_server.slots.acquire()
+            pending = asyncio.create_task(request(reader, writer, {'op': 'move', 'game': state['game'], 'move': 3}))
+            while match_server.queued == 0:
+                await asyncio.sleep(0.01)
+
+            other = await asyncio.open_connection('127.0.0.1', port)
+            refused = await request(*other, {'op': 'new', 'bot': 'minimax', 'piece': 1})
+            metrics = await request(*other, {'op': 'metrics'})
+            match_server.slots.release()
+            state = await pending
+            for stream in (writer, other[1]):
+                stream.close()
+                await stream.wait_closed()
+            return refused, metrics, state
+        finally:
+            await match_server.close()
+
+    refused, metrics, state = asyncio.run(run())
+    assert refused == {'ok': False, 'error': 'busy'}
+    assert metrics['busy'] == 1 and metrics['queue_depth'] == 1
+    assert state['ok'] and state['turn'] == 1 and len(state['moves']) >= 2
+
+def play_against_broken_bot(monkeypatch, bot_move):
+    monkeypatch.setattr(server, 'bot_move', bot_move)
+
+    async def run():
+        match_server, port = await start_server(processes=1)
+        match_server.pool.shutdown()
+        match_server.pool = ThreadPoolExecutor(1)
+        try:
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            state = await request(reader, writer, {'op': 'new', 'bot': 'minimax', 'piece': 1})
+            if state['result'] is None:
+                state = await request(reader, writer, {'op': 'move', 'game': state['game'], 'move': 3})
+            metrics = await request(reader, writer, {'op': 'metrics'})
+            writer.close()
+            await writer.wait_closed()
+            return state, metrics
+        finally:
+            await match_server.close()
+
+    return asyncio.run(run())
+
+def test_an_illegal_bot_move_forfeits_the_game(monkeypatch):
+    def bot_move(bot_type, piece, board_bytes, budget):
+        return 9   # off the board
+
+    state, metrics = play_against_broken_bot(monkeypatch, bot_move)
+    assert state['ok'] and state['result'] == 'player 1 wins by forfeit'
+    assert metrics['bot_errors'] == 1
+
+def test_a_failing_bot_search_forfeits_the_game(monkeypatch):
+    def bot_move(bot_type, piece, board_bytes, budget):
+        raise RuntimeError('search failed')
+
+    state, metrics = play_against_broken_bot(monkeypatch, bot_move)
+    assert state['ok'] and state['result'] == 'player 1 wins by forfeit'
+    assert metrics['bot_errors'] == 1 and metrics['in_flight'] == 0
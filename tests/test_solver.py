@@ -0,0 +1,56 @@
+import random
+from board.board import Board
+from bots.solver import Solver
+
+def test_winning_cells_match_board_for_any_line_length():
+    rng = random.Random(0)
+    for rows, columns, connect in [(5, 6, 3), (6, 7, 4), (7, 8, 5)]:
+        solver = Solver(rows, columns, connect=connect)
+        for _ in range(50):
+            board = Board(Board.PLAYER1_PIECE, rows, columns, connect)
+            for _ in range(rng.randint(0, rows * columns // 2)):
+                board.drop_piece(rng.choice(board.get_valid_locations()), board.CURR_PLAYER)
+                if board.winning_move(board.PREV_PLAYER):
+                    break
+            if board.winning_move(board.PREV_PLAYER):
+                continue
+            position, mask, _ = solver.encode(board)
+            cells = solver.winning_cells(position, mask)
+            for c in range(columns):
+                for r in range(rows):
+                    if board.board[r][c] != Board.EMPTY:
+                        continue
+                    after = board.copy_board()
+                    after.board[r][c] = board.CURR_PLAYER
+                    assert bool(cells >> (c * (rows + 1) + r) & 1) == after.winning_move(board.CURR_PLAYER)
+
+def brute_force(board, moves):
+    """Plain negamax over Board with the solver's scoring"""
+    cells = board.ROW_COUNT * board.COLUMN_COUNT
+    best = None
+    for col in board.get_valid_locations():
+        child = board.copy_board()
+        child.drop_piece(col, child.CURR_PLAYER)
+        if child.winning_move(child.PREV_PLAYER):
+            score = (cells + 1 - moves) // 2
+        elif moves + 1 == cells:
+            score = 0
+        else:
+            score = -brute_force(child, moves + 1)
+        best = score if best is None else max(best, score)
+    return best
+
+def test_solve_matches_brute_force_on_endgames():
+    rng = random.Random(1)
+    solver = Solver()
+    solved = 0
+    while solved < 10:
+        board = Board(Board.PLAYER1_PIECE)
+        cells = board.ROW_COUNT * board.COLUMN_COUNT
+        for moves in range(cells - 8):
+            board.drop_piece(rng.choice(board.get_valid_locations()), board.CURR_PLAYER)
+            if board.winning_move(board.PREV_PLAYER):
+                break
+        else:
+            assert solver.solve(board) == brute_force(board, cells - 8)
+            solved += 1
@@ -0,0 +1,12 @@
+from board.board import Board
+
+def test_safe_locations_keep_winning_drops():
+    # Red wins in column 0, although yellow would win on the cell above it
+    board = Board.from_notation("7/1yyy3/1rrr3/yryr3/ryry3/yryr3 1 - - -")
+    assert board.get_winner() is None
+    assert board.get_threats(Board.PLAYER1_PIECE)[0] == [0]
+    assert 0 in board.get_safe_locations(Board.PLAYER1_PIECE)
+
+def test_safe_locations_skip_drops_under_an_opponent_win():
+    board = Board.from_notation("7/1yyy3/7/yryr3/ryry3/yryy3 1 - - -")
+    assert board.get_safe_locations(Board.PLAYER1_PIECE) == [1, 2, 3, 4, 5, 6]
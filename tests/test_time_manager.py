@@ -0,0 +1,52 @@
+import pytest
+from types import SimpleNamespace
+from board.board import Board
+from bots import time_manager
+from bots.time_manager import GameClock, TimeManager
+
+@pytest.fixture
+def now(monkeypatch):
+    """Settable time for the game clock, in seconds"""
+    now = [0.0]
+    monkeypatch.setattr(time_manager, 'time', SimpleNamespace(perf_counter=lambda: now[0]))
+    return now
+
+def test_a_turn_is_charged_to_its_player_with_the_increment(now):
+    clock = GameClock(base=10, increment=2)
+    clock.start(1)
+    now[0] = 3
+    assert clock.time_left(1) == 7 and clock.time_left(2) == 10
+    assert clock.switch(1) == 3
+    assert clock.running == 2 and clock.remaining[1] == 9
+    now[0] = 4
+    clock.stop()
+    assert clock.remaining == {1: 9, 2: 9} and clock.elapsed() == 0
+
+def test_a_player_out_of_time_flags_without_the_increment(now):
+    clock = GameClock(base=5, increment=2)
+    clock.start(1)
+    now[0] = 4.5
+    assert not clock.flagged(1)
+    now[0] = 6
+    assert clock.flagged(1) and not clock.flagged(2)
+    clock.switch(1)
+    assert clock.remaining[1] == -1 and clock.flagged(1)
+
+def test_budgets_follow_the_clock_and_the_phase():
+    manager = TimeManager(increment=1)
+    empty = Board(Board.PLAYER1_PIECE)
+    middlegame = Board.from_notation("7/7/7/3y3/2ryr2/1yrry2 1 - - -")
+    # Half the usual share in the opening, all of it in the middlegame
+    assert manager.budget(empty, 42.1) == pytest.approx((42 / 21 + 0.75) * 0.5)
+    assert manager.budget(middlegame, 42.1) == pytest.approx(42 / 17 + 0.75)
+    # Never more than max_fraction of the time left, never less than min_budget
+    assert manager.budget(middlegame, 2.1) == pytest.approx(2 * 0.3)
+    assert manager.budget(middlegame, 0.05) == manager.min_budget
+
+def test_open_threes_raise_the_budget():
+    manager = TimeManager()
+    quiet = Board.from_notation("7/7/7/3y3/2ryr2/1yrry2 1 - - -")
+    sharp = Board.from_notation("7/7/7/7/2yyy2/1rrr3 1 - - -")
+    assert manager.volatility(quiet) == 1.0
+    assert manager.volatility(sharp) > 1.0
+    assert manager.budget(sharp, 30) > manager.budget(quiet, 30)
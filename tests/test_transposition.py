@@ -0,0 +1,88 @@
+import os
+import sys
+import math
+import subprocess
+import pytest
+from board.board import Board
+from bots.minimax import MiniMaxBot
+from bots.transposition import TranspositionTable, SharedTranspositionTable, PersistentTranspositionTable
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def test_slot_tables_keep_fractional_values():
+    table = SharedTranspositionTable.create(64)
+    try:
+        table.store((b'position', True), 3, table.EXACT, 12.375, 2)
+        assert table.get((b'position', True)) == (3, table.EXACT, 12.375, 2)
+        table.store((b'position', False), 1, table.LOWER, -0.1, None)
+        assert table.get((b'position', False)) == (1, table.LOWER, -0.1, None)
+    finally:
+        table.close()
+
+def test_a_root_limited_to_some_moves_is_not_stored():
+    board = Board(Board.PLAYER1_PIECE)
+    bot = MiniMaxBot(Board.PLAYER1_PIECE, 3, solver_threshold=0)
+    key = bot.tt_key(board, True)[0]
+    bot.minimax(board, 3, -math.inf, math.inf, True, [0])
+    assert bot.tt.get(key) is None
+    # So a full search of the same root is not cut off with the restricted move
+    col, _ = bot.minimax(board, 3, -math.inf, math.inf, True)
+    assert col == 3
+    assert bot.tt.get(key)[:2] == (3, TranspositionTable.EXACT)
+
+def test_a_reopened_cache_keeps_its_entries_and_slot_count(tmp_path):
+    path = str(tmp_path / 'cache.tt')
+    table = PersistentTranspositionTable(path, slots=64)
+    table.store((b'position', True), 5, table.EXACT, 0.25, 3)
+    table.close()
+    table = PersistentTranspositionTable(path, slots=128)
+    try:
+        assert table.slots == 64
+        assert table.generation == 2
+        assert table.get((b'position', True)) == (5, table.EXACT, 0.25, 3)
+    finally:
+        table.close()
+
+def test_a_cache_that_does_not_match_its_header_is_refused(tmp_path):
+    path = str(tmp_path / 'cache.tt')
+    PersistentTranspositionTable(path, slots=64).close()
+    with open(path, 'r+b') as f:
+        f.truncate(PersistentTranspositionTable.HEADER_SIZE + 8)
+    with pytest.raises(ValueError):
+        PersistentTranspositionTable(path)
+    with open(path, 'r+b') as f:
+        f.write(b'XXXX')
+    with pytest.raises(ValueError):
+        PersistentTranspositionTable(path)
+
+def test_a_cache_its_writer_has_not_laid_out_reads_as_empty(tmp_path):
+    path = tmp_path / 'cache.tt'
+    table = PersistentTranspositionTable(str(path), slots=64, writable=False)
+    assert not path.exists() and table.get((b'position', True)) is None
+    table.close()
+    path.touch()
+    table = PersistentTranspositionTable(str(path), slots=64, writable=False)
+    table.store((b'position', True), 5, table.EXACT, 1, 3)
+    assert table.get((b'position', True)) is None
+    table.close()
+
+def test_only_one_process_at_a_time_writes_the_cache(tmp_path):
+    path = str(tmp_path / 'cache.tt')
+    code = ("import sys; from bots.transposition import PersistentTranspositionTable as T; "
+            "t = T(sys.argv[1], slots=64); t.store((b'other', True), 1, t.EXACT, 2.5, 1); "
+            "print(t.writable, t.get((b'position', True))); t.close()")
+    def open_in_other_process():
+        return subprocess.run([sys.executable, '-c', code, path], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+
+    table = PersistentTranspositionTable(path, slots=64)
+    table.store((b'position', True), 5, table.EXACT, 0.5, 3)
+    table.flush()
+    # The other process cannot take the lock, so it reads this one's entries and its store is dropped
+    assert open_in_other_process() == 'False (5, 0, 0.5, 3)'
+    assert table.get((b'other', True)) is None
+    table.close()
+    assert open_in_other_process() == 'True (5, 0, 0.5, 3)'
+    table = PersistentTranspositionTable(path, writable=False)
+    assert table.get((b'other', True)) == (1, table.EXACT, 2.5, 1)
+    table.close()
@@ -0,0 +1,34 @@
+import random
+import numpy as np
+import pytest
+from board.board import Board
+from bots.evaluation import Evaluation
+from bots.tuning import FEATURES, PositionStore
+
+def random_boards(geometry, count=20, seed=0):
+    rng = random.Random(seed)
+    boards = []
+    for _ in range(count):
+        board = Board(Board.PLAYER1_PIECE, *geometry)
+        for _ in range(rng.randint(0, 20)):
+            board.drop_piece(rng.choice(board.get_valid_locations()), board.CURR_PLAYER)
+        boards.append(board)
+    return boards
+
+@pytest.mark.parametrize('geometry', [(6, 7, 4), (7, 9, 5)])
+def test_features_match_evaluation(geometry, tmp_path):
+    boards = random_boards(geometry)
+    store = PositionStore.from_boards(boards, np.zeros(len(boards)))
+    store.save(tmp_path / 'store.npz')
+    store = PositionStore.load(tmp_path / 'store.npz')
+    assert store.geometry == geometry
+
+    weights = np.array([Evaluation.WEIGHTS[name] for name in FEATURES['evaluation']])
+    scores = store.features('evaluation') @ weights
+    for board, score in zip(boards, scores):
+        assert score == Evaluation(board.CURR_PLAYER).score_position(board)
+
+def test_mixed_geometries_are_rejected():
+    boards = [Board(Board.PLAYER1_PIECE), Board(Board.PLAYER1_PIECE, 7, 9, 5)]
+    with pytest.raises(ValueError):
+        PositionStore.from_boards(boards, [0, 0])